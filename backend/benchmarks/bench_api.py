@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+"""
+End-to-end API benchmark
+Drives the invoices.urls endpoints in-process through the full middleware stack (list,
+summary, retrieve, create, invoice_data, cached and uncached invoice PDFs) against the
+configured database, and writes throughput and p50/p95/p99 latency per scenario to JSON.
+Creates are rolled back. Fill the database first, e.g.:
+
+    python manage.py generate_data --customers 100000 --products 10000 --sales 5000000
+
+Usage: python benchmarks/bench_api.py [--requests 200] [--output bench_api.json] [--compare old.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import django
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yarotech_backend.settings')
+django.setup()
+
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from invoices.models import Customer, Product, Sale
+from invoices.pdf_cache import get_pdf_cache
+
+def scenarios(sale_ids, rng):
+    """Map scenario name to a callable issuing one request"""
+    def sale(path=''):
+        return lambda c: c.get(f'/api/sales/{rng.choice(sale_ids)}/{path}')
+
+    def create(c):
+        with transaction.atomic():
+            response = c.post('/api/sales/', {
+                'customer_name': f'Benchmark Customer {rng.randrange(100)}',
+                'issuer_name': 'Benchmark',
+                'sale_items': [
+                    {'product_name': f'Item {i}', 'quantity': rng.randrange(1, 4), 'price': '1250.50'}
+                    for i in range(rng.randrange(1, 6))
+                ],
+            }, format='json')
+            transaction.set_rollback(True)
+        return response
+
+    def uncached_pdf(c):
+        get_pdf_cache().clear()
+        return c.get(f'/api/sales/{rng.choice(sale_ids)}/invoice.pdf/')
+
+    return {
+        'sales.list': lambda c: c.get('/api/sales/?page_size=50'),
+        'sales.list.sparse': lambda c: c.get('/api/sales/?page_size=50&fields=id,total,sale_date'),
+        'sales.summary': lambda c: c.get('/api/sales/summary/?page_size=50'),
+        'sales.retrieve': sale(),
+        'sales.create': create,
+        'sales.invoice_data': sale('invoice_data/'),
+        # The same sale every time, so after warmup this is served from the PDF cache
+        'sales.invoice_pdf': lambda c: c.get(f'/api/sales/{sale_ids[0]}/invoice.pdf/'),
+        'sales.invoice_pdf.uncached': uncached_pdf,
+        'customers.list': lambda c: c.get('/api/customers/?page_size=50'),
+        'products.list': lambda c: c.get('/api/products/?page_size=50'),
+    }
+
+def run(request, client, count, warmup):
+    for _ in range(warmup):
+        request(client)
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    for _ in range(count):
+        began = time.perf_counter()
+        response = request(client)
+        latencies.append(time.perf_counter() - began)
+        if response.status_code >= 400:
+            errors += 1
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    def percentile(fraction):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000, 3)
+    return {
+        'requests': count,
+        'errors': errors,
+        'throughput': round(count / elapsed, 1),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(previous, current):
+    print()
+    print(f"{'vs ' + str(previous['meta'].get('revision')):<28} {'p50':>18} {'p95':>18} {'throughput':>18}")
+    for name, result in current['results'].items():
+        old = previous['results'].get(name)
+        if old is None:
+            continue
+        cells = []
+        for key in ('p50_ms', 'p95_ms', 'throughput'):
+            change = (result[key] - old[key]) / old[key] * 100 if old[key] else 0
+            cells.append(f'{result[key]:>9.1f} ({change:+5.0f}%)')
+        print(f'{name:<28} ' + ' '.join(f'{cell:>18}' for cell in cells))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help='Timed requests per scenario')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--scenarios', nargs='+', help='Only run these scenarios')
+    parser.add_argument('--sample', type=int, default=1000, help='Recent sales to pick retrieve targets from')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_api.json')
+    parser.add_argument('--compare', help='Earlier output file to compare against')
+    args = parser.parse_args()
+
+    sale_ids = list(Sale.objects.order_by('-sale_date').values_list('id', flat=True)[:args.sample])
+    if not sale_ids:
+        print('No sales found; run manage.py generate_data first')
+        return 1
+
+    rng = random.Random(args.seed)
+    available = scenarios(sale_ids, rng)
+    names = args.scenarios or list(available)
+    unknown = set(names) - set(available)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'customers': Customer.objects.count(),
+            'products': Product.objects.count(),
+            'sales': Sale.objects.count(),
+            'requests': args.requests,
+        },
+        'results': {},
+    }
+
+    client = APIClient(SERVER_NAME='localhost')
+    print(f"{'scenario':<28} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    # DEBUG would keep every query in connection.queries for the whole run
+    with override_settings(DEBUG=False):
+        for name in names:
+            result = run(available[name], client, args.requests, args.warmup)
+            report['results'][name] = result
+            print(f"{name:<28} {result['throughput']:>9.1f} {result['p50_ms']:>9.2f} "
+                  f"{result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['errors']:>7}")
+
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+        output.write('\n')
+    print(f'\nWrote {args.output}')
+
+    if args.compare:
+        with open(args.compare) as previous:
+            compare(json.load(previous), report)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Benchmark batch invoice rendering throughput (invoices/sec) against worker count
+Runs on a temporary SQLite database seeded with synthetic sales, so rendering
+processes can read the data and the development database is left untouched.
+
+Usage: python benchmarks/bench_batch_invoices.py [--sales 400] [--items 8] [--workers 1 2 4 8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sales', type=int, default=400)
+    parser.add_argument('--items', type=int, default=8, help='Line items per sale')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument('--chunk-size', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Setup Django on a throwaway database
+        os.environ['DATABASE_URL'] = f'sqlite:///{directory}/bench.sqlite3'
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yarotech_backend.settings')
+        import django
+        django.setup()
+
+        from django.core.management import call_command
+        from invoices.batch_pdf import get_pool, render_invoices, select_sale_ids, stream_zip
+        from invoices.invoice_pdf import warm_up
+        from invoices.pdf_cache import get_pdf_cache
+        from invoices.serializers import SaleCreateSerializer
+
+        call_command('migrate', verbosity=0)
+        for i in range(args.sales):
+            serializer = SaleCreateSerializer(data={
+                'customer_name': f'Customer {i % 25}',
+                'issuer_name': 'Benchmark',
+                'sale_items': [
+                    {'product_name': f'Product {j}', 'quantity': j + 1, 'price': 2500}
+                    for j in range(args.items)
+                ],
+            })
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+        sale_ids = select_sale_ids()
+        # Warm up fonts and imports so the first row is not penalised
+        list(render_invoices(sale_ids[:1], 1))
+
+        print(f'{len(sale_ids)} invoices, {args.items} items each')
+        print(f"{'workers':>8} {'seconds':>9} {'inv/s':>9} {'speedup':>8}")
+        baseline = None
+        for workers in sorted(set(args.workers)):
+            # Each worker count gets a new pool, whose workers start with empty caches
+            get_pdf_cache().clear()
+            if workers > 1:
+                # The pool lives as long as the web process; time rendering, not its start-up
+                pool = get_pool(workers)
+                for future in [pool.submit(warm_up) for _ in range(workers)]:
+                    future.result()
+            start = time.perf_counter()
+            size = sum(len(chunk) for chunk in stream_zip(render_invoices(sale_ids, workers, args.chunk_size)))
+            elapsed = time.perf_counter() - start
+            rate = len(sale_ids) / elapsed
+            baseline = baseline or rate
+            print(f'{workers:>8} {elapsed:>9.2f} {rate:>9.1f} {rate / baseline:>7.2f}x  ({size // 1024} KiB)')
+
+if __name__ == '__main__':
+    main()
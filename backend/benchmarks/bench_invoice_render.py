@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark for invoice rendering
+Compares compiling the layout on every render (what generate_invoice_pdf used to do)
+with filling the shared, precompiled InvoiceTemplate. Reports time and peak traced
+allocations per render, both for building the story and for the full PDF.
+The benchmark sale is rolled back.
+
+Usage: python benchmarks/bench_invoice_render.py [--items 10] [--rounds 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import django
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yarotech_backend.settings')
+django.setup()
+
+from django.db import transaction
+from invoices.invoice_pdf import InvoiceTemplate, get_invoice_template
+from invoices.models import Sale
+from invoices.serializers import SaleCreateSerializer
+
+def create_sale(item_count):
+    serializer = SaleCreateSerializer(data={
+        'customer_name': 'Benchmark Customer',
+        'issuer_name': 'Benchmark',
+        'sale_items': [
+            {'product_name': f'Product {i}', 'quantity': i + 1, 'price': 1999.99}
+            for i in range(item_count)
+        ],
+    })
+    serializer.is_valid(raise_exception=True)
+    sale = serializer.save()
+    return Sale.objects.select_related('customer').prefetch_related('sale_items').get(pk=sale.pk)
+
+def measure(label, render, rounds):
+    render()  # warm up imports and font metrics
+    
+    start = time.perf_counter()
+    for _ in range(rounds):
+        render()
+    per_render = (time.perf_counter() - start) / rounds
+    
+    tracemalloc.start()
+    render()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    print(f'{label:<28} {per_render * 1000:>9.3f} ms {peak / 1024:>10.1f} KiB')
+    return per_render, peak
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+    
+    with transaction.atomic():
+        sale = create_sale(args.items)
+        list(sale.sale_items.all())
+        template = get_invoice_template()
+        
+        print(f'{args.items} line items, {args.rounds} rounds')
+        print(f"{'':<28} {'per render':>12} {'peak alloc':>14}")
+        cold_story = measure('story, compiled per render', lambda: InvoiceTemplate().story(sale), args.rounds)
+        warm_story = measure('story, shared template', lambda: template.story(sale), args.rounds)
+        cold_pdf = measure('pdf, compiled per render', lambda: InvoiceTemplate().render([sale]), args.rounds)
+        warm_pdf = measure('pdf, shared template', lambda: template.render([sale]), args.rounds)
+        
+        print()
+        print(f'story: {cold_story[0] / warm_story[0]:.1f}x faster, {cold_story[1] / warm_story[1]:.1f}x less peak memory')
+        print(f'pdf:   {cold_pdf[0] / warm_pdf[0]:.2f}x faster, {cold_pdf[1] / warm_pdf[1]:.2f}x less peak memory')
+        transaction.set_rollback(True)
+
+if __name__ == '__main__':
+    main()
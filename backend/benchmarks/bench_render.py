@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+Benchmark sale list serialization, JSON rendering and compression
+Seeds a temporary SQLite database and renders the nested sale list (SaleSerializer with
+line items) three ways: DRF's field-by-field serializer with the stock JSONRenderer,
+the compiled serializer with the stock renderer, and the compiled serializer with
+FastJSONRenderer. Then compresses the body with gzip and, if installed, brotli.
+Reports milliseconds and bytes per 1k sales, and checks all three render the same bytes.
+
+Usage: python benchmarks/bench_render.py [--sales 5000] [--items 5] [--rounds 5]
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+import time
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def best_of(rounds, function):
+    function()  # warm up
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sales', type=int, default=5000)
+    parser.add_argument('--items', type=int, default=5)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Setup Django on a throwaway database
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'bench.sqlite3')}"
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yarotech_backend.settings')
+        import django
+        django.setup()
+
+        from django.conf import settings
+        from django.core.management import call_command
+        from rest_framework import serializers
+        from rest_framework.renderers import JSONRenderer
+        from invoices import fastjson
+        from invoices.middleware import brotli
+        from invoices.models import Sale
+        from invoices.renderers import FastJSONRenderer
+        from invoices.serializers import SaleItemSerializer, SaleSerializer
+        from bench_sale_list import seed
+
+        class FieldWalkingItemSerializer(SaleItemSerializer):
+            to_representation = serializers.ModelSerializer.to_representation
+
+        class FieldWalkingSaleSerializer(SaleSerializer):
+            """SaleSerializer on DRF's per-field to_representation"""
+            to_representation = serializers.ModelSerializer.to_representation
+            sale_items = FieldWalkingItemSerializer(many=True, read_only=True)
+
+        call_command('migrate', verbosity=0)
+        start = time.perf_counter()
+        seed(args.sales, args.items)
+        print(f'Seeded {args.sales} sales x {args.items} items in {time.perf_counter() - start:.1f}s')
+        sales = list(Sale.objects.prefetch_related('sale_items'))
+        per_1k = 1000 / len(sales)
+
+        variants = [
+            ('DRF serializer + JSONRenderer', FieldWalkingSaleSerializer, JSONRenderer()),
+            ('compiled + JSONRenderer', SaleSerializer, JSONRenderer()),
+            ('compiled + FastJSONRenderer', SaleSerializer, FastJSONRenderer()),
+        ]
+        print(f"json backend: {'orjson' if fastjson.orjson is not None else 'json (orjson not installed)'}")
+        print(f"{'per 1k sales':<32} {'serialize':>10} {'render':>10} {'total':>10} {'bytes':>12}")
+        bodies = []
+        baseline = None
+        for label, serializer_class, renderer in variants:
+            serialize, data = best_of(args.rounds, lambda: serializer_class(sales, many=True).data)
+            render, body = best_of(args.rounds, lambda: renderer.render(data))
+            total = serialize + render
+            baseline = baseline or total
+            bodies.append(body)
+            print(f'{label:<32} {serialize * per_1k * 1000:>8.1f}ms {render * per_1k * 1000:>8.1f}ms '
+                  f'{total * per_1k * 1000:>8.1f}ms {len(body) * per_1k:>12,.0f}  ({baseline / total:.1f}x)')
+        print(f"identical output: {'yes' if len(set(bodies)) == 1 else 'NO'}")
+
+        body = bodies[-1]
+        print()
+        print(f"{'compression, per 1k sales':<32} {'time':>10} {'bytes':>12} {'ratio':>8}")
+        codecs = [('gzip (level 6)', lambda: gzip.compress(body, compresslevel=6))]
+        if brotli is not None:
+            quality = settings.RESPONSE_BROTLI_QUALITY
+            codecs.append((f'brotli (quality {quality})', lambda: brotli.compress(body, quality=quality)))
+        else:
+            print('brotli: not installed (pip install Brotli)')
+        for label, compress in codecs:
+            elapsed, compressed = best_of(args.rounds, compress)
+            print(f'{label:<32} {elapsed * per_1k * 1000:>8.1f}ms {len(compressed) * per_1k:>12,.0f} '
+                  f'{len(body) / len(compressed):>7.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+Benchmark the sale create path
+Reports INSERT count and wall time for 10/100/1000-item sales.
+Every sale is rolled back, so it is safe to run against a development database.
+
+Usage: python benchmarks/bench_sale_create.py [sizes...]
+"""
+
+import os
+import sys
+import time
+import django
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yarotech_backend.settings')
+django.setup()
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from invoices.serializers import SaleCreateSerializer
+
+DEFAULT_SIZES = [10, 100, 1000]
+ROUNDS = 5
+
+def make_payload(item_count):
+    return {
+        'customer_name': 'Benchmark Customer',
+        'issuer_name': 'Benchmark',
+        'sale_items': [
+            {'product_name': f'Item {i}', 'quantity': (i % 5) + 1, 'price': 1250.50}
+            for i in range(item_count)
+        ],
+    }
+
+def run_once(payload):
+    """Create one sale inside a rolled back transaction"""
+    with transaction.atomic():
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            serializer = SaleCreateSerializer(data=payload)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            elapsed = time.perf_counter() - start
+        transaction.set_rollback(True)
+    
+    inserts = sum(1 for q in queries.captured_queries if q['sql'].lstrip().upper().startswith('INSERT'))
+    return inserts, len(queries.captured_queries), elapsed
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    
+    print(f"{'items':>8} {'inserts':>8} {'queries':>8} {'best ms':>10} {'mean ms':>10}")
+    for size in sizes:
+        payload = make_payload(size)
+        results = [run_once(payload) for _ in range(ROUNDS)]
+        timings = [elapsed for _, _, elapsed in results]
+        inserts, queries, _ = results[-1]
+        print(
+            f"{size:>8} {inserts:>8} {queries:>8} "
+            f"{min(timings) * 1000:>10.2f} {sum(timings) / len(timings) * 1000:>10.2f}"
+        )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Benchmark sales history serialization throughput
+Seeds a temporary SQLite database with sales and serializes all of them three ways:
+the nested SaleSerializer over a customer join and an items prefetch (the original
+list path), SaleSerializer trimmed to the summary columns, and SaleSummarySerializer
+over values() rows using the denormalized customer_name and item_count.
+
+Usage: python benchmarks/bench_sale_list.py [--sales 10000] [--items 5] [--rounds 3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def seed(sale_count, item_count):
+    from invoices.bulk import import_sales
+    records = [{
+        'customer_name': f'Customer {i % 500}',
+        'issuer_name': f'Issuer {i % 5}',
+        'sale_items': [
+            {'product_name': f'Product {j}', 'quantity': j + 1, 'price': '1999.99'}
+            for j in range(item_count)
+        ],
+    } for i in range(sale_count)]
+    import_sales(records)
+
+def measure(label, serialize, count, rounds):
+    serialize()  # warm up
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        rows = serialize()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    assert len(rows) == count
+    print(f'{label:<34} {best * 1000:>9.1f} ms {count / best:>12.0f} sales/s')
+    return best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sales', type=int, default=10000)
+    parser.add_argument('--items', type=int, default=5)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Setup Django on a throwaway database
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'bench.sqlite3')}"
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yarotech_backend.settings')
+        import django
+        django.setup()
+
+        from django.core.management import call_command
+        from rest_framework import serializers
+        from invoices.models import Sale
+        from invoices.serializers import SaleItemSerializer, SaleSerializer, SaleSummarySerializer
+
+        class NestedSaleSerializer(serializers.ModelSerializer):
+            """SaleSerializer before customer_name and item_count were stored on Sale"""
+            sale_items = SaleItemSerializer(many=True, read_only=True)
+            customer_name = serializers.CharField(source='customer.name', read_only=True)
+
+            class Meta:
+                model = Sale
+                fields = ['id', 'customer', 'customer_name', 'sale_date', 'total', 'issuer_name', 'sale_items', 'created_at']
+
+        class TrimmedSaleSerializer(SaleSerializer):
+            class Meta(SaleSerializer.Meta):
+                fields = list(SaleSummarySerializer.SUMMARY_FIELDS)
+
+        call_command('migrate', verbosity=0)
+        start = time.perf_counter()
+        seed(args.sales, args.items)
+        print(f'Seeded {args.sales} sales x {args.items} items in {time.perf_counter() - start:.1f}s')
+        print(f"{'':<34} {'best of ' + str(args.rounds):>12} {'throughput':>16}")
+
+        nested = measure(
+            'nested SaleSerializer',
+            lambda: NestedSaleSerializer(
+                Sale.objects.select_related('customer').prefetch_related('sale_items'), many=True
+            ).data,
+            args.sales, args.rounds,
+        )
+        measure(
+            'SaleSerializer, summary fields',
+            lambda: TrimmedSaleSerializer(Sale.objects.all(), many=True).data,
+            args.sales, args.rounds,
+        )
+        summary = measure(
+            'SaleSummarySerializer + values()',
+            lambda: SaleSummarySerializer(Sale.objects.values(*SaleSummarySerializer.SUMMARY_FIELDS), many=True).data,
+            args.sales, args.rounds,
+        )
+        print()
+        print(f'summary path: {nested / summary:.1f}x faster than the nested list')
+
+if __name__ == '__main__':
+    main()
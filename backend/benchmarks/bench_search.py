@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+Benchmark type-ahead product search latency at catalog scale
+Seeds a temporary SQLite database with synthetic products and times
+GET /api/products/?q= for a mix of short prefixes, word fragments and full words.
+
+Usage: python benchmarks/bench_search.py [--products 100000] [--queries 1000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BRANDS = ['HP', 'Dell', 'Lenovo', 'Samsung', 'Apple', 'Tecno', 'Infinix', 'Logitech', 'Sony', 'Canon',
+          'Epson', 'TP-Link', 'Huawei', 'Xiaomi', 'Asus', 'Acer', 'Kingston', 'SanDisk', 'Oraimo', 'JBL']
+ITEMS = ['Laptop', 'Mouse', 'Keyboard', 'Monitor', 'Headphones', 'Webcam', 'Speaker', 'Router', 'Printer',
+         'Toner', 'Flash Drive', 'Hard Disk', 'Power Bank', 'Charger', 'Cable', 'Adapter', 'Tablet', 'Phone',
+         'Scanner', 'UPS', 'Switch', 'Projector', 'Microphone', 'Stabilizer', 'Inverter']
+VARIANTS = ['Pro', 'Max', 'Lite', 'Plus', 'Mini', 'Ultra', 'Wireless', 'USB-C', 'Gaming', 'Office']
+
+def product_name(rng, index):
+    return f'{rng.choice(BRANDS)} {rng.choice(ITEMS)} {rng.choice(VARIANTS)} {index:05d}'
+
+def query_mix(rng, names, count):
+    queries = []
+    for _ in range(count):
+        name = rng.choice(names)
+        kind = rng.random()
+        if kind < 0.2:
+            queries.append(name[:2])
+        elif kind < 0.7:
+            start = rng.randrange(0, max(1, len(name) - 6))
+            queries.append(name[start:start + rng.randint(3, 6)])
+        else:
+            queries.append(rng.choice(name.split()))
+    return queries
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Setup Django on a throwaway database
+        os.environ['DATABASE_URL'] = f'sqlite:///{directory}/bench.sqlite3'
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yarotech_backend.settings')
+        import django
+        django.setup()
+
+        from decimal import Decimal
+        from django.core.management import call_command
+        from rest_framework.test import APIClient
+        from invoices.catalog_cache import get_cache
+        from invoices.models import Product
+
+        call_command('migrate', verbosity=0)
+        names = [product_name(rng, i) for i in range(args.products)]
+        start = time.perf_counter()
+        Product.objects.bulk_create(
+            (Product(name=name, price=Decimal(rng.randint(500, 500000))) for name in names),
+            batch_size=2000,
+        )
+        print(f'Seeded {args.products} products in {time.perf_counter() - start:.1f}s')
+
+        client = APIClient(SERVER_NAME='localhost')
+        client.get('/api/products/', {'q': 'warm', 'limit': 10})
+        queries = query_mix(rng, names, args.queries)
+        timings = []
+        for query in queries:
+            # Time the search itself, not the catalog cache
+            get_cache().clear()
+            start = time.perf_counter()
+            response = client.get('/api/products/', {'q': query, 'limit': 10})
+            timings.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.content
+
+        print(f'{len(timings)} queries, limit 10')
+        print(f'p50 {statistics.median(timings) * 1000:.2f} ms  '
+              f'p95 {percentile(timings, 0.95) * 1000:.2f} ms  '
+              f'p99 {percentile(timings, 0.99) * 1000:.2f} ms  '
+              f'max {max(timings) * 1000:.2f} ms')
+
+if __name__ == '__main__':
+    main()
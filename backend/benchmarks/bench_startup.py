@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Startup benchmark: what a worker imports before it can serve its first request
+Runs `python -X importtime` in fresh interpreters that load the WSGI application and the
+URL configuration, as a gunicorn or uvicorn worker does, and reports the median import
+time, the packages that cost the most, and what importing the invoice PDF renderer adds
+on top (paid on the first PDF instead of at boot).
+
+Exits 1 on a regression: a --forbid module (ReportLab by default) loaded at startup, a
+median over --max-ms, or, with --compare, a median more than --tolerance above an
+earlier --output file.
+
+Usage: python benchmarks/bench_startup.py [--runs 7] [--max-ms 800] [--output startup.json] [--compare old.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP = 'import yarotech_backend.wsgi; from django.urls import get_resolver; get_resolver().url_patterns'
+RENDERER = 'import invoices.invoice_pdf'
+
+def import_times(code):
+    """[(self us, cumulative us, depth, module)] from one interpreter running code"""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='yarotech_backend.settings', INVOICE_PDF_PRELOAD='false')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=BACKEND, env=env,
+                            capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(own), int(cumulative), depth, name.strip()))
+    return rows
+
+def total_ms(rows):
+    return sum(cumulative for _, cumulative, depth, _ in rows if depth == 0) / 1000
+
+def measure(code, runs):
+    """Median total import time in ms over runs, and the rows of the median run"""
+    samples = sorted((total_ms(rows), rows) for rows in (import_times(code) for _ in range(runs)))
+    return samples[len(samples) // 2]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=7, help='Interpreters started per measurement')
+    parser.add_argument('--top', type=int, default=10, help='Packages listed by import time')
+    parser.add_argument('--forbid', nargs='*', default=['reportlab'], help='Packages startup must not import')
+    parser.add_argument('--max-ms', type=float, help='Fail if the median startup import time exceeds this')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Earlier --output file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown against --compare')
+    args = parser.parse_args()
+
+    startup, rows = measure(STARTUP, args.runs)
+    with_renderer, _ = measure(f'{STARTUP}; {RENDERER}', args.runs)
+    packages = Counter()
+    for own, _, _, name in rows:
+        packages[name.split('.')[0]] += own
+    imported = {name.split('.')[0] for _, _, _, name in rows}
+
+    print(f'startup imports        {startup:>8.1f} ms  ({len(rows)} modules, median of {args.runs})')
+    print(f'+ invoice PDF renderer {with_renderer - startup:>8.1f} ms  (deferred to the first PDF)')
+    print()
+    print(f"{'package':<24} {'self ms':>9}")
+    for package, own in packages.most_common(args.top):
+        print(f'{package:<24} {own / 1000:>9.1f}')
+
+    failures = []
+    for package in args.forbid:
+        if package in imported:
+            failures.append(f'{package} is imported at startup')
+    if args.max_ms is not None and startup > args.max_ms:
+        failures.append(f'startup imports take {startup:.1f} ms, over --max-ms {args.max_ms:.1f}')
+    if args.compare:
+        with open(args.compare) as previous:
+            baseline = json.load(previous)['startup_ms']
+        limit = baseline * (1 + args.tolerance)
+        print(f'\nvs {args.compare}: {baseline:.1f} ms -> {startup:.1f} ms ({(startup - baseline) / baseline * 100:+.0f}%)')
+        if startup > limit:
+            failures.append(f'startup imports take {startup:.1f} ms, over {limit:.1f} ms ({args.tolerance:.0%} above baseline)')
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'startup_ms': startup, 'renderer_ms': with_renderer - startup,
+                       'modules': len(rows), 'packages': {name: own for name, own in packages.most_common()}},
+                      output, indent=2)
+            output.write('\n')
+        print(f'\nWrote {args.output}')
+
+    print()
+    for failure in failures:
+        print(f'FAILED: {failure}')
+    print('OK' if not failures else f'FAILED ({len(failures)} checks)')
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Benchmark what a client transfers to stay current: full reloads vs the change feed
+Seeds a temporary SQLite database, takes a change feed cursor, then makes a few edits the
+way a till would (new sales, a renamed customer, a repriced product). Compares the bytes
+and time of reloading the customer, product and sale lists with those of following the
+cursor on GET /api/changes/, both raw and gzipped.
+
+Usage: python benchmarks/bench_sync.py [--sales 5000] [--items 5] [--new-sales 10]
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+import time
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def fetch(client, url):
+    """(body bytes, seconds) for one GET, following has_more on the change feed"""
+    body = b''
+    start = time.perf_counter()
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+        body += response.content
+        data = response.json()
+        url = f"/api/changes/?since={data['cursor']}" if isinstance(data, dict) and data.get('has_more') else None
+    return body, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sales', type=int, default=5000)
+    parser.add_argument('--items', type=int, default=5)
+    parser.add_argument('--new-sales', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Setup Django on a throwaway database
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'bench.sqlite3')}"
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yarotech_backend.settings')
+        import django
+        django.setup()
+
+        from django.core.management import call_command
+        from rest_framework.test import APIClient
+        from invoices.bulk import import_sales
+        from invoices.models import Customer, Product
+        from bench_sale_list import seed
+
+        call_command('migrate', verbosity=0)
+        Product.objects.bulk_create([Product(name=f'Product {j}', price='1999.99') for j in range(args.items)])
+        seed(args.sales, args.items)
+        print(f'Seeded {args.sales} sales x {args.items} items')
+
+        client = APIClient(SERVER_NAME='localhost')
+        cursor = client.get('/api/changes/').json()['cursor']
+
+        import_sales([{
+            'customer_name': f'Customer {i}',
+            'issuer_name': 'Issuer 0',
+            'sale_items': [{'product_name': 'Product 0', 'quantity': 1, 'price': '1999.99'}],
+        } for i in range(args.new_sales)])
+        customer = Customer.objects.order_by('name').first()
+        customer.name = f'{customer.name} (renamed)'
+        customer.save()
+        product = Product.objects.order_by('name').first()
+        product.price = '2499.99'
+        product.save()
+
+        full_body, full_time = b'', 0
+        for url in ('/api/customers/', '/api/products/', '/api/sales/'):
+            body, elapsed = fetch(client, url)
+            full_body += body
+            full_time += elapsed
+        delta_body, delta_time = fetch(client, f'/api/changes/?since={cursor}')
+
+        print(f"{'refresh after the edits':<28} {'time':>10} {'bytes':>12} {'gzipped':>12}")
+        for label, body, elapsed in (('full lists', full_body, full_time), ('change feed', delta_body, delta_time)):
+            print(f'{label:<28} {elapsed * 1000:>8.1f}ms {len(body):>12,} {len(gzip.compress(body)):>12,}')
+        print(f'change feed transfers {len(full_body) / len(delta_body):.0f}x fewer bytes')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Concurrency check for invoice number allocation
+Inserts sales numbered by the block allocator from several processes, each with several
+threads, then checks the numbers they got. No insert may hit the unique index on
+invoice_number (a number handed out twice), and the only numbers missing between the
+lowest and highest are ones left at the end of a process's final block (none when --sales
+is a multiple of the block size) or taken by an insert that failed for another reason.
+Also reports throughput. The sales are deleted afterwards unless --keep is given; run it
+against a database nothing else is writing to.
+
+Usage: python benchmarks/check_invoice_numbers.py [--processes 4] [--threads 8] [--sales 500]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import django
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yarotech_backend.settings')
+django.setup()
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connections
+from invoices.invoice_numbers import next_invoice_number
+from invoices.models import ArchivedSale, Sale
+
+DUPLICATE = 'duplicate'
+FAILED = 'failed'
+
+def create_sale(issuer_name):
+    """Insert one sale and return its invoice number, or why the insert failed"""
+    number = next_invoice_number()
+    try:
+        Sale(invoice_number=number, issuer_name=issuer_name).save(force_insert=True)
+    except IntegrityError:
+        return DUPLICATE
+    except DatabaseError:
+        return FAILED
+    return number
+
+def run_worker(args):
+    """One process: create its share of sales on a thread pool and return their numbers"""
+    issuer_name, sales, threads = args
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(lambda _: create_sale(issuer_name), range(sales)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8, help='Threads per process')
+    parser.add_argument('--sales', type=int, default=500, help='Sales per process')
+    parser.add_argument('--keep', action='store_true', help='Keep the created sales')
+    args = parser.parse_args()
+
+    issuer_name = f'Invoice Number Check {uuid.uuid4().hex[:8]}'
+    block_size = settings.INVOICE_NUMBER_BLOCK_SIZE
+    # Forked workers must open their own connections
+    connections.close_all()
+
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.processes) as pool:
+        results = pool.map(run_worker, [(issuer_name, args.sales, args.threads)] * args.processes)
+    elapsed = time.perf_counter() - start
+
+    outcomes = Counter(outcome for result in results for outcome in result if isinstance(outcome, str))
+    numbers = [number for result in results for number in result if isinstance(number, int)]
+    duplicates = outcomes[DUPLICATE] + sum(count - 1 for count in Counter(numbers).values())
+    failed = outcomes[FAILED]
+    missing = 0
+    if numbers:
+        low, high = min(numbers), max(numbers)
+        used = set()
+        for model in (Sale, ArchivedSale):
+            used.update(model.objects.filter(invoice_number__range=(low, high)).values_list('invoice_number', flat=True))
+        missing = (high - low + 1) - len(used)
+    # Each process leaves at most the rest of its last block unused
+    allowed_missing = args.processes * (-args.sales % block_size) + failed
+
+    print(f'sales        {len(numbers)} from {args.processes} processes x {args.threads} threads '
+          f'(block size {block_size})')
+    print(f'elapsed      {elapsed:.2f}s')
+    print(f'throughput   {len(numbers) / elapsed:.1f} sales/s')
+    print(f'failed       {failed}')
+    print(f'duplicates   {duplicates}')
+    print(f'gaps         {missing} (allowed {allowed_missing})')
+
+    if not args.keep:
+        Sale.objects.filter(issuer_name=issuer_name).delete()
+    ok = not duplicates and missing <= allowed_missing
+    print('OK' if ok else 'FAILED')
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+"""
+Check and time per-branch sales databases
+Sets up a catalog database and --shards branch databases as SQLite files in a temporary
+directory, maps all but one issuer to a branch, and imports sales for every issuer. Then
+checks that each sale, its items and its rollups landed in its issuer's database, that
+the API finds sales wherever they are (retrieve, invoice data, by number, ?issuer= lists,
+a paged walk over every sale) and that the cross-branch reports match the sums of the
+branch reports. Times cross-branch queries fanned out in parallel against the same
+queries run one database after another.
+
+Usage: python benchmarks/check_shards.py [--shards 4] [--sales 20000] [--items 5] [--rounds 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def best_of(rounds, function):
+    function()  # warm up
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--shards', type=int, default=4, help='Branch databases besides the default one')
+    parser.add_argument('--sales', type=int, default=20000)
+    parser.add_argument('--items', type=int, default=5)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Issuer 0 stays in the default database, Issuer n goes to branch n
+        branches = {f'branch{n}': f'Issuer {n}' for n in range(1, args.shards + 1)}
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'catalog.sqlite3')}"
+        os.environ['SALES_SHARD_DATABASES'] = ','.join(
+            f"{alias}=sqlite:///{os.path.join(directory, alias + '.sqlite3')}" for alias in branches
+        )
+        os.environ['SALES_SHARDS'] = json.dumps({issuer: alias for alias, issuer in branches.items()})
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yarotech_backend.settings')
+        import django
+        django.setup()
+
+        from decimal import Decimal
+        from django.core.management import call_command
+        from django.db.models import Sum
+        from rest_framework.test import APIClient
+        from invoices.bulk import import_sales
+        from invoices.models import Sale, SaleItem, SalesRollup
+        from invoices.sharding import fan_out, sale_databases, shard_for_issuer
+
+        databases = sale_databases()
+        for alias in databases:
+            call_command('migrate', database=alias, verbosity=0)
+        start = time.perf_counter()
+        import_sales([{
+            'customer_name': f'Customer {i % 500}',
+            'issuer_name': f'Issuer {i % (args.shards + 1)}',
+            'sale_items': [
+                {'product_name': f'Product {j}', 'quantity': j + 1, 'price': '1999.99'}
+                for j in range(args.items)
+            ],
+        } for i in range(args.sales)])
+        print(f'Imported {args.sales} sales x {args.items} items into {len(databases)} databases '
+              f'in {time.perf_counter() - start:.1f}s')
+
+        failures = []
+
+        def check(ok, message):
+            if not ok:
+                failures.append(message)
+                print(f'FAILED: {message}')
+
+        counts = {}
+        for alias in databases:
+            issuers = set(Sale.objects.using(alias).values_list('issuer_name', flat=True).distinct())
+            check(all(shard_for_issuer(issuer) == alias for issuer in issuers), f'{alias} holds sales of {issuers}')
+            counts[alias] = Sale.objects.using(alias).count()
+            items = SaleItem.objects.using(alias).count()
+            check(items == counts[alias] * args.items, f'{alias} has {items} items for {counts[alias]} sales')
+            lines = SalesRollup.objects.using(alias).aggregate(lines=Sum('line_count'))['lines'] or 0
+            check(lines == items, f'{alias} rollups count {lines} lines for {items} items')
+        check(sum(counts.values()) == args.sales, f'{sum(counts.values())} sales stored of {args.sales}')
+        print('sales per database   ' + ', '.join(f'{alias} {count}' for alias, count in counts.items()))
+
+        client = APIClient(SERVER_NAME='localhost')
+        for alias in databases:
+            sale = Sale.objects.using(alias).first()
+            for url in (f'/api/sales/{sale.id}/', f'/api/sales/{sale.id}/invoice_data/',
+                        f'/api/sales/by-number/{sale.invoice_id}/'):
+                response = client.get(url)
+                check(response.status_code == 200 and response.json()['id'] == str(sale.id), f'{url} in {alias}')
+            issuer = sale.issuer_name
+            listed = client.get('/api/sales/summary/', {'issuer': issuer}).json()
+            check(len(listed) == counts[alias], f'?issuer={issuer} lists {len(listed)} of {counts[alias]}')
+
+        seen, keys, url = set(), [], '/api/sales/summary/?page_size=500'
+        while url:
+            page = client.get(url).json()
+            seen.update(row['id'] for row in page['results'])
+            keys.extend((row['sale_date'], row['id']) for row in page['results'])
+            url = page['next']
+        check(len(seen) == len(keys) == args.sales, f'paged walk returned {len(keys)} rows, {len(seen)} distinct')
+        check(keys == sorted(keys, reverse=True), 'paged walk is out of order')
+
+        expected = {}
+        for alias in databases:
+            for row in SalesRollup.objects.using(alias).values('issuer_name').annotate(revenue=Sum('revenue')):
+                expected[row['issuer_name']] = expected.get(row['issuer_name'], 0) + row['revenue']
+        report = {row['issuer_name']: Decimal(row['revenue']) for row in client.get('/api/reports/issuers/').json()}
+        check(report == expected, 'issuer report differs from the branch reports')
+        totals = client.get('/api/reports/').json()
+        check(Decimal(totals['revenue']) == sum(expected.values()), 'report totals differ from the branch reports')
+
+        # On local SQLite files the queries are short and much of their time holds the GIL, so
+        # the fan out gains little here; it pays off against databases on the network, where
+        # the round trips to each branch overlap
+        for label, branch_report in (
+            ('daily report', lambda alias: list(
+                SalesRollup.objects.using(alias).order_by('day').values('day').annotate(revenue=Sum('revenue'))
+            )),
+            ('line item scan', lambda alias: list(
+                SaleItem.objects.using(alias).order_by('product_name').values('product_name').annotate(quantity=Sum('quantity'))
+            )),
+        ):
+            serial = best_of(args.rounds, lambda: [branch_report(alias) for alias in databases])
+            parallel = best_of(args.rounds, lambda: fan_out(branch_report))
+            print(f'{label:<20} serial {serial * 1000:.1f}ms, fanned out {parallel * 1000:.1f}ms '
+                  f'({serial / parallel:.1f}x)')
+
+        print('OK' if not failures else f'FAILED ({len(failures)} checks)')
+        return 0 if not failures else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Load test for the async sale actions
+Fires a mix of GET invoice_data/, POST send_email/, GET invoice.pdf/ and GET auth/status/
+requests from many threads at a running server and reports throughput and latency per
+endpoint. Start the same project under WSGI and under ASGI and run it against each:
+
+    gunicorn yarotech_backend.wsgi -w 4 -b 127.0.0.1:8000
+    uvicorn yarotech_backend.asgi:application --workers 4 --port 8000
+
+The server needs some sales to work on (e.g. python setup_django.py, or POST a few).
+
+Usage: python benchmarks/load_async.py --url http://localhost:8000 --concurrency 64 --requests 2000
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+ENDPOINTS = {
+    'invoice_data': ('GET', '/api/sales/{id}/invoice_data/'),
+    'send_email': ('POST', '/api/sales/{id}/send_email/'),
+    'invoice_pdf': ('GET', '/api/sales/{id}/invoice.pdf/'),
+    'auth_status': ('GET', '/api/auth/status/'),
+}
+
+def sale_ids(url, count):
+    with urllib.request.urlopen(f'{url}/api/sales/summary/?page_size={count}', timeout=60) as response:
+        return [row['id'] for row in json.load(response)['results']]
+
+def call(url, endpoint, sale_id):
+    method, path = ENDPOINTS[endpoint]
+    request = urllib.request.Request(url + path.format(id=sale_id), method=method)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            outcome = str(response.status)
+    except urllib.error.HTTPError as exc:
+        outcome = str(exc.code)
+    except (urllib.error.URLError, TimeoutError, ConnectionError) as exc:
+        outcome = type(exc).__name__
+    return endpoint, outcome, time.perf_counter() - start
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--endpoints', nargs='+', choices=sorted(ENDPOINTS), default=sorted(ENDPOINTS))
+    parser.add_argument('--sales', type=int, default=50, help='Distinct sales to spread requests over')
+    args = parser.parse_args()
+    url = args.url.rstrip('/')
+
+    ids = sale_ids(url, args.sales)
+    if not ids:
+        print('No sales found; create some first')
+        return 1
+    jobs = [(args.endpoints[i % len(args.endpoints)], ids[i % len(ids)]) for i in range(args.requests)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda job: call(url, *job), jobs))
+    elapsed = time.perf_counter() - start
+
+    outcomes = Counter(outcome for _, outcome, _ in results)
+    ok = sum(count for outcome, count in outcomes.items() if outcome.startswith('2'))
+    latencies = defaultdict(list)
+    for endpoint, outcome, latency in results:
+        if outcome.startswith('2'):
+            latencies[endpoint].append(latency)
+
+    print(f'requests     {args.requests} at concurrency {args.concurrency}')
+    print(f'elapsed      {elapsed:.2f}s')
+    print(f'throughput   {ok / elapsed:.1f} req/s')
+    print(f'outcomes     {dict(outcomes)}')
+    for endpoint in args.endpoints:
+        values = sorted(latencies[endpoint])
+        if values:
+            print(f'{endpoint:<12} p50 {statistics.median(values) * 1000:7.1f}ms  '
+                  f'p95 {percentile(values, 0.95) * 1000:7.1f}ms  p99 {percentile(values, 0.99) * 1000:7.1f}ms')
+    return 0 if ok == args.requests else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
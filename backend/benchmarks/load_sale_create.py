@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Load test for concurrent sale creation
+Fires POST /api/sales/ requests from many threads at a running server and reports
+throughput, latency and errors (e.g. "database is locked"). Run it once against a
+server using SQLite and once against one using DATABASE_URL=postgres://... to compare.
+Afterwards the sales it created, and the customers they created, are deleted through the
+API unless --keep is given.
+
+Usage: python benchmarks/load_sale_create.py --url http://localhost:8000 --concurrency 16 --requests 500
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+CUSTOMER_PREFIX = 'Load Test Customer'
+CUSTOMER_COUNT = 50
+
+def make_payload(index, item_count):
+    return json.dumps({
+        'customer_name': f'{CUSTOMER_PREFIX} {index % CUSTOMER_COUNT}',
+        'issuer_name': 'Load Test',
+        'sale_items': [
+            {'product_name': f'Item {i}', 'quantity': (i % 3) + 1, 'price': 1500}
+            for i in range(item_count)
+        ],
+    }).encode('utf-8')
+
+def create_sale(url, index, item_count):
+    request = urllib.request.Request(
+        f'{url}/api/sales/',
+        data=make_payload(index, item_count),
+        headers={'Content-Type': 'application/json'},
+        method='POST',
+    )
+    start = time.perf_counter()
+    sale_id = None
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            sale_id = json.loads(response.read())['id']
+            outcome = str(response.status)
+    except urllib.error.HTTPError as exc:
+        body = exc.read().decode('utf-8', 'replace')
+        outcome = 'locked' if 'database is locked' in body else str(exc.code)
+    except (urllib.error.URLError, TimeoutError) as exc:
+        outcome = type(exc).__name__
+    return outcome, time.perf_counter() - start, sale_id
+
+def load_test_customers(url):
+    """Ids of the customers named like the ones this script creates"""
+    query = quote(CUSTOMER_PREFIX)
+    with urllib.request.urlopen(f'{url}/api/customers/?q={query}&limit=100', timeout=60) as response:
+        return {customer['id'] for customer in json.loads(response.read())
+                if customer['name'].startswith(CUSTOMER_PREFIX)}
+
+def delete(url):
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, method='DELETE'), timeout=60):
+            return True
+    except (urllib.error.URLError, TimeoutError):
+        return False
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--items', type=int, default=5, help='Line items per sale')
+    parser.add_argument('--keep', action='store_true', help='Keep the created sales and customers')
+    args = parser.parse_args()
+    url = args.url.rstrip('/')
+
+    existing_customers = load_test_customers(url)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda i: create_sale(url, i, args.items), range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    outcomes = Counter(outcome for outcome, _, _ in results)
+    latencies = sorted(latency for outcome, latency, _ in results if outcome == '201')
+    print(f'requests     {args.requests} at concurrency {args.concurrency}')
+    print(f'elapsed      {elapsed:.2f}s')
+    print(f'throughput   {outcomes["201"] / elapsed:.1f} sales/s')
+    print(f'outcomes     {dict(outcomes)}')
+    if latencies:
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f'latency      p50 {statistics.median(latencies) * 1000:.1f}ms  p95 {p95 * 1000:.1f}ms')
+
+    if not args.keep:
+        sales = [f'{url}/api/sales/{sale_id}/' for _, _, sale_id in results if sale_id]
+        customers = [f'{url}/api/customers/{customer_id}/'
+                     for customer_id in load_test_customers(url) - existing_customers]
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            deleted = sum(pool.map(delete, sales))
+            deleted_customers = sum(pool.map(delete, customers))
+        print(f'cleanup      deleted {deleted}/{len(sales)} sales, {deleted_customers}/{len(customers)} customers')
+    return 0 if outcomes['201'] == args.requests else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
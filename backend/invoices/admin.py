@@ -1,5 +1,51 @@
 from django.contrib import admin
-from .models import Customer, Product, Sale, SaleItem
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connection
+from django.utils.functional import cached_property
+from .models import Customer, EmailJob, Product, Sale, SaleItem
+
+# Unfiltered changelists of tables estimated above this many rows skip COUNT(*)
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+def estimated_row_count(model):
+    """
+    The planner's row estimate for a model's table, or None when there is none
+    PostgreSQL keeps one in pg_class; SQLite only after ANALYZE has filled sqlite_stat1.
+    """
+    table = model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            elif connection.vendor == 'sqlite':
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            else:
+                return None
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+class EstimatedCountPaginator(Paginator):
+    """Uses the table estimate instead of COUNT(*) for unfiltered lists of large tables"""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model)
+            if estimate is not None and estimate > ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables that grow without bound"""
+    paginator = EstimatedCountPaginator
+    # Filtered lists would otherwise run a second COUNT(*) over the whole table
+    show_full_result_count = False
 
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
@@ -16,10 +62,33 @@ class ProductAdmin(admin.ModelAdmin):
 class SaleItemInline(admin.TabularInline):
     model = SaleItem
     extra = 0
+    # A search box instead of a <select> listing every product on every row
+    autocomplete_fields = ['product']
 
 @admin.register(Sale)
-class SaleAdmin(admin.ModelAdmin):
-    list_display = ['id', 'customer', 'total', 'issuer_name', 'sale_date']
-    list_filter = ['sale_date', 'issuer_name']
-    search_fields = ['customer__name', 'issuer_name']
-    inlines = [SaleItemInline]
\ No newline at end of file
+class SaleAdmin(LargeTableAdmin):
+    # customer_name is stored on the sale, so the list needs no customer join
+    list_display = ['invoice_number', 'customer_name', 'total', 'item_count', 'issuer_name', 'sale_date']
+    list_select_related = []
+    list_filter = ['issuer_name']
+    search_fields = ['customer_name', 'issuer_name']
+    # Drill-down and ordering by sale_date use sale_date_id_idx
+    date_hierarchy = 'sale_date'
+    raw_id_fields = ['customer']
+    inlines = [SaleItemInline]
+
+@admin.register(SaleItem)
+class SaleItemAdmin(LargeTableAdmin):
+    list_display = ['product_name', 'quantity', 'price', 'sale', 'created_at']
+    list_select_related = ['sale']
+    search_fields = ['product_name']
+    raw_id_fields = ['sale']
+    autocomplete_fields = ['product']
+
+@admin.register(EmailJob)
+class EmailJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'sale', 'recipient', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_select_related = ['sale']
+    list_filter = ['status']
+    raw_id_fields = ['sale']
+    readonly_fields = ['last_error']
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class InvoicesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'invoices'
\ No newline at end of file
+    name = 'invoices'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,74 @@
+"""
+Archival of old sales
+archive_sales() moves sales dated before a cutoff day, with their items and finished
+emails, out of the hot Sale/SaleItem/EmailJob tables into ArchivedSale/ArchivedSaleItem/
+ArchivedEmailJob, one batch per transaction, so lists and the admin only ever scan recent
+history. Archived invoices stay readable through invoice_data/ and invoice.pdf/, and
+exports include them.
+
+Each sales database (see invoices.sharding) archives into its own archive tables.
+
+Cutoffs fall on local midnight, so a rollup day is never split between hot and archived
+rows. SalesRollup is left alone: reports keep covering archived history, and
+rollups.rebuild() reads both tables.
+"""
+
+import time
+from datetime import datetime, time as day_start
+from django.db import transaction
+from django.utils import timezone
+from .models import ArchivedEmailJob, ArchivedSale, ArchivedSaleItem, EmailJob, Sale, SaleItem
+from .sharding import sale_databases
+
+SALE_FIELDS = ('id', 'invoice_number', 'customer_id', 'customer_name', 'item_count', 'sale_date', 'total',
+               'issuer_name', 'idempotency_key', 'created_at', 'updated_at')
+ITEM_FIELDS = ('id', 'sale_id', 'product_id', 'product_name', 'quantity', 'price', 'position', 'created_at',
+               'updated_at')
+EMAIL_JOB_FIELDS = ('id', 'sale_id', 'recipient', 'status', 'attempts', 'last_error', 'sent_at', 'created_at',
+                    'updated_at')
+
+def archivable_sales(before, using=None):
+    """Sales dated before the given day, minus any with an email still queued or sending"""
+    cutoff = timezone.make_aware(datetime.combine(before, day_start.min))
+    return Sale.objects.db_manager(using).filter(sale_date__lt=cutoff).exclude(
+        email_jobs__status__in=[EmailJob.PENDING, EmailJob.SENDING]
+    )
+
+def archive_sales(before, batch_size=500, progress=None):
+    """
+    Move sales dated before the given day into the archive tables and return the counts moved
+    progress, if given, is called as progress(done, total, elapsed).
+    """
+    databases = sale_databases()
+    total = sum(archivable_sales(before, using).count() for using in databases)
+    moved = {'sales': 0, 'sale_items': 0, 'email_jobs': 0}
+    started = time.perf_counter()
+
+    for using in databases:
+        queryset = archivable_sales(before, using)
+        while True:
+            with transaction.atomic(using=using):
+                sales = list(queryset.order_by('sale_date', 'id').values(*SALE_FIELDS)[:batch_size])
+                if not sales:
+                    break
+                ids = [sale['id'] for sale in sales]
+                items = list(SaleItem.objects.using(using).filter(sale_id__in=ids).values(*ITEM_FIELDS))
+                jobs = list(EmailJob.objects.using(using).filter(sale_id__in=ids).values(*EMAIL_JOB_FIELDS))
+
+                ArchivedSale.objects.using(using).bulk_create([ArchivedSale(**sale) for sale in sales])
+                ArchivedSaleItem.objects.using(using).bulk_create([ArchivedSaleItem(**item) for item in items])
+                ArchivedEmailJob.objects.using(using).bulk_create([ArchivedEmailJob(**job) for job in jobs])
+
+                # Raw deletes skip the delete signals on purpose: the rollups must keep these
+                # sales, and the cached PDFs stay valid because archived copies hash the same.
+                # Nor do they write change feed tombstones: archived invoices still exist, so
+                # clients that synced them may keep them.
+                for model, lookup in ((EmailJob, 'sale_id__in'), (SaleItem, 'sale_id__in'), (Sale, 'pk__in')):
+                    model.objects.using(using).filter(**{lookup: ids})._raw_delete(using)
+
+            moved['sales'] += len(sales)
+            moved['sale_items'] += len(items)
+            moved['email_jobs'] += len(jobs)
+            if progress is not None:
+                progress(moved['sales'], total, time.perf_counter() - started)
+    return moved
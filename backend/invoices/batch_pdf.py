@@ -0,0 +1,192 @@
+"""
+Batch invoice rendering across a process pool
+ReportLab rendering is CPU bound, so month-end reprints are spread over worker
+processes (settings.INVOICE_RENDER_WORKERS) and streamed out as a ZIP, or rendered
+as one merged multi-page PDF in a worker, off the web process.
+
+The pool is shared by every request of a process and started on first use. Its workers
+come from a fork server (or are spawned where there is none), never forked from the web
+process, so they inherit none of its database connections, locks or threads.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from operator import itemgetter
+import django
+from django.conf import settings
+from django.db import connections
+from .models import Sale
+from .sharding import fetch_all, in_bulk, with_customer
+
+def invoice_filename(sale):
+    return f"{sale.invoice_id}.pdf"
+
+def select_sale_ids(start=None, end=None, ids=None):
+    """Sale ids for a sale_date range [start, end) and/or an explicit id list, oldest first"""
+    sales = Sale.objects.all()
+    if ids:
+        sales = sales.filter(id__in=ids)
+    if start is not None:
+        sales = sales.filter(sale_date__gte=start)
+    if end is not None:
+        sales = sales.filter(sale_date__lt=end)
+    rows = fetch_all(sales.order_by('sale_date', 'id').values_list('sale_date', 'id'), key=itemgetter(0, 1))
+    return [sale_id for _, sale_id in rows]
+
+def load_sales(sale_ids):
+    """Load sales with everything the invoice needs, in the given order"""
+    sales = in_bulk(with_customer(Sale.objects.prefetch_related('sale_items')), sale_ids)
+    return [sales[sale_id] for sale_id in sale_ids if sale_id in sales]
+
+def render_chunk(sale_ids):
+    """Worker task: render a chunk of invoices and return (filename, pdf bytes) pairs"""
+    from .invoice_pdf import get_invoice_pdf
+    
+    try:
+        return [(invoice_filename(sale), get_invoice_pdf(sale)[0]) for sale in load_sales(sale_ids)]
+    finally:
+        connections.close_all()
+
+def render_merged(sale_ids):
+    """Worker task: render all invoices into one multi-page PDF and return its bytes"""
+    from .invoice_pdf import generate_invoices_pdf
+    
+    try:
+        return generate_invoices_pdf(load_sales(sale_ids)).getvalue()
+    finally:
+        connections.close_all()
+
+def render_invoices(sale_ids, workers, chunk_size=20, progress=None):
+    """
+    Yield (filename, pdf bytes) for each sale in order
+    At most two chunks per worker are queued at a time, so one large batch does not hold
+    the shared pool for everyone else. progress, if given, is called with (rendered,
+    total, elapsed seconds) after every chunk.
+    """
+    chunks = iter([sale_ids[i:i + chunk_size] for i in range(0, len(sale_ids), chunk_size)])
+    total = len(sale_ids)
+    rendered = 0
+    start = time.perf_counter()
+    
+    if workers <= 1:
+        results = map(render_chunk, chunks)
+        pending = None
+    else:
+        pool = get_pool(workers)
+        pending = deque(pool.submit(render_chunk, chunk) for chunk in _take(chunks, 2 * workers))
+        results = _in_order(pool, pending, chunks)
+    
+    try:
+        for chunk in results:
+            for item in chunk:
+                yield item
+            rendered += len(chunk)
+            if progress is not None:
+                progress(rendered, total, time.perf_counter() - start)
+    finally:
+        # A client that disconnects leaves its queued chunks unrendered
+        for future in pending or ():
+            future.cancel()
+
+def merged_pdf(sale_ids, workers=None):
+    """Render all invoices into one multi-page PDF, in a pool worker unless workers <= 1"""
+    workers = settings.INVOICE_RENDER_WORKERS if workers is None else workers
+    if workers <= 1:
+        return render_merged(sale_ids)
+    return _result(get_pool(workers).submit(render_merged, sale_ids))
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+def get_pool(workers):
+    """The process-wide render pool, started on first use or when the worker count changes"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            start_methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in start_methods else 'spawn')
+            # Workers start without Django configured; the initializer must not import this
+            # module, whose models cannot load before setup()
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=django.setup)
+            _pool_workers = workers
+        return _pool
+
+def _take(iterator, count):
+    return [item for _, item in zip(range(count), iterator)]
+
+def _in_order(pool, pending, chunks):
+    """Results of pending futures in order, submitting the next chunk as each one finishes"""
+    while pending:
+        chunk = _result(pending.popleft())
+        for next_chunk in _take(chunks, 1):
+            pending.append(pool.submit(render_chunk, next_chunk))
+        yield chunk
+
+def _result(future):
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        # A worker died (killed, out of memory); start a new pool on the next request
+        _discard_pool()
+        raise
+
+def _discard_pool():
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+def _reset_after_fork():
+    # A forked web worker (gunicorn --preload) must start its own pool
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def stream_zip(rendered):
+    """Yield a ZIP archive of (filename, pdf bytes) pairs as it is written"""
+    buffer = _StreamBuffer()
+    seen = set()
+    # PDFs are already compressed, so store them as-is
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for filename, pdf in rendered:
+            filename = _unique(filename, seen)
+            archive.writestr(filename, pdf)
+            yield buffer.drain()
+    yield buffer.drain()
+
+def _unique(filename, seen):
+    name, counter = filename, 1
+    while name in seen:
+        counter += 1
+        name = filename.replace('.pdf', f'-{counter}.pdf')
+    seen.add(name)
+    return name
+
+class _StreamBuffer:
+    """Write-only file object; zipfile handles the missing seek/tell"""
+    
+    def __init__(self):
+        self.parts = []
+    
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
@@ -0,0 +1,173 @@
+"""
+Bulk sales import for offline tills replaying queued sales
+"""
+
+from django.conf import settings
+from django.db import IntegrityError
+from . import changes
+from .catalog_cache import invalidate
+from .invoice_numbers import allocate_invoice_numbers, next_invoice_number
+from .models import ArchivedSale, Change, Customer, Sale, SaleItem, normalize_customer_name
+from .rollups import record_items
+from .serializers import SaleImportSerializer, build_sale_items
+from .sharding import fan_out, sales_atomic, shard_for_issuer
+
+CREATED = 'created'
+DUPLICATE = 'duplicate'
+ERROR = 'error'
+
+def import_sales(records, chunk_size=None):
+    """Import a list of sale payloads and return one result per record"""
+    chunk_size = chunk_size or settings.SALES_IMPORT_CHUNK_SIZE
+    results = [None] * len(records)
+    pending = []
+    
+    # Validate every record up front
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            results[index] = {'index': index, 'status': ERROR, 'errors': {'non_field_errors': ['Expected an object']}}
+            continue
+        serializer = SaleImportSerializer(data=record)
+        if serializer.is_valid():
+            pending.append((index, dict(serializer.validated_data)))
+        else:
+            results[index] = {'index': index, 'status': ERROR, 'errors': serializer.errors}
+    
+    pending = _skip_duplicates(pending, results)
+    customers = _resolve_customers({data['customer_name'] for _, data in pending})
+    
+    for start in range(0, len(pending), chunk_size):
+        for using, chunk in _by_shard(pending[start:start + chunk_size]).items():
+            try:
+                _insert_chunk(chunk, customers, results, using)
+            except IntegrityError:
+                # Another upload raced us on an idempotency key, fall back to one record at a time
+                for entry in chunk:
+                    _insert_one(entry, customers, results, using)
+    
+    return results
+
+def summarize(results):
+    """Count results by status"""
+    summary = {CREATED: 0, DUPLICATE: 0, ERROR: 0}
+    for result in results:
+        summary[result['status']] += 1
+    return summary
+
+def _skip_duplicates(pending, results):
+    """Mark records whose idempotency key was already imported or repeats in this batch"""
+    keys = [data['idempotency_key'] for _, data in pending if data.get('idempotency_key')]
+    existing = {}
+    if keys:
+        # Archived sales keep their keys, so an old upload replayed late is still a duplicate
+        def find(using):
+            return [
+                row for model in (Sale, ArchivedSale)
+                for row in model.objects.using(using).filter(idempotency_key__in=keys).values_list('idempotency_key', 'id')
+            ]
+        for rows in fan_out(find):
+            existing.update(rows)
+    
+    seen = {}
+    remaining = []
+    for index, data in pending:
+        key = data.get('idempotency_key')
+        if key in existing:
+            results[index] = {'index': index, 'status': DUPLICATE, 'id': str(existing[key])}
+        elif key and key in seen:
+            results[index] = {'index': index, 'status': DUPLICATE, 'duplicate_of': seen[key]}
+        else:
+            if key:
+                seen[key] = index
+            remaining.append((index, data))
+    return remaining
+
+def _resolve_customers(names):
+    """Map customer names to customers with one lookup and, for new customers, one bulk insert"""
+    if not names:
+        return {}
+    
+    keys = {name: normalize_customer_name(name) for name in names}
+    by_key = {customer.name_key: customer for customer in Customer.objects.filter(name_key__in=set(keys.values()))}
+    
+    missing = {}
+    for name, key in keys.items():
+        if key not in by_key:
+            missing.setdefault(key, Customer(name=name.strip(), name_key=key))
+    if missing:
+        # A concurrent import or sale may create some of them first; read back the winners
+        Customer.objects.bulk_create(missing.values(), ignore_conflicts=True)
+        created = {customer.name_key: customer for customer in Customer.objects.filter(name_key__in=list(missing))}
+        by_key.update(created)
+        # Includes any a concurrent writer created; a repeated 'created' change is harmless
+        changes.record(Customer, [customer.pk for customer in created.values()], Change.CREATED)
+        # bulk_create skips post_save, so drop cached customer lists here
+        invalidate(Customer._meta.model_name)
+    return {name: by_key[key] for name, key in keys.items()}
+
+def _build_sale(data, customers):
+    customer = customers[data['customer_name']]
+    sale = Sale(
+        customer=customer,
+        customer_name=customer.name,
+        issuer_name=data['issuer_name'],
+        idempotency_key=data.get('idempotency_key'),
+    )
+    sale_items, sale.total = build_sale_items(sale, data['sale_items'])
+    sale.item_count = len(sale_items)
+    return sale, sale_items
+
+def _by_shard(chunk):
+    """Split records by the database their sales go to, keeping their order"""
+    shards = {}
+    for entry in chunk:
+        shards.setdefault(shard_for_issuer(entry[1]['issuer_name']), []).append(entry)
+    return shards
+
+def _insert_chunk(chunk, customers, results, using):
+    sales = []
+    sale_items = []
+    for (_, data), invoice_number in zip(chunk, allocate_invoice_numbers(len(chunk))):
+        sale, items = _build_sale(data, customers)
+        sale.invoice_number = invoice_number
+        sales.append(sale)
+        sale_items.extend(items)
+    
+    with sales_atomic(using):
+        Sale.objects.using(using).bulk_create(sales)
+        SaleItem.objects.using(using).bulk_create(sale_items)
+        record_items(sale_items, using)
+        changes.record(Sale, [sale.pk for sale in sales], Change.CREATED)
+        changes.record(SaleItem, [item.pk for item in sale_items], Change.CREATED)
+    
+    for (index, _), sale in zip(chunk, sales):
+        results[index] = {'index': index, 'status': CREATED, 'id': str(sale.id)}
+
+def _insert_one(entry, customers, results, using):
+    index, data = entry
+    sale, sale_items = _build_sale(data, customers)
+    sale.invoice_number = next_invoice_number()
+    try:
+        with sales_atomic(using):
+            sale.save(force_insert=True, using=using)
+            SaleItem.objects.using(using).bulk_create(sale_items)
+            record_items(sale_items, using)
+            changes.record(SaleItem, [item.pk for item in sale_items], Change.CREATED)
+    except IntegrityError as exc:
+        existing = _imported_id(data.get('idempotency_key'), using)
+        if existing:
+            results[index] = {'index': index, 'status': DUPLICATE, 'id': str(existing)}
+        else:
+            results[index] = {'index': index, 'status': ERROR, 'errors': {'non_field_errors': [str(exc)]}}
+        return
+    results[index] = {'index': index, 'status': CREATED, 'id': str(sale.id)}
+
+def _imported_id(key, using):
+    """Id of the live or archived sale already imported with this idempotency key, if any"""
+    if not key:
+        return None
+    for model in (Sale, ArchivedSale):
+        existing = model.objects.using(using).filter(idempotency_key=key).values_list('id', flat=True).first()
+        if existing:
+            return existing
+    return None
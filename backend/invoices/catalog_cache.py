@@ -0,0 +1,119 @@
+"""
+Read-through cache for the product and customer catalog endpoints
+Responses are cached in settings.CACHES['catalog'] under a version token per model
+(for lists) and per object (for retrieves). Signals in invoices.signals replace the
+tokens when a Product or Customer changes, which orphans exactly the affected entries.
+Tokens expire with the responses they key, so scopes nobody reads again do not pile up.
+The ETag is a hash of the response body, stored next to it, and the token's timestamp is
+Last-Modified.
+"""
+
+import hashlib
+import json
+import time
+import uuid
+from django.core.cache import caches
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from .metrics import registry
+
+CACHE_ALIAS = 'catalog'
+CACHE_TIMEOUT = 60 * 60
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+def _version_key(scope):
+    return f'catalog:version:{scope}'
+
+def get_version(scope):
+    """Return (token, last modified unix time) for a scope, creating it if missing"""
+    cache = get_cache()
+    version = cache.get(_version_key(scope))
+    if version is None:
+        version = (uuid.uuid4().hex, int(time.time()))
+        if not cache.add(_version_key(scope), version, CACHE_TIMEOUT):
+            version = cache.get(_version_key(scope), version)
+    return version
+
+def bump_version(scope):
+    get_cache().set(_version_key(scope), (uuid.uuid4().hex, int(time.time())), CACHE_TIMEOUT)
+
+def invalidate(model_name, pk=None):
+    """Drop cached lists of a model and, if given, the cached detail of one object"""
+    bump_version(f'{model_name}:list')
+    if pk is not None:
+        bump_version(f'{model_name}:{pk}')
+
+def body_etag(data):
+    """Strong ETag of response data, the same for the same body whichever token cached it"""
+    body = json.dumps(data, cls=JSONEncoder, sort_keys=True, separators=(',', ':'))
+    return '"%s"' % hashlib.md5(body.encode('utf-8')).hexdigest()
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match check using weak comparison, so W/ tags from compressed responses still match"""
+    if if_none_match.strip() == '*':
+        return True
+    return etag.removeprefix('W/') in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+
+class CachedCatalogMixin:
+    """Serve list and retrieve through the catalog cache with conditional GET support"""
+    
+    def list(self, request, *args, **kwargs):
+        scope = f'{self.cache_name()}:list'
+        return self.cached_response(request, scope, lambda: super(CachedCatalogMixin, self).list(request, *args, **kwargs))
+    
+    def retrieve(self, request, *args, **kwargs):
+        # Keyed by the canonical id that invalidate() bumps, however the URL spells it
+        try:
+            pk = uuid.UUID(str(kwargs[self.lookup_url_kwarg or self.lookup_field]))
+        except ValueError:
+            raise NotFound()
+        scope = f'{self.cache_name()}:{pk}'
+        return self.cached_response(request, scope, lambda: super(CachedCatalogMixin, self).retrieve(request, *args, **kwargs))
+    
+    def cache_name(self):
+        return self.queryset.model._meta.model_name
+    
+    def cached_response(self, request, scope, build):
+        token, last_modified = get_version(scope)
+        query = '&'.join(sorted(request.GET.urlencode().split('&')))
+        key = hashlib.md5(f'{scope}:{token}:{query}'.encode('utf-8')).hexdigest()
+        
+        cache = get_cache()
+        cached = cache.get(f'catalog:response:{key}')
+        if cached is not None:
+            data, etag = cached
+            headers = self.cache_headers(etag, last_modified)
+            if self.not_modified(request, etag, last_modified):
+                registry.record_cache(CACHE_ALIAS, 'not_modified')
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+            registry.record_cache(CACHE_ALIAS, 'hit')
+            return Response(data, headers=headers)
+        
+        registry.record_cache(CACHE_ALIAS, 'miss')
+        response = build()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        etag = body_etag(response.data)
+        cache.set(f'catalog:response:{key}', (response.data, etag), CACHE_TIMEOUT)
+        headers = self.cache_headers(etag, last_modified)
+        if self.not_modified(request, etag, last_modified):
+            # The client already holds this body, e.g. after the cache was cleared
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        for header, value in headers.items():
+            response[header] = value
+        return response
+    
+    def cache_headers(self, etag, last_modified):
+        return {'ETag': etag, 'Last-Modified': http_date(last_modified), 'Cache-Control': 'private, no-cache'}
+    
+    def not_modified(self, request, etag, last_modified):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return etag_matches(if_none_match, etag)
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return if_modified_since is not None and last_modified <= if_modified_since
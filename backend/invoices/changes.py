@@ -0,0 +1,113 @@
+"""
+Change feed
+Every create, update and delete of a customer, product, sale or sale item appends a
+Change row. Saves and deletes are recorded by the receivers in invoices.signals; paths
+that bypass signals (bulk_create, queryset update()) call record() themselves. Clients
+keep a cursor and fetch what changed after it from GET /api/changes/, which collapses
+the changes to one entry per object, or follow new sales live on GET /api/sales/stream/.
+
+Changes are kept for CHANGES_RETENTION_DAYS (see prune). A cursor older than that may
+have missed changes that were pruned, so the API answers 410 Gone and the client reloads
+the full lists.
+"""
+
+import base64
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Max
+from django.utils import timezone
+from .models import Change, Customer, Product, Sale, SaleItem
+
+SYNCED_MODELS = {model._meta.model_name: model for model in (Customer, Product, Sale, SaleItem)}
+
+def record(model, ids, action):
+    """Append a change with the given action for each id of model"""
+    if not ids:
+        return
+    name = model._meta.model_name
+    now = timezone.now()
+    Change.objects.bulk_create([Change(model=name, object_id=pk, action=action, changed_at=now) for pk in ids])
+
+def encode_cursor(change_id, issued_at=None):
+    """Cursor for the changes after change_id, as read at issued_at (now by default)"""
+    issued_at = issued_at or timezone.now()
+    payload = json.dumps([change_id, int(issued_at.timestamp())])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """(change id, issued at) of a cursor; raises ValueError if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        change_id, issued = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        change_id, issued_at = int(change_id), datetime.fromtimestamp(int(issued), tz=dt_timezone.utc)
+    except (TypeError, ValueError, UnicodeError, OverflowError, OSError):
+        raise ValueError('Invalid cursor')
+    if change_id < 0:
+        raise ValueError('Invalid cursor')
+    return change_id, issued_at
+
+def expired(issued_at):
+    """Whether changes a cursor issued at issued_at has not seen may have been pruned"""
+    return issued_at < timezone.now() - timedelta(days=settings.CHANGES_RETENTION_DAYS)
+
+def head_id():
+    """Id of the newest change a client that has just loaded everything can skip"""
+    changes = Change.objects.all()
+    if not _serializes_writers():
+        # Lower ids may still be uncommitted; reading a few seconds twice is harmless
+        changes = changes.filter(changed_at__lt=_gap_cutoff())
+    return changes.aggregate(head=Max('id'))['head'] or 0
+
+def read_changes(after, limit):
+    """Up to limit changes with ids after `after`, in order, and whether more may follow"""
+    changes = list(Change.objects.filter(id__gt=after).order_by('id')[:limit + 1])
+    more = len(changes) > limit
+    changes = changes[:limit]
+    if not _serializes_writers():
+        visible = _before_gap(after, changes)
+        more = more or len(visible) < len(changes)
+        changes = visible
+    return changes, more
+
+def collapse(changes):
+    """
+    One (model, object id, action) per object in changes, ordered by its last change
+    An object created and then updated is still reported as created.
+    """
+    latest = {}
+    for change in changes:
+        key = (change.model, change.object_id)
+        action = change.action
+        if latest.pop(key, None) == Change.CREATED and action == Change.UPDATED:
+            action = Change.CREATED
+        latest[key] = action
+    return [(model, object_id, action) for (model, object_id), action in latest.items()]
+
+def prune(before):
+    """Delete changes made before `before`; returns the number deleted"""
+    deleted, _ = Change.objects.filter(changed_at__lt=before).delete()
+    return deleted
+
+def _serializes_writers():
+    # SQLite commits one write transaction at a time, so ids become visible in order
+    return connections[router.db_for_read(Change)].vendor == 'sqlite'
+
+def _gap_cutoff():
+    return timezone.now() - timedelta(seconds=settings.CHANGES_GAP_TIMEOUT)
+
+def _before_gap(after, changes):
+    """
+    The changes up to the first recent gap in their ids
+    Ids are taken when a row is inserted but only seen once its transaction commits, so a
+    missing id can be a change that is about to appear. Stepping past it would skip that
+    change for good; an old gap is a rolled back insert and is passed over.
+    """
+    cutoff = _gap_cutoff()
+    expected = after + 1
+    for index, change in enumerate(changes):
+        if change.id != expected and change.changed_at > cutoff:
+            return changes[:index]
+        expected = change.id + 1
+    return changes
@@ -0,0 +1,19 @@
+"""
+System checks for the settings the invoices app relies on
+Run with python manage.py check (--deploy for the production-only ones).
+"""
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+@register(Tags.caches, deploy=True)
+def check_catalog_cache(app_configs, **kwargs):
+    """The local-memory catalog cache is only invalidated in the process that saved a change"""
+    if not settings.CACHES['catalog']['BACKEND'].endswith('.LocMemCache'):
+        return []
+    return [Warning(
+        'The catalog cache is local to each process.',
+        hint='Other workers keep serving cached products and customers until CACHE_TIMEOUT; set '
+             'CATALOG_CACHE_URL or CATALOG_CACHE_DIR when running more than one worker.',
+        id='invoices.W001',
+    )]
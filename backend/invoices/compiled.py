@@ -0,0 +1,165 @@
+"""
+Compiled read-only serializer output
+DRF's Serializer.to_representation walks the fields of every instance it renders:
+it resolves each source, checks for None and dispatches to the field. On large sale
+lists that walk costs more than the query. CompiledRepresentationMixin instead
+generates one function per serializer class and field set, the first time it is
+needed, which reads the attributes and converts the values in straight-line code.
+
+The output is the same as DRF's. A serializer with a field that has no safe compiled
+form (method fields, hyperlinks, dotted sources, ...) keeps using DRF's path.
+"""
+
+import copy
+import keyword
+from collections.abc import Mapping
+from datetime import datetime
+from decimal import Decimal
+from django.conf import settings
+from django.db.models.manager import BaseManager
+from django.utils import timezone
+from rest_framework import ISO_8601
+from rest_framework import fields as drf_fields
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, RelatedField
+from rest_framework.serializers import BaseSerializer, ListSerializer
+from rest_framework.settings import api_settings
+
+_compiled = {}
+_identity = object()
+
+def compile_representation(serializer, mapping=False):
+    """
+    Return a function represent(instance, tz) rendering one instance the way
+    serializer.to_representation does in the current timezone tz, or None when the
+    serializer cannot be compiled. With mapping=True it reads dict rows, such as
+    values() results.
+    """
+    fields = [field for field in serializer.fields.values() if not field.write_only]
+    key = (type(serializer), tuple(field.field_name for field in fields), mapping)
+    if key not in _compiled:
+        _compiled[key] = _generate(serializer, fields, mapping)
+    return _compiled[key]
+
+class CompiledRepresentationMixin:
+    """Render instances through compile_representation() when the serializer allows it"""
+
+    def to_representation(self, instance):
+        try:
+            represent = self._represent
+        except AttributeError:
+            represent = self._represent = compile_representation(self, isinstance(instance, Mapping))
+        if represent is None:
+            return super().to_representation(instance)
+        # Looked up once per instance rather than per datetime; it is a context-local read
+        return represent(instance, timezone.get_current_timezone())
+
+def _generate(serializer, fields, mapping):
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    if model is None and not mapping:
+        return None
+
+    namespace = {}
+    reads, items = [], []
+    for index, field in enumerate(fields):
+        read = _read(field, model, mapping)
+        converter = _converter(field)
+        if read is None or converter is None:
+            return None
+        value = f'v{index}'
+        reads.append(f'    {value} = {read}')
+        if converter is _identity:
+            items.append(f'{field.field_name!r}: {value}')
+        else:
+            convert, needs_tz = converter
+            namespace[f'c{index}'] = convert
+            call = f'c{index}({value}, tz)' if needs_tz else f'c{index}({value})'
+            items.append(f'{field.field_name!r}: None if {value} is None else {call}')
+
+    source = 'def represent(instance, tz):\n' + ''.join(f'{line}\n' for line in reads)
+    source += '    return {' + ', '.join(items) + '}\n'
+    exec(compile(source, f'<compiled {type(serializer).__name__}>', 'exec'), namespace)
+    return namespace['represent']
+
+def _read(field, model, mapping):
+    """Source expression for a field's value on `instance`"""
+    attrs = field.source_attrs
+    if len(attrs) != 1 or not attrs[0].isidentifier() or keyword.iskeyword(attrs[0]):
+        return None
+    attr = attrs[0]
+    if mapping:
+        if isinstance(field, (RelatedField, ManyRelatedField, BaseSerializer)):
+            return None
+        return f'instance[{attr!r}]'
+    # DRF calls methods named as sources; only plain attributes are compiled
+    if callable(getattr(model, attr, None)):
+        return None
+    if isinstance(field, PrimaryKeyRelatedField):
+        # Read the foreign key column instead of loading the related object
+        model_field = next((f for f in model._meta.concrete_fields if f.name == attr and f.is_relation), None)
+        return None if model_field is None else f'instance.{model_field.attname}'
+    return f'instance.{attr}'
+
+def _uses(field, base):
+    return isinstance(field, base) and type(field).to_representation is base.to_representation
+
+def _converter(field):
+    """
+    (function, needs_tz) converting a non-None value, where needs_tz means it is called
+    as function(value, tz); _identity; or None when the field is not compilable
+    """
+    if isinstance(field, ListSerializer):
+        child = compile_representation(field.child)
+        if child is None:
+            return None
+        return lambda value, tz: [
+            child(item, tz) for item in (value.all() if isinstance(value, BaseManager) else value)
+        ], True
+    if isinstance(field, BaseSerializer):
+        child = compile_representation(field)
+        return None if child is None else (child, True)
+    if isinstance(field, PrimaryKeyRelatedField):
+        return _identity if field.pk_field is None else None
+    if isinstance(field, (RelatedField, ManyRelatedField, drf_fields.SerializerMethodField, drf_fields.HiddenField)):
+        return None
+    if _uses(field, drf_fields.ReadOnlyField):
+        return _identity
+    if _uses(field, drf_fields.CharField):
+        return str, False
+    if _uses(field, drf_fields.IntegerField):
+        return int, False
+    if _uses(field, drf_fields.UUIDField) and field.uuid_format == 'hex_verbose':
+        return str, False
+    if _uses(field, drf_fields.DecimalField):
+        return _decimal_converter(field), False
+    if _uses(field, drf_fields.DateTimeField):
+        return _datetime_converter(field), True
+    # An unbound copy, so compiled functions never keep a request's serializer alive
+    return copy.deepcopy(field).to_representation, False
+
+def _decimal_converter(field):
+    fallback = copy.deepcopy(field).to_representation
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.decimal_places is None:
+        return fallback
+    exponent = -field.decimal_places
+
+    def decimal(value):
+        # Database values already carry the field's decimal places, so quantizing is a no-op
+        if isinstance(value, Decimal) and value.as_tuple().exponent == exponent:
+            return format(value, 'f')
+        return fallback(value)
+    return decimal
+
+def _datetime_converter(field):
+    to_representation = copy.deepcopy(field).to_representation
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if not settings.USE_TZ or hasattr(field, 'timezone') or not isinstance(output_format, str) \
+            or output_format.lower() != ISO_8601:
+        return lambda value, tz: to_representation(value)
+
+    def iso_datetime(value, tz):
+        if isinstance(value, datetime) and value.utcoffset() is not None:
+            text = value.astimezone(tz).isoformat()
+            return text[:-6] + 'Z' if text.endswith('+00:00') else text
+        return to_representation(value)
+    return iso_datetime
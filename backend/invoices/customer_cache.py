@@ -0,0 +1,109 @@
+"""
+In-process cache resolving sale customer names to customers
+Every sale names its customer, and most sales come from a small set of regulars, so a
+bounded LRU keyed on the normalized name saves the lookup on each create. Entries hold
+field values rather than model instances, so threads never share a Customer object.
+Signals in invoices.signals evict a customer when it is saved or deleted in this
+process; entries also expire after settings.CUSTOMER_CACHE_TTL so changes made by
+other processes are picked up. Until then resolve_customer() re-checks a cached customer
+inside the sale's transaction, so a sale never points at one deleted elsewhere.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.db import router, transaction
+from .models import Customer, normalize_customer_name
+
+FIELD_NAMES = [field.attname for field in Customer._meta.concrete_fields]
+_ID = FIELD_NAMES.index(Customer._meta.pk.attname)
+
+class CustomerCache:
+    """LRU of normalized name -> customer field values, with a reverse index for eviction by id"""
+    
+    def __init__(self, max_entries=10000, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_id = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            values, expires = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+        return Customer.from_db(router.db_for_read(Customer), FIELD_NAMES, values)
+    
+    def set(self, customer):
+        if not self.max_entries:
+            return
+        values = tuple(getattr(customer, name) for name in FIELD_NAMES)
+        with self._lock:
+            self._remove(customer.name_key)
+            # The same customer cached under an older name
+            self._remove(self._keys_by_id.get(customer.pk))
+            self._entries[customer.name_key] = (values, time.monotonic() + self.ttl)
+            self._keys_by_id[customer.pk] = customer.name_key
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+    
+    def invalidate(self, customer_id):
+        with self._lock:
+            key = self._keys_by_id.get(customer_id)
+            if key is not None:
+                self._remove(key)
+    
+    def discard(self, key):
+        with self._lock:
+            self._remove(key)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_id.clear()
+    
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None and self._keys_by_id.get(entry[0][_ID]) == key:
+            del self._keys_by_id[entry[0][_ID]]
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_customer_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CustomerCache(settings.CUSTOMER_CACHE_SIZE, settings.CUSTOMER_CACHE_TTL)
+    return _cache
+
+def resolve_customer(name):
+    """
+    Return the customer for a sale's customer_name, creating it if needed
+    Call it inside the sale's transaction. The customer row is locked until that commits,
+    so a concurrent delete waits and then clears the new sale too (see
+    invoices.signals.clear_customer_sales). A cached customer that was deleted or renamed
+    elsewhere fails the locked lookup and is resolved again. The unique name_key makes
+    concurrent creates of the same customer safe: the loser of the race gets IntegrityError
+    inside get_or_create, which then reads the winner's row.
+    """
+    key = normalize_customer_name(name)
+    cache = get_customer_cache()
+    customers = Customer.objects.select_for_update(no_key=True)
+    customer = cache.get(key)
+    if customer is not None:
+        if customers.filter(pk=customer.pk, name_key=key).exists():
+            return customer
+        cache.discard(key)
+    customer, _ = customers.get_or_create(name_key=key, defaults={'name': name.strip()})
+    # A customer created in a transaction that rolls back must not be cached
+    transaction.on_commit(lambda: cache.set(customer))
+    return customer
@@ -0,0 +1,87 @@
+"""
+Streaming sales ledger export
+Rows come from values_list() over SaleItem joined to its sale, and over ArchivedSaleItem
+for archived history, and are read with iterator(), so memory stays flat no matter how
+many rows are exported. Each table of each sales database is streamed on its own and the
+rows are merged by sale date.
+"""
+
+import csv
+import heapq
+import json
+from operator import itemgetter
+from .models import ArchivedSaleItem, SaleItem
+from .sharding import sale_databases
+
+EXPORT_COLUMNS = [
+    ('sale_id', 'sale_id'),
+    ('sale_date', 'sale__sale_date'),
+    ('customer_name', 'sale__customer_name'),
+    ('issuer_name', 'sale__issuer_name'),
+    ('sale_total', 'sale__total'),
+    ('product_name', 'product_name'),
+    ('quantity', 'quantity'),
+    ('price', 'price'),
+]
+CHUNK_SIZE = 2000
+
+def export_rows(start=None, end=None, chunk_size=CHUNK_SIZE):
+    """Yield one tuple per sale line item, live or archived, ordered by sale date"""
+    fields = [lookup for _, lookup in EXPORT_COLUMNS]
+    streams = []
+    for model in (SaleItem, ArchivedSaleItem):
+        items = model.objects.all()
+        if start is not None:
+            items = items.filter(sale__sale_date__gte=start)
+        if end is not None:
+            items = items.filter(sale__sale_date__lt=end)
+        items = items.order_by('sale__sale_date', 'sale_id', 'created_at', 'position', 'id').values_list(*fields)
+        streams.extend(items.using(using).iterator(chunk_size=chunk_size) for using in sale_databases())
+    # A sale's items all come from one table of one database, so they stay together and in order
+    rows = heapq.merge(*streams, key=itemgetter(1, 0))
+    for row in rows:
+        yield [_plain(value) for value in row]
+
+def stream_csv(rows, batch_size=500):
+    """Encode rows as CSV, yielding a few hundred rows per chunk"""
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % batch_size == 0:
+            yield buffer.drain()
+    yield buffer.drain()
+
+def stream_ndjson(rows, batch_size=500):
+    """Encode rows as one JSON object per line"""
+    names = [name for name, _ in EXPORT_COLUMNS]
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(names, row)), ensure_ascii=False))
+        if len(lines) >= batch_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+def _plain(value):
+    if value is None or isinstance(value, (int, str)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+class _LineBuffer:
+    """File-like object that collects what csv.writer writes"""
+    
+    def __init__(self):
+        self.parts = []
+    
+    def write(self, value):
+        self.parts.append(value)
+    
+    def drain(self):
+        data = ''.join(self.parts)
+        self.parts = []
+        return data
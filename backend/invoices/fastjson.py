@@ -0,0 +1,46 @@
+"""
+JSON encoding and decoding for the API
+Uses orjson when it is installed (see requirements.txt) and the standard library
+otherwise. Both produce the same bytes as DRF's compact JSONRenderer: UTF-8, no
+whitespace, and values orjson has no native support for (Decimal, lazy strings,
+querysets) converted by DRF's JSONEncoder.
+"""
+
+import json
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+_encoder = JSONEncoder()
+_line_separators = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+def _escape_line_separators(content):
+    # DRF escapes these so responses can be embedded in <script> tags
+    for raw, escaped in _line_separators:
+        if raw in content:
+            content = content.replace(raw, escaped)
+    return content
+
+if orjson is not None:
+    _options = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+    def dumps(data):
+        return _escape_line_separators(orjson.dumps(data, default=_encoder.default, option=_options))
+
+    def loads(content):
+        return orjson.loads(content)
+else:
+    def dumps(data):
+        content = json.dumps(data, cls=JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+        return _escape_line_separators(content.encode('utf-8'))
+
+    def loads(content):
+        if isinstance(content, bytes):
+            content = content.decode('utf-8')
+        return json.loads(content, parse_constant=_reject_constant)
+
+def _reject_constant(name):
+    raise ValueError(f'Out of range float values are not JSON compliant: {name!r}')
@@ -0,0 +1,100 @@
+"""
+Sequential invoice numbers, allocated in blocks
+Each process reserves settings.INVOICE_NUMBER_BLOCK_SIZE numbers at a time from its
+InvoiceSequence row (hi/lo style) and hands them out from memory, so concurrent sale
+creation only touches the counter row once per block instead of once per sale.
+
+Numbers are unique across processes and increase within each one. A process that
+exits leaves the rest of its block unused, and a sale that fails after taking a number
+leaves that number unused, so the sequence can have gaps between blocks.
+"""
+
+import os
+import re
+import threading
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import F
+from .models import InvoiceSequence
+
+SEQUENCE_NAME = 'invoice'
+
+INVOICE_NUMBER_RE = re.compile(r'^(?:INV-?)?0*(\d{1,18})$', re.IGNORECASE)
+
+def parse_invoice_number(value):
+    """The number in 'INV-000042', 'inv-42' or '42', or None if the value is not one"""
+    match = INVOICE_NUMBER_RE.match(value.strip())
+    return int(match.group(1)) if match else None
+
+def reserve(name, count):
+    """Reserve count consecutive values of a sequence and return the first"""
+    using = router.db_for_write(InvoiceSequence)
+    sequence = InvoiceSequence.objects.using(using).filter(name=name)
+    with transaction.atomic(using=using):
+        # The update locks the row until commit, so the read below sees only our increment
+        if not sequence.update(next_value=F('next_value') + count):
+            InvoiceSequence.objects.using(using).get_or_create(name=name)
+            sequence.update(next_value=F('next_value') + count)
+        end = sequence.values_list('next_value', flat=True).get()
+    return end - count
+
+class BlockAllocator:
+    """Hands out numbers from a block of a sequence reserved by this process"""
+
+    def __init__(self, name=SEQUENCE_NAME, block_size=100):
+        self.name = name
+        self.block_size = block_size
+        self._next = self._end = 0
+        self._lock = threading.Lock()
+
+    def allocate(self, count=1):
+        """Return a list of count unused numbers"""
+        if transaction.get_connection(router.db_for_write(InvoiceSequence)).in_atomic_block:
+            # A block reserved inside the caller's transaction is released again if that
+            # transaction rolls back, so keeping its remainder here could hand out numbers
+            # another process reserves later. Reserve exactly what is needed instead.
+            start = reserve(self.name, count)
+            return list(range(start, start + count))
+
+        numbers = []
+        with self._lock:
+            while len(numbers) < count:
+                if self._next >= self._end:
+                    size = max(self.block_size, count - len(numbers))
+                    self._next = reserve(self.name, size)
+                    self._end = self._next + size
+                take = min(count - len(numbers), self._end - self._next)
+                numbers.extend(range(self._next, self._next + take))
+                self._next += take
+        return numbers
+
+    def reset(self):
+        """Drop the current block; the unused numbers in it are skipped"""
+        with self._lock:
+            self._next = self._end = 0
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+def get_allocator():
+    global _allocator
+    if _allocator is None:
+        with _allocator_lock:
+            if _allocator is None:
+                _allocator = BlockAllocator(SEQUENCE_NAME, settings.INVOICE_NUMBER_BLOCK_SIZE)
+    return _allocator
+
+def _reset_after_fork():
+    # A forked worker (gunicorn --preload) must not reuse its parent's block
+    if _allocator is not None:
+        _allocator._lock = threading.Lock()
+        _allocator.reset()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def allocate_invoice_numbers(count):
+    return get_allocator().allocate(count)
+
+def next_invoice_number():
+    return get_allocator().allocate(1)[0]
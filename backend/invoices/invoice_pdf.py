@@ -0,0 +1,220 @@
+"""
+Invoice PDF rendering
+The layout is compiled once per process into an InvoiceTemplate holding the styles,
+the static header/footer flowables and the table definitions. Rendering a sale only
+builds the two tables that carry its data.
+
+Importing ReportLab takes about as long as the rest of the API, so callers import this
+module where they render, not at the top of theirs. Worker processes then start without it
+and load it on their first invoice, or share the copy warm_up() loaded before they forked.
+"""
+
+import copy
+import io
+import threading
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+from .metrics import span
+from .pdf_cache import get_pdf_cache, invoice_content_hash
+
+BRAND_BLUE = colors.HexColor('#2196F3')
+
+class InvoiceTemplate:
+    """Precompiled invoice layout, safe to share between threads"""
+    
+    details_col_widths = [1*inch, 2*inch, 1*inch, 2*inch]
+    items_col_widths = [3*inch, 1*inch, 1.5*inch, 1.5*inch]
+    items_header = ['PRODUCT', 'QUANTITY', 'PRICE (₦)', 'TOTAL (₦)']
+    
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        
+        # Company header
+        company_style = ParagraphStyle(
+            'CompanyHeader',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=BRAND_BLUE,
+            alignment=1,  # Center
+            spaceAfter=12
+        )
+        
+        # Company details
+        company_details = ParagraphStyle(
+            'CompanyDetails',
+            parent=styles['Normal'],
+            fontSize=10,
+            alignment=1,  # Center
+            spaceAfter=20
+        )
+        
+        # Invoice title
+        invoice_style = ParagraphStyle(
+            'InvoiceTitle',
+            parent=styles['Heading1'],
+            fontSize=36,
+            textColor=BRAND_BLUE,
+            alignment=2,  # Right
+            spaceAfter=20
+        )
+        
+        # Footer
+        footer_style = ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=11,
+            alignment=1,  # Center
+            backColor=BRAND_BLUE,
+            textColor=colors.whitesmoke,
+            borderPadding=10
+        )
+        
+        # Paragraph markup is parsed here, once; renders take shallow copies
+        self.header = [
+            Paragraph("YAROTECH NETWORK LIMITED", company_style),
+            Paragraph(
+                "No. 122 Lukoro Plaza A, Farm Center, Kano State<br/>"
+                "Email: info@yarotech.com.ng",
+                company_details
+            ),
+            Paragraph("INVOICE", invoice_style),
+        ]
+        self.footer = [
+            Paragraph(
+                "Thank you for your business with YAROTECH Network Limited!",
+                footer_style
+            ),
+        ]
+        
+        self.details_style = TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 0),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+        ])
+        
+        self.items_style = TableStyle([
+            # Header row
+            ('BACKGROUND', (0, 0), (-1, 0), BRAND_BLUE),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+            
+            # Data rows
+            ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -2), 10),
+            ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
+            ('ALIGN', (0, 1), (0, -1), 'LEFT'),
+            
+            # Grand total row
+            ('BACKGROUND', (0, -1), (-1, -1), BRAND_BLUE),
+            ('TEXTCOLOR', (0, -1), (-1, -1), colors.whitesmoke),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, -1), (-1, -1), 12),
+            ('ALIGN', (0, -1), (-1, -1), 'RIGHT'),
+            
+            # Grid
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ])
+    
+    def story(self, sale):
+        """Fill the template with one sale's data"""
+        # Invoice details
+        invoice_id = sale.invoice_id
+        invoice_date = sale.sale_date.strftime("%b %d, %Y %H:%M")
+        customer_name = sale.customer.name if sale.customer else 'N/A'
+        
+        details_table = Table([
+            ['Invoice ID:', invoice_id, 'Date:', invoice_date],
+            ['Bill To:', customer_name, 'Issued By:', sale.issuer_name]
+        ], colWidths=self.details_col_widths, style=self.details_style)
+        
+        # Items table
+        items_data = [self.items_header]
+        for item in sale.sale_items.all():
+            items_data.append([
+                item.product_name,
+                str(item.quantity),
+                f"{item.price:,.2f}",
+                f"{item.total:,.2f}"
+            ])
+        
+        # Add grand total row
+        items_data.append(['', '', 'GRAND TOTAL', f"₦ {sale.total:,.2f}"])
+        items_table = Table(items_data, colWidths=self.items_col_widths, style=self.items_style)
+        
+        return [
+            *(copy.copy(flowable) for flowable in self.header),
+            details_table,
+            Spacer(1, 20),
+            items_table,
+            Spacer(1, 30),
+            *(copy.copy(flowable) for flowable in self.footer),
+        ]
+    
+    def render(self, sales):
+        """Render one or more sales into a PDF, each invoice starting on a new page"""
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=letter)
+        story = []
+        for sale in sales:
+            if story:
+                story.append(PageBreak())
+            story.extend(self.story(sale))
+        doc.build(story or [Spacer(1, 0)])
+        buffer.seek(0)
+        return buffer
+
+_template = None
+_template_lock = threading.Lock()
+
+def get_invoice_template():
+    """Return the process-wide invoice template, compiling it on first use"""
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                _template = InvoiceTemplate()
+    return _template
+
+def get_invoice_pdf(sale, content_hash=None):
+    """Return the rendered invoice PDF bytes and content hash, rendering only on a cache miss"""
+    content_hash = content_hash or invoice_content_hash(sale)
+    cache = get_pdf_cache()
+    pdf = cache.get(sale.id, content_hash)
+    if pdf is None:
+        pdf = generate_invoice_pdf(sale).getvalue()
+        cache.set(sale.id, content_hash, pdf)
+    return pdf, content_hash
+
+def generate_invoice_pdf(sale):
+    """Generate PDF invoice"""
+    with span('generate_invoice_pdf'):
+        return get_invoice_template().render([sale])
+
+def generate_invoices_pdf(sales):
+    """Render several invoices into one multi-page PDF, each starting on a new page"""
+    with span('generate_invoices_pdf'):
+        return get_invoice_template().render(sales)
+
+def warm_up():
+    """
+    Compile the template and render a throwaway invoice, which loads the rest of ReportLab,
+    the font metrics and the PDF writer. Run by the server entry points when
+    INVOICE_PDF_PRELOAD is set, so a preforking server does it once before forking.
+    """
+    item = SimpleNamespace(product_name='', quantity=1, price=Decimal('0.00'), total=Decimal('0.00'))
+    sale = SimpleNamespace(invoice_id='', sale_date=datetime(2000, 1, 1), customer=None, issuer_name='',
+                           total=Decimal('0.00'), sale_items=SimpleNamespace(all=lambda: [item]))
+    get_invoice_template().render([sale])
@@ -0,0 +1,156 @@
+"""
+Outbound invoice email queue
+Jobs live in the EmailJob table, so no external broker is needed. The
+process_email_queue management command drains them. A job is stored in the same
+database as its sale (see invoices.sharding).
+"""
+
+import logging
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.utils import timezone
+from .metrics import span
+from .models import EmailJob, Sale
+from .sharding import fan_out, with_customer
+
+logger = logging.getLogger(__name__)
+
+def build_invoice_email(sale, pdf, recipient, connection=None):
+    """Build the invoice notification email with the PDF attached"""
+    invoice_id = sale.invoice_id
+    
+    # Create email
+    subject = f'New Invoice Generated - {invoice_id}'
+    
+    # Email content
+    email_content = f"""
+    Dear Admin,
+    
+    A new invoice has been generated. Please find the details below:
+    
+    Invoice ID: {invoice_id}
+    Customer: {sale.customer.name if sale.customer else 'N/A'}
+    Date: {sale.sale_date.strftime('%B %d, %Y at %I:%M %p')}
+    Total Amount: ₦{sale.total:,.2f}
+    Issued By: {sale.issuer_name}
+    
+    The invoice PDF is attached to this email.
+    
+    Best regards,
+    YAROTECH Invoice System
+    """
+    
+    # Create email message
+    email = EmailMessage(
+        subject=subject,
+        body=email_content,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[recipient],
+        connection=connection,
+    )
+    
+    # Attach PDF
+    email.attach(f'{invoice_id}.pdf', pdf, 'application/pdf')
+    return email
+
+def enqueue_invoice_email(sale, recipient=None):
+    """Queue the invoice email for a sale and return the job"""
+    return EmailJob.objects.db_manager(sale._state.db).create(**_job_fields(sale, recipient))
+
+async def aenqueue_invoice_email(sale, recipient=None):
+    """Async version of enqueue_invoice_email"""
+    return await EmailJob.objects.db_manager(sale._state.db).acreate(**_job_fields(sale, recipient))
+
+def _job_fields(sale, recipient):
+    return {
+        'sale': sale,
+        'recipient': recipient or settings.INVOICE_EMAIL_RECIPIENT,
+        'max_attempts': settings.EMAIL_QUEUE_MAX_ATTEMPTS,
+    }
+
+def claim_jobs(limit):
+    """
+    Atomically claim up to limit due jobs for this worker from each sales database
+    The claim is a conditional UPDATE tagged with a unique token, which works the same
+    on SQLite and PostgreSQL. Jobs stuck in 'sending' past the claim timeout are reclaimed.
+    """
+    token = uuid.uuid4().hex
+    return [job for jobs in fan_out(lambda using: _claim(using, limit, token)) for job in jobs]
+
+def _claim(using, limit, token):
+    jobs = EmailJob.objects.using(using)
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.EMAIL_QUEUE_CLAIM_TIMEOUT)
+    due = Q(status=EmailJob.PENDING, next_attempt_at__lte=now) | Q(status=EmailJob.SENDING, claimed_at__lt=stale)
+    
+    candidates = list(
+        jobs.filter(due).order_by('next_attempt_at').values_list('id', flat=True)[:limit]
+    )
+    if not candidates:
+        return []
+    
+    jobs.filter(due, id__in=candidates).update(
+        status=EmailJob.SENDING,
+        claimed_by=token,
+        claimed_at=now,
+    )
+    return list(jobs.filter(claimed_by=token, status=EmailJob.SENDING))
+
+def retry_delay(attempts):
+    """Exponential backoff, capped at one hour"""
+    return timedelta(seconds=min(settings.EMAIL_QUEUE_RETRY_BACKOFF * 2 ** (attempts - 1), 3600))
+
+def send_batch(jobs):
+    """Send a batch of claimed jobs over a single SMTP connection"""
+    from .invoice_pdf import get_invoice_pdf
+    
+    sales = {}
+    for using in {job._state.db for job in jobs}:
+        sales.update(with_customer(Sale.objects.using(using).prefetch_related('sale_items')).in_bulk(
+            [job.sale_id for job in jobs if job._state.db == using]
+        ))
+    connection = get_connection(fail_silently=False)
+    
+    try:
+        with span('smtp.open'):
+            connection.open()
+    except Exception as exc:
+        for job in jobs:
+            _mark_failed(job, exc)
+        return
+    
+    try:
+        for job in jobs:
+            try:
+                sale = sales[job.sale_id]
+                pdf, _ = get_invoice_pdf(sale)
+                email = build_invoice_email(sale, pdf, job.recipient, connection=connection)
+                with span('EmailMessage.send'):
+                    email.send()
+            except Exception as exc:
+                _mark_failed(job, exc)
+            else:
+                _mark_sent(job)
+    finally:
+        connection.close()
+
+def _mark_sent(job):
+    job.attempts += 1
+    job.status = EmailJob.SENT
+    job.sent_at = timezone.now()
+    job.last_error = None
+    job.save(update_fields=['attempts', 'status', 'sent_at', 'last_error', 'updated_at'])
+
+def _mark_failed(job, exc):
+    job.attempts += 1
+    job.last_error = f'{type(exc).__name__}: {exc}'
+    if job.attempts >= job.max_attempts:
+        job.status = EmailJob.FAILED
+    else:
+        job.status = EmailJob.PENDING
+        job.next_attempt_at = timezone.now() + retry_delay(job.attempts)
+    logger.warning('Invoice email %s attempt %s failed: %s', job.id, job.attempts, job.last_error)
+    job.save(update_fields=['attempts', 'status', 'next_attempt_at', 'last_error', 'updated_at'])
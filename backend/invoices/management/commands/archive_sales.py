@@ -0,0 +1,46 @@
+import sys
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from invoices.archive import archivable_sales, archive_sales
+from invoices.sharding import sale_databases
+
+class Command(BaseCommand):
+    help = 'Move sales dated before a cutoff day, with their items, into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help='Archive sales dated before this day (YYYY-MM-DD)')
+        parser.add_argument('--older-than', type=int, default=settings.SALES_ARCHIVE_AFTER_DAYS,
+                            help='Archive sales older than this many days (ignored with --before)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Sales moved per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many sales would move')
+
+    def handle(self, *args, **options):
+        if options['before']:
+            before = parse_date(options['before'])
+            if before is None:
+                raise CommandError('--before must be a date in YYYY-MM-DD format')
+        else:
+            before = timezone.localdate() - timedelta(days=options['older_than'])
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        if options['dry_run']:
+            count = sum(archivable_sales(before, using).count() for using in sale_databases())
+            self.stdout.write(f'{count} sale(s) dated before {before} would be archived')
+            return
+
+        moved = archive_sales(before, options['batch_size'], progress=self.report_progress)
+        if moved['sales']:
+            self.stderr.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved['sales']} sale(s) with {moved['sale_items']} item(s) and {moved['email_jobs']} "
+            f"email(s) dated before {before}"
+        ))
+
+    def report_progress(self, done, total, elapsed):
+        rate = done / elapsed if elapsed else 0
+        sys.stderr.write(f'\r  {done}/{total} sales  {rate:.0f}/s')
+        sys.stderr.flush()
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from invoices.tests.query_budget import BUDGETS_FILE, load_budgets, measure, save_budgets
+
+class Command(BaseCommand):
+    help = 'Count SQL queries per API action and fail when any action exceeds its budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--update', action='store_true',
+                            help=f'Write the measured counts to {BUDGETS_FILE.name} instead of checking them')
+
+    def handle(self, *args, **options):
+        # Measure against a throwaway test database, never the real one
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = measure()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options['update']:
+            save_budgets(results)
+            self.stdout.write(self.style.SUCCESS(f'Wrote {len(results)} budget(s) to {BUDGETS_FILE}'))
+            return
+
+        budgets = load_budgets()
+        failures = []
+        for name, (count, status_code) in sorted(results.items()):
+            budget = budgets.get(name)
+            if status_code >= 400:
+                failures.append(f'{name} returned HTTP {status_code}')
+                line = self.style.ERROR(f'{name:<32} {count:>4} / {budget}  HTTP {status_code}')
+            elif budget is None:
+                failures.append(f'{name} has no budget')
+                line = self.style.ERROR(f'{name:<32} {count:>4} / -   no budget')
+            elif count > budget:
+                failures.append(f'{name} issued {count} queries, budget is {budget}')
+                line = self.style.ERROR(f'{name:<32} {count:>4} / {budget}  over budget')
+            elif count < budget:
+                line = self.style.WARNING(f'{name:<32} {count:>4} / {budget}  under budget, tighten with --update')
+            else:
+                line = f'{name:<32} {count:>4} / {budget}'
+            self.stdout.write(line)
+
+        if failures:
+            raise CommandError('Query budget check failed:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('All actions within their query budgets'))
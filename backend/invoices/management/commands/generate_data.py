@@ -0,0 +1,52 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from invoices.synthetic import generate
+
+class Command(BaseCommand):
+    help = 'Add synthetic customers, products and sales (with items) using bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=1000)
+        parser.add_argument('--products', type=int, default=200)
+        parser.add_argument('--sales', type=int, default=10000)
+        parser.add_argument('--days', type=int, default=365, help='Spread sale dates over this many past days')
+        parser.add_argument('--issuers', type=int, default=5, help='Distinct issuer names')
+        parser.add_argument('--walk-in-rate', type=float, default=0.05,
+                            help='Fraction of sales without a customer')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per bulk insert')
+        parser.add_argument('--seed', type=int, help='Random seed, for repeatable data')
+        parser.add_argument('--skip-rollups', action='store_true',
+                            help='Do not rebuild the sales rollups afterwards')
+
+    def handle(self, *args, **options):
+        for name in ('customers', 'products', 'sales', 'days', 'issuers', 'batch_size'):
+            if options[name] < 0 or (name in ('issuers', 'batch_size') and options[name] == 0):
+                raise CommandError(f'--{name.replace("_", "-")} must be positive')
+
+        try:
+            written = generate(
+                customers=options['customers'],
+                products=options['products'],
+                sales=options['sales'],
+                days=options['days'],
+                issuers=options['issuers'],
+                walk_in_rate=options['walk_in_rate'],
+                batch_size=options['batch_size'],
+                seed=options['seed'],
+                rebuild_rollups=not options['skip_rollups'],
+                progress=self.report_progress,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stderr.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written['customers']} customer(s), {written['products']} product(s), "
+            f"{written['sales']} sale(s) with {written['sale_items']} item(s)"
+        ))
+
+    def report_progress(self, kind, done, total, elapsed):
+        rate = done / elapsed if elapsed else 0
+        sys.stderr.write(f'\r  {kind:<9} {done}/{total}  {rate:.0f}/s')
+        if done == total:
+            sys.stderr.write('\n')
+        sys.stderr.flush()
@@ -0,0 +1,43 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from invoices.mail import claim_jobs, send_batch
+
+def _send_batch(jobs):
+    try:
+        send_batch(jobs)
+    finally:
+        # Each pool thread has its own DB connections, one per sales database it touched
+        connections.close_all()
+
+class Command(BaseCommand):
+    help = 'Send queued invoice emails using a bounded thread pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.EMAIL_QUEUE_WORKERS,
+                            help='Number of sender threads')
+        parser.add_argument('--batch-size', type=int, default=settings.EMAIL_QUEUE_BATCH_SIZE,
+                            help='Emails sent per SMTP connection')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the queue once and exit')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        batch_size = max(1, options['batch_size'])
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                jobs = claim_jobs(workers * batch_size)
+                if jobs:
+                    batches = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+                    list(pool.map(_send_batch, batches))
+                    self.stdout.write(f'Processed {len(jobs)} email job(s)')
+                    continue
+
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
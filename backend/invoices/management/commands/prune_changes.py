@@ -0,0 +1,22 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from invoices.changes import prune
+
+class Command(BaseCommand):
+    help = 'Delete change feed entries older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=settings.CHANGES_RETENTION_DAYS,
+                            help='Delete changes older than this many days (default CHANGES_RETENTION_DAYS)')
+
+    def handle(self, *args, **options):
+        if options['older_than'] < 1:
+            raise CommandError('--older-than must be positive')
+        # Cursors are only rejected after CHANGES_RETENTION_DAYS, so pruning sooner could
+        # let an old cursor silently miss changes
+        if options['older_than'] < settings.CHANGES_RETENTION_DAYS:
+            raise CommandError(f'--older-than must be at least CHANGES_RETENTION_DAYS ({settings.CHANGES_RETENTION_DAYS})')
+        deleted = prune(timezone.now() - timedelta(days=options['older_than']))
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} change(s) older than {options['older_than']} day(s)"))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from invoices.rollups import rebuild
+
+class Command(BaseCommand):
+    help = 'Rebuild the SalesRollup table from scratch'
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} rollup row(s)'))
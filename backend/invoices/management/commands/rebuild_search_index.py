@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from invoices.search import SEARCHABLE_TABLES, SQLITE_TRIGRAM, fts_table, install_search_index, rebuild_sql
+
+class Command(BaseCommand):
+    help = 'Rebuild the SQLite full-text search tables (run after restoring a backup or editing rows with triggers off)'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write('Search uses a pg_trgm index on this database; nothing to rebuild')
+            return
+        if not SQLITE_TRIGRAM:
+            self.stdout.write('SQLite is older than 3.34 and has no trigram tokenizer; search uses LIKE')
+            return
+        existing = connection.introspection.table_names()
+        for table in SEARCHABLE_TABLES:
+            if fts_table(table) not in existing:
+                # Migrated where SQLite had no trigram tokenizer
+                with connection.schema_editor() as schema_editor:
+                    install_search_index(schema_editor, [table])
+                self.stdout.write(f'Created {fts_table(table)}')
+                continue
+            with connection.cursor() as cursor:
+                for sql in rebuild_sql(table):
+                    cursor.execute(sql)
+            self.stdout.write(f'Rebuilt {fts_table(table)}')
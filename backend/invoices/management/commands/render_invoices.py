@@ -0,0 +1,57 @@
+import sys
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from invoices.batch_pdf import merged_pdf, render_invoices, select_sale_ids, stream_zip
+
+class Command(BaseCommand):
+    help = 'Render invoice PDFs for a date range or list of sales into a ZIP or one merged PDF'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='File to write (.zip or .pdf)')
+        parser.add_argument('--from', dest='start', help='First sale date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='end', help='Last sale date (YYYY-MM-DD), inclusive')
+        parser.add_argument('--ids', nargs='+', default=[], help='Sale ids to render')
+        parser.add_argument('--workers', type=int, default=settings.INVOICE_RENDER_WORKERS,
+                            help='Rendering processes')
+        parser.add_argument('--chunk-size', type=int, default=20, help='Invoices per worker task')
+        parser.add_argument('--merge', action='store_true',
+                            help='Write one multi-page PDF instead of a ZIP')
+
+    def handle(self, *args, **options):
+        start = self.parse_day(options['start'], 'from')
+        end = self.parse_day(options['end'], 'to')
+        if end is not None:
+            end += timedelta(days=1)
+        sale_ids = select_sale_ids(start, end, options['ids'])
+        if not sale_ids:
+            raise CommandError('No sales match the given range or ids')
+
+        with open(options['output'], 'wb') as output:
+            if options['merge']:
+                self.stderr.write(f'Rendering {len(sale_ids)} invoice(s) into one PDF')
+                output.write(merged_pdf(sale_ids, options['workers']))
+            else:
+                self.stderr.write(f'Rendering {len(sale_ids)} invoice(s) with {options["workers"]} worker(s)')
+                rendered = render_invoices(
+                    sale_ids, options['workers'], options['chunk_size'], progress=self.report_progress
+                )
+                for data in stream_zip(rendered):
+                    output.write(data)
+        self.stderr.write('')
+        self.stdout.write(self.style.SUCCESS(f'Wrote {len(sale_ids)} invoice(s) to {options["output"]}'))
+
+    def parse_day(self, value, name):
+        if not value:
+            return None
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'--{name} must be a date in YYYY-MM-DD format')
+        return timezone.make_aware(datetime.combine(day, time.min))
+
+    def report_progress(self, rendered, total, elapsed):
+        rate = rendered / elapsed if elapsed else 0
+        sys.stderr.write(f'\r  {rendered}/{total} invoices  {rate:.1f}/s')
+        sys.stderr.flush()
@@ -0,0 +1,152 @@
+"""
+In-process request, SQL and span metrics exposed in Prometheus text format
+Each process keeps its own registry; scrape every worker (or run one worker per
+scrape target) when deploying with several processes.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.values = {}
+    
+    def inc(self, label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+    
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for label_values, value in sorted(self.values.items()):
+            lines.append(f'{self.name}{_labels(self.labels, label_values)} {_number(value)}')
+        return lines
+
+class Histogram:
+    def __init__(self, name, help_text, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self.values = {}
+    
+    def observe(self, label_values, value):
+        # [per-bucket counts..., +Inf count], sum
+        series = self.values.setdefault(label_values, [[0] * (len(self.buckets) + 1), 0.0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+    
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        bounds = [_number(bound) for bound in self.buckets] + ['+Inf']
+        for label_values, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(self.labels + ("le",), label_values + (bound,))} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labels, label_values)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labels, label_values)} {cumulative}')
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.request_duration = Histogram(
+            'yarotech_http_request_duration_seconds', 'Request latency by view', ('view', 'method'))
+        self.requests = Counter(
+            'yarotech_http_requests_total', 'Requests by view and status', ('view', 'method', 'status'))
+        self.db_queries = Counter(
+            'yarotech_db_queries_total', 'SQL queries issued by view', ('view',))
+        self.db_duration = Counter(
+            'yarotech_db_query_duration_seconds_total', 'Time spent in SQL by view', ('view',))
+        self.span_duration = Histogram(
+            'yarotech_span_duration_seconds', 'Duration of instrumented code spans', ('span',))
+        self.cache_requests = Counter(
+            'yarotech_cache_requests_total', 'Cache lookups by cache and result', ('cache', 'result'))
+    
+    def record_request(self, view, method, status, duration, queries, query_time):
+        with self.lock:
+            self.request_duration.observe((view, method), duration)
+            self.requests.inc((view, method, str(status)))
+            self.db_queries.inc((view,), queries)
+            self.db_duration.inc((view,), query_time)
+    
+    def record_span(self, name, duration):
+        with self.lock:
+            self.span_duration.observe((name,), duration)
+    
+    def record_cache(self, cache, result):
+        with self.lock:
+            self.cache_requests.inc((cache, result))
+    
+    def expose(self):
+        with self.lock:
+            lines = []
+            metrics = (self.request_duration, self.requests, self.db_queries, self.db_duration,
+                       self.span_duration, self.cache_requests)
+            for metric in metrics:
+                lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+@contextmanager
+def span(name):
+    """Time a block of code as a named span"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.record_span(name, time.perf_counter() - start)
+
+class QueryCounter:
+    """Database execute wrapper counting queries and their time"""
+    
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+    
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+# The counter of the request being handled. A context variable rather than a wrapper pushed
+# onto one connection, because async views run their queries in sync_to_async threads
+# that use a different connection object but inherit the request's context.
+_query_counter = ContextVar('query_counter', default=None)
+
+def route_queries(execute, sql, params, many, context):
+    """Execute wrapper installed on every connection, feeding the active QueryCounter"""
+    counter = _query_counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    return counter(execute, sql, params, many, context)
+
+@contextmanager
+def counting_queries(counter):
+    """Count the queries issued in this context, including by sync_to_async calls made from it"""
+    token = _query_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _query_counter.reset(token)
+
+def _labels(names, values):
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,187 @@
+import cProfile
+import io
+import pstats
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+from .metrics import QueryCounter, counting_queries, registry
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+# Content types that are already compressed
+INCOMPRESSIBLE_TYPES = ('application/pdf', 'application/zip', 'image/', 'audio/', 'video/')
+
+class MetricsMiddleware:
+    """
+    Record latency, status and SQL usage per view for /api/metrics/
+    With settings.METRICS_PROFILE_ENABLED, ?profile=1 replaces the response with a cProfile summary.
+    Works in both WSGI and ASGI chains, so async views are not forced onto a sync thread.
+    """
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.wants_profile(request):
+            profiler = cProfile.Profile()
+            queries = QueryCounter()
+            start = time.perf_counter()
+            with counting_queries(queries):
+                response = profiler.runcall(self.get_response, request)
+            return self.profile_response(request, response, profiler, queries, time.perf_counter() - start)
+        
+        queries = QueryCounter()
+        start = time.perf_counter()
+        with counting_queries(queries):
+            response = self.get_response(request)
+        return self.record(request, response, queries, time.perf_counter() - start)
+    
+    async def __acall__(self, request):
+        if self.wants_profile(request):
+            # Only the event loop thread is profiled; thread-offloaded work shows up as waits
+            profiler = cProfile.Profile()
+            queries = QueryCounter()
+            start = time.perf_counter()
+            with counting_queries(queries):
+                profiler.enable()
+                try:
+                    response = await self.get_response(request)
+                finally:
+                    profiler.disable()
+            return self.profile_response(request, response, profiler, queries, time.perf_counter() - start)
+        
+        queries = QueryCounter()
+        start = time.perf_counter()
+        with counting_queries(queries):
+            response = await self.get_response(request)
+        return self.record(request, response, queries, time.perf_counter() - start)
+    
+    def wants_profile(self, request):
+        return settings.METRICS_PROFILE_ENABLED and request.GET.get('profile') == '1'
+    
+    def record(self, request, response, queries, duration):
+        registry.record_request(
+            self.view_name(request), request.method, response.status_code,
+            duration, queries.count, queries.duration,
+        )
+        return response
+    
+    def profile_response(self, request, response, profiler, queries, duration):
+        output = io.StringIO()
+        output.write(
+            f'{request.method} {request.path} -> {response.status_code} in {duration * 1000:.1f} ms, '
+            f'{queries.count} SQL queries in {queries.duration * 1000:.1f} ms\n\n'
+        )
+        stats = pstats.Stats(profiler, stream=output)
+        stats.strip_dirs().sort_stats(request.GET.get('sort', 'cumulative')).print_stats(40)
+        return HttpResponse(output.getvalue(), content_type='text/plain; charset=utf-8')
+    
+    def view_name(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unresolved'
+        return match.view_name or match._func_path
+
+def preferred_encoding(accept_encoding):
+    """'br' or 'gzip', whichever the Accept-Encoding header ranks higher (br on a tie), or None"""
+    weights = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.partition(';')
+        weight = 1.0
+        name, _, value = params.partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                weight = float(value)
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+    
+    best, best_weight = None, 0.0
+    for coding in ('br', 'gzip') if brotli is not None else ('gzip',):
+        weight = weights.get(coding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+def brotli_sequence(sequence, quality):
+    """Like django.utils.text.compress_sequence, flushing after every chunk"""
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli (when the Brotli package is installed) or gzip,
+    as negotiated by Accept-Encoding. Bodies under settings.RESPONSE_COMPRESSION_MIN_BYTES
+    and already compressed types are sent as is; async streaming responses are too.
+    Like GZipMiddleware, strong ETags are made weak.
+    """
+    sync_capable = True
+    async_capable = True
+    max_random_bytes = 100
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+    
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+    
+    def compress(self, request, response):
+        if response.has_header('Content-Encoding') or (response.streaming and response.is_async):
+            return response
+        if not response.streaming and len(response.content) < settings.RESPONSE_COMPRESSION_MIN_BYTES:
+            return response
+        if response.get('Content-Type', '').startswith(INCOMPRESSIBLE_TYPES):
+            return response
+        
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = preferred_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        
+        quality = settings.RESPONSE_BROTLI_QUALITY
+        if response.streaming:
+            if encoding == 'br':
+                response.streaming_content = brotli_sequence(response.streaming_content, quality)
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, max_random_bytes=self.max_random_bytes
+                )
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, quality=quality)
+            else:
+                compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+        
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
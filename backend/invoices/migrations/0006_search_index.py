@@ -0,0 +1,67 @@
+import sqlite3
+from django.db import migrations
+
+# Table -> column indexed for type-ahead search (see invoices.search)
+SEARCH_TABLES = {
+    'invoices_product': 'name',
+    'invoices_customer': 'name',
+}
+
+def create_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite' and sqlite3.sqlite_version_info < (3, 34):
+        # The trigram tokenizer came in SQLite 3.34; without it search falls back to LIKE
+        return
+    for table, column in SEARCH_TABLES.items():
+        if vendor == 'sqlite':
+            fts = f'{table}_fts'
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {fts} USING fts5("
+                f"{column}, content='{table}', content_rowid='rowid', tokenize='trigram')"
+            )
+            schema_editor.execute(
+                f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, {column}) VALUES (new.rowid, new.{column}); END"
+            )
+            schema_editor.execute(
+                f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.rowid, old.{column}); END"
+            )
+            schema_editor.execute(
+                f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {column} ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.rowid, old.{column}); "
+                f"INSERT INTO {fts}(rowid, {column}) VALUES (new.rowid, new.{column}); END"
+            )
+            schema_editor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        elif vendor == 'postgresql':
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {table}_{column}_trgm ON {table} USING gin ({column} gin_trgm_ops)'
+            )
+
+def drop_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, column in SEARCH_TABLES.items():
+        if vendor == 'sqlite':
+            fts = f'{table}_fts'
+            for suffix in ('ai', 'ad', 'au'):
+                schema_editor.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+            schema_editor.execute(f'DROP TABLE IF EXISTS {fts}')
+        elif vendor == 'postgresql':
+            schema_editor.execute(f'DROP INDEX IF EXISTS {table}_{column}_trgm')
+
+def forwards(apps, schema_editor):
+    create_search_index(schema_editor)
+
+def backwards(apps, schema_editor):
+    drop_search_index(schema_editor)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0005_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-17 16:25
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_summary_fields(apps, schema_editor):
+    Customer = apps.get_model('invoices', 'Customer')
+    Sale = apps.get_model('invoices', 'Sale')
+    SaleItem = apps.get_model('invoices', 'SaleItem')
+    customer_name = Customer.objects.filter(pk=OuterRef('customer_id')).values('name')[:1]
+    item_count = SaleItem.objects.filter(sale_id=OuterRef('pk')).values('sale_id').annotate(count=Count('id')).values('count')
+    Sale.objects.update(
+        customer_name=Coalesce(Subquery(customer_name), Value('')),
+        item_count=Coalesce(Subquery(item_count), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0007_name_lower_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='customer_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_summary_fields, migrations.RunPython.noop),
+    ]
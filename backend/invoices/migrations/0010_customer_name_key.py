@@ -0,0 +1,88 @@
+from collections import defaultdict
+from django.db import migrations, models
+
+
+def normalize(name):
+    # Same rule as invoices.models.normalize_customer_name at the time of writing
+    return ' '.join(name.split()).casefold()[:255]
+
+
+def merge_duplicate_customers(apps, schema_editor):
+    """Keep the oldest customer per normalized name and repoint the others' sales to it"""
+    Customer = apps.get_model('invoices', 'Customer')
+    Sale = apps.get_model('invoices', 'Sale')
+    ArchivedSale = apps.get_model('invoices', 'ArchivedSale')
+
+    survivors = {}
+    duplicates = defaultdict(list)
+    for customer in Customer.objects.order_by('created_at', 'id').iterator(chunk_size=2000):
+        key = normalize(customer.name)
+        customer.name_key = key
+        if key in survivors:
+            duplicates[key].append(customer)
+        else:
+            survivors[key] = customer
+
+    for key, others in duplicates.items():
+        survivor = survivors[key]
+        other_ids = [other.id for other in others]
+        # Keep contact details the survivor is missing
+        for field in ('email', 'phone', 'address'):
+            if not getattr(survivor, field):
+                setattr(survivor, field, next((getattr(o, field) for o in others if getattr(o, field)), None))
+        Sale.objects.filter(customer_id__in=other_ids).update(customer=survivor, customer_name=survivor.name)
+        ArchivedSale.objects.filter(customer_id__in=other_ids).update(customer=survivor)
+        Customer.objects.filter(id__in=other_ids).delete()
+
+    Customer.objects.bulk_update(survivors.values(), ['name_key', 'email', 'phone', 'address'], batch_size=1000)
+
+    if schema_editor.connection.vendor == 'postgresql':
+        # The repointed sales leave deferred foreign key checks queued, and PostgreSQL will not
+        # ALTER a table with pending trigger events; run them before the unique constraint
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+def restore_search_triggers(apps, schema_editor):
+    """SQLite rebuilds the table to add the unique column, dropping the FTS5 triggers from 0006"""
+    table, column, fts = 'invoices_customer', 'name', 'invoices_customer_fts'
+    connection = schema_editor.connection
+    # 0006 creates no index where SQLite lacks the trigram tokenizer
+    if connection.vendor != 'sqlite' or fts not in connection.introspection.table_names():
+        return
+    schema_editor.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.rowid, new.{column}); END"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.rowid, old.{column}); END"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.rowid, old.{column}); "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.rowid, new.{column}); END"
+    )
+    # Rows were copied into a new table, so their rowids may have changed
+    schema_editor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0009_sale_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='name_key',
+            field=models.CharField(editable=False, max_length=255, null=True),
+        ),
+        migrations.RunPython(merge_duplicate_customers, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='customer',
+            name='name_key',
+            field=models.CharField(editable=False, max_length=255, unique=True),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
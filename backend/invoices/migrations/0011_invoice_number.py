@@ -0,0 +1,66 @@
+import heapq
+from django.db import migrations, models
+
+
+def number_existing_sales(apps, schema_editor):
+    """Number live and archived sales together in sale date order, then start the sequence after them"""
+    Sale = apps.get_model('invoices', 'Sale')
+    ArchivedSale = apps.get_model('invoices', 'ArchivedSale')
+    InvoiceSequence = apps.get_model('invoices', 'InvoiceSequence')
+
+    def ordered(model):
+        # Read up front: the updates below must not run under an open cursor on the same table
+        rows = list(model.objects.order_by('sale_date', 'id').values_list('sale_date', 'id'))
+        return ((sale_date, str(pk), model, pk) for sale_date, pk in rows)
+
+    number = 0
+    batches = {Sale: [], ArchivedSale: []}
+    for _, _, model, pk in heapq.merge(ordered(Sale), ordered(ArchivedSale)):
+        number += 1
+        batch = batches[model]
+        batch.append(model(pk=pk, invoice_number=number))
+        if len(batch) >= 1000:
+            model.objects.bulk_update(batch, ['invoice_number'])
+            batch.clear()
+    for model, batch in batches.items():
+        model.objects.bulk_update(batch, ['invoice_number'])
+
+    InvoiceSequence.objects.update_or_create(name='invoice', defaults={'next_value': number + 1})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0010_customer_name_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceSequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('next_value', models.PositiveBigIntegerField(default=1)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='invoice_number',
+            field=models.PositiveBigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedsale',
+            name='invoice_number',
+            field=models.PositiveBigIntegerField(null=True),
+        ),
+        migrations.RunPython(number_existing_sales, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='sale',
+            name='invoice_number',
+            field=models.PositiveBigIntegerField(editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='archivedsale',
+            name='invoice_number',
+            field=models.PositiveBigIntegerField(unique=True),
+        ),
+    ]
@@ -0,0 +1,81 @@
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+SYNCED_MODELS = ['Customer', 'Product', 'Sale', 'SaleItem']
+
+
+def backfill_updated_at(apps, schema_editor):
+    """Existing rows have not changed since they were created, as far as anyone can tell"""
+    for name in SYNCED_MODELS:
+        apps.get_model('invoices', name).objects.update(updated_at=F('created_at'))
+
+
+def restore_search_triggers(apps, schema_editor):
+    """SQLite rebuilds the customer and product tables to make updated_at required, dropping the FTS5 triggers"""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    existing = connection.introspection.table_names()
+    for table, column in (('invoices_customer', 'name'), ('invoices_product', 'name')):
+        fts = f'{table}_fts'
+        # 0006 creates no index where SQLite lacks the trigram tokenizer
+        if fts not in existing:
+            continue
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {column}) VALUES (new.rowid, new.{column}); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.rowid, old.{column}); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column} ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.rowid, old.{column}); "
+            f"INSERT INTO {fts}(rowid, {column}) VALUES (new.rowid, new.{column}); END"
+        )
+        # Rows were copied into a new table, so their rowids may have changed
+        schema_editor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0011_invoice_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.UUIDField()),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=7)),
+                ('changed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ] + [
+        migrations.AddField(
+            model_name=name.lower(),
+            name='updated_at',
+            field=models.DateTimeField(null=True),
+        )
+        for name in SYNCED_MODELS
+    ] + [
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ] + [
+        migrations.AlterField(
+            model_name=name.lower(),
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        )
+        for name in SYNCED_MODELS
+    ] + [
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+ARCHIVED_MODELS = ['ArchivedSale', 'ArchivedSaleItem']
+
+
+def backfill_updated_at(apps, schema_editor):
+    """Sales archived before the change feed keep created_at, as their live copies did"""
+    for name in ARCHIVED_MODELS:
+        apps.get_model('invoices', name).objects.using(schema_editor.connection.alias).update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0013_catalog_references'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name=name.lower(),
+            name='updated_at',
+            field=models.DateTimeField(null=True),
+        )
+        for name in ARCHIVED_MODELS
+    ] + [
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ] + [
+        migrations.AlterField(
+            model_name=name.lower(),
+            name='updated_at',
+            field=models.DateTimeField(),
+        )
+        for name in ARCHIVED_MODELS
+    ]
@@ -0,0 +1,78 @@
+import sqlite3
+from django.db import migrations
+
+# Table -> column indexed for type-ahead search (see invoices.search)
+SEARCH_TABLES = {
+    'invoices_product': 'name',
+    'invoices_customer': 'name',
+}
+
+
+def drop_search_index(schema_editor, table):
+    fts, docs = f'{table}_fts', f'{table}_fts_docs'
+    for trigger in (fts, docs):
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {trigger}_{suffix}')
+    schema_editor.execute(f'DROP TABLE IF EXISTS {fts}')
+    schema_editor.execute(f'DROP TABLE IF EXISTS {docs}')
+
+
+def rekey_search_index(apps, schema_editor):
+    """
+    Rebuild the FTS5 tables over docs tables with an INTEGER PRIMARY KEY
+    They were keyed by the base tables' implicit rowid, which VACUUM may renumber, leaving
+    search returning the wrong rows until the index was rebuilt.
+    """
+    # The trigram tokenizer came in SQLite 3.34; without it search falls back to LIKE
+    if schema_editor.connection.vendor != 'sqlite' or sqlite3.sqlite_version_info < (3, 34):
+        return
+    for table, column in SEARCH_TABLES.items():
+        fts, docs = f'{table}_fts', f'{table}_fts_docs'
+        drop_search_index(schema_editor, table)
+        schema_editor.execute(
+            f"CREATE TABLE {docs} (docid INTEGER PRIMARY KEY, id char(32) NOT NULL UNIQUE, "
+            f"{column} varchar(255) NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5("
+            f"{column}, content='{docs}', content_rowid='docid', tokenize='trigram')"
+        )
+        # The base table writes the docs by id, and the docs write the index by docid
+        schema_editor.execute(
+            f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {docs}(id, {column}) VALUES (new.id, new.{column}); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM {docs} WHERE id = old.id; END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {column} ON {table} BEGIN "
+            f"UPDATE {docs} SET {column} = new.{column} WHERE id = old.id; END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {docs}_ai AFTER INSERT ON {docs} BEGIN "
+            f"INSERT INTO {fts}(rowid, {column}) VALUES (new.docid, new.{column}); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {docs}_ad AFTER DELETE ON {docs} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.docid, old.{column}); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {docs}_au AFTER UPDATE OF {column} ON {docs} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.docid, old.{column}); "
+            f"INSERT INTO {fts}(rowid, {column}) VALUES (new.docid, new.{column}); END"
+        )
+        schema_editor.execute(f'INSERT INTO {docs}(id, {column}) SELECT id, {column} FROM {table}')
+        schema_editor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0014_archive_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(rekey_search_index, migrations.RunPython.noop),
+    ]
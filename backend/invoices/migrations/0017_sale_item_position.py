@@ -0,0 +1,45 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0016_archived_email_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='archivedsaleitem',
+            options={'ordering': ['created_at', 'position', 'id']},
+        ),
+        migrations.AlterModelOptions(
+            name='saleitem',
+            options={'ordering': ['created_at', 'position', 'id']},
+        ),
+        migrations.RemoveIndex(
+            model_name='archivedsaleitem',
+            name='archiveditem_sale_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='saleitem',
+            name='saleitem_sale_created_idx',
+        ),
+        migrations.AddField(
+            model_name='archivedsaleitem',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='saleitem',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='archivedsaleitem',
+            index=models.Index(fields=['sale', 'created_at', 'position'], name='archiveditem_sale_position_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saleitem',
+            index=models.Index(fields=['sale', 'created_at', 'position'], name='saleitem_sale_position_idx'),
+        ),
+    ]
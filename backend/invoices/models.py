@@ -1,20 +1,44 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
+from django.utils import timezone
 import uuid
 
+def normalize_customer_name(name):
+    """The key two customer names must not share: case-folded, with whitespace collapsed"""
+    return ' '.join(name.split()).casefold()[:255]
+
+def format_invoice_number(number):
+    """The invoice number as printed on invoices, e.g. INV-000042"""
+    return f"INV-{number:06d}"
+
 class Customer(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=255)
+    # normalize_customer_name(name); set by save(), bulk inserts must set it themselves
+    name_key = models.CharField(max_length=255, unique=True, editable=False)
     email = models.EmailField(blank=True, null=True)
     phone = models.CharField(max_length=20, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.name_key = normalize_customer_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'name_key'}
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name', 'id'], name='customer_name_id_idx'),
+            models.Index(Lower('name'), name='customer_name_lower_idx'),
+        ]
 
 class Product(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -22,35 +46,209 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} - ₦{self.price}"
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name', 'id'], name='product_name_id_idx'),
+            models.Index(Lower('name'), name='product_name_lower_idx'),
+        ]
+
+class InvoiceSequence(models.Model):
+    """Next unreserved value of a number sequence; invoices.invoice_numbers hands out blocks of it"""
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.PositiveBigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
 
 class Sale(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True)
+    # Assigned by save() when missing; bulk inserts must allocate their own
+    invoice_number = models.PositiveBigIntegerField(unique=True, editable=False)
+    # Sales may live in a branch database apart from the catalog (invoices.sharding), so
+    # references to customers and products carry no database constraint
+    customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False)
+    # Denormalized for list views; kept in step by the serializers and invoices.signals
+    customer_name = models.CharField(max_length=255, blank=True, default='', editable=False)
+    item_count = models.PositiveIntegerField(default=0, editable=False)
     sale_date = models.DateTimeField(auto_now_add=True)
     total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     issuer_name = models.CharField(max_length=255)
+    idempotency_key = models.CharField(max_length=255, unique=True, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def invoice_id(self):
+        return format_invoice_number(self.invoice_number)
+
+    def save(self, *args, **kwargs):
+        if self.invoice_number is None:
+            from .invoice_numbers import next_invoice_number
+            self.invoice_number = next_invoice_number()
+        if self._state.adding and not args and kwargs.get('using') is None:
+            # New sales go to their issuer's database (setting customer may have picked another)
+            from .sharding import shard_for_issuer
+            kwargs['using'] = shard_for_issuer(self.issuer_name)
+        super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"Sale {str(self.id)[:8]} - ₦{self.total}"
+        return f"Sale {self.invoice_id} - ₦{self.total}"
 
     class Meta:
         ordering = ['-sale_date']
+        indexes = [
+            models.Index(fields=['sale_date', 'id'], name='sale_date_id_idx'),
+            models.Index(fields=['issuer_name', 'sale_date'], name='sale_issuer_date_idx'),
+        ]
 
 class SaleItem(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     sale = models.ForeignKey(Sale, on_delete=models.CASCADE, related_name='sale_items')
-    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True)
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False)
     product_name = models.CharField(max_length=255)
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Line number within the sale; items inserted together share created_at
+    position = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def total(self):
+        return self.quantity * self.price
+
+    def __str__(self):
+        return f"{self.product_name} x {self.quantity}"
+
+    class Meta:
+        # id only settles items saved before positions were recorded
+        ordering = ['created_at', 'position', 'id']
+        indexes = [
+            models.Index(fields=['sale', 'created_at', 'position'], name='saleitem_sale_position_idx'),
+        ]
+
+class EmailJob(models.Model):
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    sale = models.ForeignKey(Sale, on_delete=models.CASCADE, related_name='email_jobs')
+    recipient = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=64, blank=True, null=True)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, null=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Email {str(self.id)[:8]} for sale {str(self.sale_id)[:8]} - {self.status}"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='emailjob_status_next_idx'),
+        ]
+
+class SalesRollup(models.Model):
+    """Per day, issuer and product sales totals, kept up to date by invoices.rollups"""
+    day = models.DateField()
+    issuer_name = models.CharField(max_length=255)
+    product_name = models.CharField(max_length=255)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    line_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day} {self.issuer_name} {self.product_name} - ₦{self.revenue}"
+
+    class Meta:
+        ordering = ['day', 'issuer_name', 'product_name']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'issuer_name', 'product_name'], name='salesrollup_unique_key'),
+        ]
+
+class Change(models.Model):
+    """A create, update or delete of a synced object, for the change feed in invoices.changes"""
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ACTION_CHOICES = [
+        (CREATED, 'Created'),
+        (UPDATED, 'Updated'),
+        (DELETED, 'Deleted'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=20)
+    object_id = models.UUIDField()
+    action = models.CharField(max_length=7, choices=ACTION_CHOICES)
+    changed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.id}: {self.action} {self.model} {str(self.object_id)[:8]}"
+
+    class Meta:
+        ordering = ['id']
+
+class ArchivedSale(models.Model):
+    """A sale moved out of the hot Sale table by invoices.archive, kept as a frozen copy"""
+    id = models.UUIDField(primary_key=True, editable=False)
+    invoice_number = models.PositiveBigIntegerField(unique=True)
+    customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+                                 db_constraint=False)
+    customer_name = models.CharField(max_length=255, blank=True, default='')
+    item_count = models.PositiveIntegerField(default=0)
+    sale_date = models.DateTimeField()
+    total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    issuer_name = models.CharField(max_length=255)
+    idempotency_key = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def invoice_id(self):
+        return format_invoice_number(self.invoice_number)
+
+    def __str__(self):
+        return f"Archived sale {self.invoice_id} - ₦{self.total}"
+
+    class Meta:
+        ordering = ['-sale_date']
+        indexes = [
+            models.Index(fields=['sale_date', 'id'], name='archivedsale_date_id_idx'),
+        ]
+
+class ArchivedSaleItem(models.Model):
+    id = models.UUIDField(primary_key=True, editable=False)
+    sale = models.ForeignKey(ArchivedSale, on_delete=models.CASCADE, related_name='sale_items')
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+                                db_constraint=False)
+    product_name = models.CharField(max_length=255)
+    quantity = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    position = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
 
     @property
     def total(self):
@@ -60,4 +258,25 @@ class SaleItem(models.Model):
         return f"{self.product_name} x {self.quantity}"
 
     class Meta:
-        ordering = ['created_at']
\ No newline at end of file
+        ordering = ['created_at', 'position', 'id']
+        indexes = [
+            models.Index(fields=['sale', 'created_at', 'position'], name='archiveditem_sale_position_idx'),
+        ]
+
+class ArchivedEmailJob(models.Model):
+    """A sent or failed invoice email of an archived sale, kept as its delivery history"""
+    id = models.UUIDField(primary_key=True, editable=False)
+    sale = models.ForeignKey(ArchivedSale, on_delete=models.CASCADE, related_name='email_jobs')
+    recipient = models.EmailField()
+    status = models.CharField(max_length=10, choices=EmailJob.STATUS_CHOICES)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Archived email {str(self.id)[:8]} for sale {str(self.sale_id)[:8]} - {self.status}"
+
+    class Meta:
+        ordering = ['-created_at']
@@ -0,0 +1,127 @@
+import base64
+import json
+from collections import OrderedDict
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from .sharding import fetch_all
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over (ordering field, id)
+    Each page is a single indexed range scan, so deep pages cost the same as the first one.
+    Pagination is opt-in: lists are only paged when ?cursor= or ?page_size= is present.
+    Sales spread over several databases are read from each and merged in page order.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        field, tiebreak = (name.lstrip('-') for name in self.ordering)
+        
+        queryset = queryset.order_by(*self.ordering)
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            value, last_id = self.parse_cursor(queryset.model, field, tiebreak, cursor)
+            lookup = 'lt' if self.ordering[0].startswith('-') else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{field}__{lookup}': value}) |
+                Q(**{field: value, f'{tiebreak}__{lookup}': last_id})
+            )
+        
+        page = self.fetch(queryset, self.page_size + 1)
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.last = page[-1] if page else None
+        self.field, self.tiebreak = field, tiebreak
+        return page
+    
+    def fetch(self, queryset, limit=None):
+        """Rows of queryset in page order, up to limit"""
+        return fetch_all(queryset.order_by(*self.ordering), key=self.sort_key,
+                         reverse=self.ordering[0].startswith('-'), limit=limit)
+    
+    def sort_key(self, row):
+        field, tiebreak = (name.lstrip('-') for name in self.ordering)
+        if isinstance(row, dict):
+            return row[field], row[tiebreak]
+        return getattr(row, field), getattr(row, tiebreak)
+    
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+    
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return value, last_id
+    
+    def parse_cursor(self, model, field, tiebreak, cursor):
+        """Convert a decoded cursor to field values, rejecting any the model's fields refuse"""
+        try:
+            value, last_id = (model._meta.get_field(name).to_python(raw) for name, raw in zip((field, tiebreak), cursor))
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None or last_id is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value, last_id
+    
+    def encode_cursor(self, instance):
+        # Pages may hold model instances or values() rows
+        if isinstance(instance, dict):
+            value, last_id = instance[self.field], instance[self.tiebreak]
+        else:
+            value, last_id = getattr(instance, self.field), getattr(instance, self.tiebreak)
+        value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        payload = json.dumps([value, str(last_id)])
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+    
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last))
+    
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+    
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+class SalePagination(KeysetPagination):
+    ordering = ('-sale_date', '-id')
+
+class CatalogPagination(KeysetPagination):
+    ordering = ('name', 'id')
@@ -0,0 +1,125 @@
+"""
+Cache for rendered invoice PDFs
+Entries are keyed on a hash of the sale and its items, so a changed sale never
+serves a stale PDF. Signals in invoices.signals drop old entries for a sale as it changes.
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from django.conf import settings
+
+# Bump when the invoice layout changes so cached PDFs are re-rendered
+INVOICE_LAYOUT_VERSION = 2
+
+def invoice_content_hash(sale):
+    """Hash everything that ends up on the rendered invoice"""
+    digest = hashlib.sha256()
+    parts = [
+        f'v{INVOICE_LAYOUT_VERSION}',
+        str(sale.id),
+        sale.customer.name if sale.customer else '',
+        sale.issuer_name,
+        sale.sale_date.isoformat(),
+        str(sale.total),
+    ]
+    for item in sale.sale_items.all():
+        parts.extend([str(item.id), item.product_name, str(item.quantity), str(item.price)])
+    
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+class MemoryPDFCache:
+    """In-process LRU cache bounded by the total size of the stored PDFs"""
+    
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, sale_id, content_hash):
+        key = (str(sale_id), content_hash)
+        with self._lock:
+            pdf = self._entries.get(key)
+            if pdf is not None:
+                self._entries.move_to_end(key)
+            return pdf
+    
+    def set(self, sale_id, content_hash, pdf):
+        if len(pdf) > self.max_bytes:
+            return
+        key = (str(sale_id), content_hash)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous)
+            self._entries[key] = pdf
+            self.current_bytes += len(pdf)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+    
+    def invalidate(self, sale_id):
+        sale_id = str(sale_id)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == sale_id]:
+                self.current_bytes -= len(self._entries.pop(key))
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+class FileSystemPDFCache:
+    """Stores PDFs under <location>/<sale id>/<content hash>.pdf"""
+    
+    def __init__(self, location=None):
+        self.location = Path(location or Path(settings.MEDIA_ROOT) / 'invoice_cache')
+    
+    def _path(self, sale_id, content_hash):
+        return self.location / str(sale_id) / f'{content_hash}.pdf'
+    
+    def get(self, sale_id, content_hash):
+        try:
+            return self._path(sale_id, content_hash).read_bytes()
+        except FileNotFoundError:
+            return None
+    
+    def set(self, sale_id, content_hash, pdf):
+        path = self._path(sale_id, content_hash)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file first so readers never see a partial PDF
+        temp_path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        temp_path.write_bytes(pdf)
+        os.replace(temp_path, path)
+    
+    def invalidate(self, sale_id):
+        shutil.rmtree(self.location / str(sale_id), ignore_errors=True)
+    
+    def clear(self):
+        shutil.rmtree(self.location, ignore_errors=True)
+
+BACKENDS = {
+    'memory': MemoryPDFCache,
+    'filesystem': FileSystemPDFCache,
+}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_pdf_cache():
+    """Return the process-wide PDF cache configured by settings.INVOICE_PDF_CACHE"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = dict(settings.INVOICE_PDF_CACHE)
+                backend = BACKENDS[config.pop('BACKEND')]
+                _cache = backend(**{key.lower(): value for key, value in config.items()})
+    return _cache
@@ -0,0 +1,32 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from . import fastjson
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer using invoices.fastjson (orjson when installed); ?indent requests use the stock path"""
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return fastjson.dumps(data)
+
+class PassthroughRenderer(BaseRenderer):
+    """
+    Lets content negotiation select a format for views that build their own
+    (streaming) response. Only error payloads are rendered, as JSON.
+    """
+    charset = None
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return fastjson.dumps(data)
+
+class CSVRenderer(PassthroughRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+class NDJSONRenderer(PassthroughRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
@@ -0,0 +1,148 @@
+"""
+Incrementally maintained sales rollups
+Every SaleItem contributes (quantity, revenue, 1 line) to the SalesRollup row for
+(day of sale, issuer, product name). Creates that bypass signals (bulk_create) call
+record_items directly; updates and deletes are handled by the receivers in invoices.signals.
+Rollups are kept in the same database as the sales they count (see invoices.sharding);
+`using` names it, and defaults to the current shard.
+"""
+
+import operator
+import threading
+from collections import defaultdict
+from decimal import Decimal
+from functools import reduce
+from itertools import chain
+from django.db import connections, router, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import ArchivedSaleItem, SaleItem, SalesRollup
+from .sharding import fan_out
+
+_state = threading.local()
+# Key columns first, then the counters an upsert adds to
+UPSERT_FIELDS = ('day', 'issuer_name', 'product_name', 'quantity', 'revenue', 'line_count')
+
+def rollup_key(sale):
+    return timezone.localdate(sale.sale_date), sale.issuer_name
+
+def item_deltas(items, sign=1):
+    """Collapse SaleItems (with their sale loaded) into per-key deltas"""
+    deltas = defaultdict(lambda: [0, Decimal('0'), 0])
+    for item in items:
+        delta = deltas[rollup_key(item.sale) + (item.product_name,)]
+        delta[0] += sign * item.quantity
+        delta[1] += sign * item.quantity * Decimal(item.price)
+        delta[2] += sign
+    return deltas
+
+def sale_deltas(sale_id, key, sign=1, using=None):
+    """Deltas for every item of a stored sale, aggregated in the database"""
+    deltas = {}
+    rows = SaleItem.objects.db_manager(using).filter(sale_id=sale_id).order_by().values('product_name').annotate(
+        total_quantity=Sum('quantity'),
+        total_revenue=Sum(_revenue_expression()),
+        lines=Count('id'),
+    )
+    for row in rows:
+        deltas[key + (row['product_name'],)] = [
+            sign * row['total_quantity'],
+            sign * Decimal(row['total_revenue']),
+            sign * row['lines'],
+        ]
+    return deltas
+
+def apply_deltas(deltas, using=None):
+    """
+    Add deltas to the rollup rows and drop emptied ones
+    One INSERT ... ON CONFLICT DO UPDATE per batch of keys adds to existing rows and creates
+    missing ones, so a sale costs the same few statements however many products it has.
+    """
+    using = using or router.db_for_write(SalesRollup)
+    rows = [
+        key + (quantity, revenue, lines)
+        for key, (quantity, revenue, lines) in deltas.items()
+        if lines or quantity or revenue
+    ]
+    if not rows:
+        return
+    connection = connections[using]
+    fields = [SalesRollup._meta.get_field(name) for name in UPSERT_FIELDS]
+    batch_size = max(1, connection.ops.bulk_batch_size(fields, rows))
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                cursor.execute(_upsert_sql(connection, len(batch)), [
+                    field.get_db_prep_save(value, connection) for row in batch for field, value in zip(fields, row)
+                ])
+        # Only rows that lost lines can have emptied; look them up by key, not by scanning
+        emptied = [row[:3] for row in rows if row[-1] < 0]
+        for start in range(0, len(emptied), batch_size):
+            keys = reduce(operator.or_, (
+                Q(day=day, issuer_name=issuer_name, product_name=product_name)
+                for day, issuer_name, product_name in emptied[start:start + batch_size]
+            ))
+            SalesRollup.objects.using(using).filter(keys, line_count__lte=0).delete()
+
+def record_items(items, using=None):
+    """Add freshly inserted items to the rollups"""
+    apply_deltas(item_deltas(items), using)
+
+def rebuild():
+    """Recompute every rollup row from the raw sales tables, in every shard"""
+    return sum(fan_out(rebuild_shard))
+
+def rebuild_shard(using):
+    """Recompute one shard's rollup rows from its sales tables, archived sales included"""
+    # Archives only hold whole days before the hot rows start, so the two never share a key
+    rows = chain.from_iterable(
+        model.objects.using(using).order_by().values(
+            'product_name',
+            day=TruncDate('sale__sale_date'),
+            issuer=F('sale__issuer_name'),
+        ).annotate(
+            total_quantity=Sum('quantity'),
+            total_revenue=Sum(_revenue_expression()),
+            lines=Count('id'),
+        ).iterator(chunk_size=2000)
+        for model in (ArchivedSaleItem, SaleItem)
+    )
+
+    with transaction.atomic(using=using):
+        SalesRollup.objects.using(using).all().delete()
+        SalesRollup.objects.using(using).bulk_create((
+            SalesRollup(
+                day=row['day'],
+                issuer_name=row['issuer'],
+                product_name=row['product_name'],
+                quantity=row['total_quantity'],
+                revenue=row['total_revenue'],
+                line_count=row['lines'],
+            )
+            for row in rows
+        ), batch_size=500)
+    return SalesRollup.objects.using(using).count()
+
+def deleting_sales():
+    """Sale ids whose cascade delete is in progress on this thread"""
+    if not hasattr(_state, 'deleting'):
+        _state.deleting = set()
+    return _state.deleting
+
+def _upsert_sql(connection, count):
+    """INSERT of count rollup rows that adds the counters to rows already holding their key"""
+    quote = connection.ops.quote_name
+    table = quote(SalesRollup._meta.db_table)
+    columns = [quote(SalesRollup._meta.get_field(name).column) for name in UPSERT_FIELDS]
+    keys, counters = columns[:3], columns[3:]
+    row = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([row] * count)} "
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET "
+        + ', '.join(f'{column} = {table}.{column} + excluded.{column}' for column in counters)
+    )
+
+def _revenue_expression():
+    return ExpressionWrapper(F('quantity') * F('price'), output_field=DecimalField(max_digits=14, decimal_places=2))
@@ -0,0 +1,155 @@
+"""
+Type-ahead search over product and customer names
+SQLite: an FTS5 table per model using the trigram tokenizer, kept in sync with the
+base table by triggers (so bulk inserts are indexed too). PostgreSQL: a pg_trgm GIN
+index, which serves the ILIKE lookup. Migrations 0006 and 0015 create both with their own
+copy of the SQL below, so later changes here do not alter what they did. SQLite before
+3.34 has no trigram tokenizer; there substring matches fall back to LIKE.
+Prefix matches are read from a lower(name) index; see search() for ranking.
+
+Each FTS table indexes a {table}_fts_docs table of (docid INTEGER PRIMARY KEY, id, name)
+through content_rowid='docid', and searches join back to base rows on the docs' id. An
+INTEGER PRIMARY KEY is never renumbered, whereas the implicit rowid of a table without
+one, which the base tables have, may change on VACUUM. Triggers on the base table write
+the docs by id (a unique index), and triggers on the docs write the FTS index by docid.
+"""
+
+import sqlite3
+from django.db import connection
+from django.db.models.functions import Lower
+
+SEARCHABLE_TABLES = ['invoices_product', 'invoices_customer']
+SEARCH_COLUMN = 'name'
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MIN_TRIGRAM_LENGTH = 3
+# Substring candidates ranked per requested result
+CANDIDATE_WINDOW = 10
+PREFIX_SENTINEL = '\U0010ffff'
+SQLITE_TRIGRAM = sqlite3.sqlite_version_info >= (3, 34)
+
+def uses_fts(connection):
+    """Whether substring search on this connection reads the FTS5 trigram index"""
+    return connection.vendor == 'sqlite' and SQLITE_TRIGRAM
+
+def fts_table(table):
+    return f'{table}_fts'
+
+def docs_table(table):
+    return f'{table}_fts_docs'
+
+def search_trigger_sql(table, column=SEARCH_COLUMN):
+    """CREATE TRIGGER statements that keep a table's docs and FTS index in step with its rows"""
+    fts, docs = fts_table(table), docs_table(table)
+    return [
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {docs}(id, {column}) VALUES (new.id, new.{column}); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"DELETE FROM {docs} WHERE id = old.id; END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {column} ON {table} BEGIN "
+        f"UPDATE {docs} SET {column} = new.{column} WHERE id = old.id; END",
+        f"CREATE TRIGGER {docs}_ai AFTER INSERT ON {docs} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.docid, new.{column}); END",
+        f"CREATE TRIGGER {docs}_ad AFTER DELETE ON {docs} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.docid, old.{column}); END",
+        f"CREATE TRIGGER {docs}_au AFTER UPDATE OF {column} ON {docs} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.docid, old.{column}); "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.docid, new.{column}); END",
+    ]
+
+def rebuild_sql(table, column=SEARCH_COLUMN):
+    """Statements that refill a table's docs and FTS index from its rows"""
+    fts, docs = fts_table(table), docs_table(table)
+    return [
+        f'DELETE FROM {docs}',
+        f'INSERT INTO {docs}(id, {column}) SELECT id, {column} FROM {table}',
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+def install_search_index(schema_editor, tables=SEARCHABLE_TABLES):
+    """
+    Create the search index of each table, replacing any earlier one, and fill it
+    The same layout as migration 0015; rebuild_search_index uses it to install an index a
+    database is missing, for example one migrated before SQLite was upgraded to 3.34.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        if not SQLITE_TRIGRAM:
+            return
+        drop_search_index(schema_editor, tables)
+    for table in tables:
+        if vendor == 'sqlite':
+            fts, docs = fts_table(table), docs_table(table)
+            schema_editor.execute(
+                f"CREATE TABLE {docs} (docid INTEGER PRIMARY KEY, id char(32) NOT NULL UNIQUE, "
+                f"{SEARCH_COLUMN} varchar(255) NOT NULL)"
+            )
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {fts} USING fts5("
+                f"{SEARCH_COLUMN}, content='{docs}', content_rowid='docid', tokenize='trigram')"
+            )
+            for sql in search_trigger_sql(table) + rebuild_sql(table):
+                schema_editor.execute(sql)
+        elif vendor == 'postgresql':
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {table}_{SEARCH_COLUMN}_trgm ON {table} '
+                f'USING gin ({SEARCH_COLUMN} gin_trgm_ops)'
+            )
+
+def drop_search_index(schema_editor, tables=SEARCHABLE_TABLES):
+    vendor = schema_editor.connection.vendor
+    for table in tables:
+        if vendor == 'sqlite':
+            fts, docs = fts_table(table), docs_table(table)
+            for trigger in (fts, docs):
+                for suffix in ('ai', 'ad', 'au'):
+                    schema_editor.execute(f'DROP TRIGGER IF EXISTS {trigger}_{suffix}')
+            schema_editor.execute(f'DROP TABLE IF EXISTS {fts}')
+            schema_editor.execute(f'DROP TABLE IF EXISTS {docs}')
+        elif vendor == 'postgresql':
+            schema_editor.execute(f'DROP INDEX IF EXISTS {table}_{SEARCH_COLUMN}_trgm')
+
+def search(queryset, term, limit=DEFAULT_LIMIT):
+    """
+    Return up to limit objects whose name contains term
+    Case-insensitive prefix matches come first, read in name order from the lower(name)
+    index. Remaining slots are filled from a bounded window of substring matches, ranked
+    by match position and name length, so cost does not grow with the number of matches.
+    """
+    term = term.strip()
+    if not term:
+        return []
+    limit = max(1, min(limit, MAX_LIMIT))
+    lowered = term.lower()
+    
+    results = list(queryset.annotate(lower_name=Lower('name')).filter(
+        lower_name__gte=lowered,
+        lower_name__lt=lowered + PREFIX_SENTINEL,
+    ).order_by('lower_name')[:limit])
+    if len(results) >= limit or len(term) < MIN_TRIGRAM_LENGTH:
+        return results
+    
+    seen = {obj.pk for obj in results}
+    window = CANDIDATE_WINDOW * limit
+    candidates = [obj for obj in _substring_matches(queryset, term, window + len(results)) if obj.pk not in seen]
+    candidates.sort(key=lambda obj: (obj.name.lower().find(lowered), len(obj.name), obj.name))
+    return results + candidates[:limit - len(results)]
+
+def _substring_matches(queryset, term, window):
+    model = queryset.model
+    if not uses_fts(connection):
+        # pg_trgm's GIN index serves ILIKE on PostgreSQL; old SQLite scans with LIKE
+        return list(queryset.filter(name__icontains=term)[:window])
+    
+    table = model._meta.db_table
+    fts = fts_table(table)
+    phrase = '"' + term.replace('"', '""') + '"'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT d.id FROM {fts} f JOIN {docs_table(table)} d ON d.docid = f.rowid "
+            f"WHERE {fts} MATCH %s LIMIT %s",
+            [phrase, window],
+        )
+        ids = [model._meta.pk.to_python(row[0]) for row in cursor.fetchall()]
+    return list(queryset.in_bulk(ids).values())
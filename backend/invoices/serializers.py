@@ -1,34 +1,143 @@
+from decimal import Decimal
 from rest_framework import serializers
-from .models import Customer, Product, Sale, SaleItem
+from . import changes
+from .compiled import CompiledRepresentationMixin
+from .customer_cache import resolve_customer
+from .invoice_numbers import next_invoice_number
+from .models import Change, Customer, EmailJob, Product, Sale, SaleItem, normalize_customer_name
+from .rollups import record_items
+from .sharding import sales_atomic, shard_for_issuer
 
-class CustomerSerializer(serializers.ModelSerializer):
+def query_list(request, param):
+    """Split a comma separated query parameter into a set of names"""
+    if request is None:
+        return set()
+    value = request.query_params.get(param, '')
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+class SparseFieldsMixin:
+    """
+    Trim output with ?fields=a,b
+    Nested relations listed in expandable_fields are dropped unless named in ?expand=
+    """
+    expandable_fields = ()
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        requested = query_list(request, 'fields')
+        if not requested:
+            return
+        
+        keep = requested | (query_list(request, 'expand') & set(self.expandable_fields))
+        for name in list(self.fields):
+            if name not in keep:
+                self.fields.pop(name)
+    
+    @classmethod
+    def wants_field(cls, request, name):
+        """Whether a (possibly expensive) field will be rendered for this request"""
+        requested = query_list(request, 'fields')
+        if not requested:
+            return True
+        return name in requested or (name in cls.expandable_fields and name in query_list(request, 'expand'))
+
+class CustomerSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Customer
-        fields = ['id', 'name', 'email', 'phone', 'address', 'created_at']
+        fields = ['id', 'name', 'email', 'phone', 'address', 'created_at', 'updated_at']
+    
+    def validate_name(self, value):
+        duplicates = Customer.objects.filter(name_key=normalize_customer_name(value))
+        if self.instance is not None:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError('A customer with this name already exists.')
+        return value
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Product
-        fields = ['id', 'name', 'price', 'description', 'created_at']
+        fields = ['id', 'name', 'price', 'description', 'created_at', 'updated_at']
 
-class SaleItemSerializer(serializers.ModelSerializer):
+class SaleItemSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     total = serializers.ReadOnlyField()
     
     class Meta:
         model = SaleItem
-        fields = ['id', 'product', 'product_name', 'quantity', 'price', 'total', 'created_at']
+        fields = ['id', 'product', 'product_name', 'quantity', 'price', 'total', 'created_at', 'updated_at']
 
-class SaleSerializer(serializers.ModelSerializer):
+class SaleSerializer(CompiledRepresentationMixin, SparseFieldsMixin, serializers.ModelSerializer):
+    invoice_id = serializers.ReadOnlyField()
     sale_items = SaleItemSerializer(many=True, read_only=True)
-    customer_name = serializers.CharField(source='customer.name', read_only=True)
+    expandable_fields = ('sale_items',)
     
     class Meta:
         model = Sale
-        fields = ['id', 'customer', 'customer_name', 'sale_date', 'total', 'issuer_name', 'sale_items', 'created_at']
+        fields = ['id', 'invoice_number', 'invoice_id', 'customer', 'customer_name', 'sale_date', 'total', 'issuer_name', 'item_count',
+                  'sale_items', 'created_at', 'updated_at']
+    
+    def update(self, instance, validated_data):
+        if 'customer' in validated_data:
+            customer = validated_data['customer']
+            validated_data['customer_name'] = customer.name if customer else ''
+        return super().update(instance, validated_data)
+
+class SaleChangeSerializer(SaleSerializer):
+    """A sale in the change feed; its items are separate entries there"""
+    sale_items = None
+    
+    class Meta(SaleSerializer.Meta):
+        fields = [name for name in SaleSerializer.Meta.fields if name != 'sale_items']
+
+class SaleItemChangeSerializer(SaleItemSerializer):
+    """A sale item in the change feed, with the sale it belongs to"""
+    
+    class Meta(SaleItemSerializer.Meta):
+        fields = SaleItemSerializer.Meta.fields + ['sale']
+
+class SaleSummarySerializer(CompiledRepresentationMixin, serializers.Serializer):
+    """One row of the sales history table, read from Sale.objects.values(*SUMMARY_FIELDS)"""
+    SUMMARY_FIELDS = ('id', 'invoice_number', 'customer_name', 'total', 'sale_date', 'issuer_name', 'item_count')
+    
+    id = serializers.UUIDField()
+    invoice_number = serializers.IntegerField()
+    customer_name = serializers.CharField()
+    total = serializers.DecimalField(max_digits=10, decimal_places=2)
+    sale_date = serializers.DateTimeField()
+    issuer_name = serializers.CharField()
+    item_count = serializers.IntegerField()
+
+class SaleItemCreateSerializer(serializers.Serializer):
+    """One line item of a new sale"""
+    product_id = serializers.UUIDField(required=False, allow_null=True)
+    product_name = serializers.CharField(max_length=255)
+    quantity = serializers.IntegerField(min_value=1)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+def build_sale_items(sale, sale_items_data):
+    """Build unsaved SaleItem rows for a sale from validated items and return them with the sale total"""
+    sale_items = []
+    total = Decimal('0')
+    
+    for position, item_data in enumerate(sale_items_data):
+        quantity = item_data['quantity']
+        price = item_data['price']
+        total += quantity * price
+        sale_items.append(SaleItem(
+            sale=sale,
+            product_id=item_data.get('product_id'),
+            product_name=item_data['product_name'],
+            quantity=quantity,
+            price=price,
+            position=position
+        ))
+    
+    return sale_items, total
 
 class SaleCreateSerializer(serializers.ModelSerializer):
     customer_name = serializers.CharField(write_only=True)
-    sale_items = serializers.ListField(write_only=True)
+    sale_items = SaleItemCreateSerializer(many=True, allow_empty=False, write_only=True)
     
     class Meta:
         model = Sale
@@ -37,39 +146,57 @@ class SaleCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         customer_name = validated_data.pop('customer_name')
         sale_items_data = validated_data.pop('sale_items')
-        
-        # Create or get customer
-        customer, created = Customer.objects.get_or_create(
-            name=customer_name,
-            defaults={'name': customer_name}
-        )
-        
-        # Calculate total
-        total = sum(item['quantity'] * item['price'] for item in sale_items_data)
-        
-        # Create sale
-        sale = Sale.objects.create(
-            customer=customer,
-            total=total,
-            **validated_data
-        )
-        
-        # Create sale items
-        for item_data in sale_items_data:
-            SaleItem.objects.create(
-                sale=sale,
-                product_id=item_data.get('product_id'),
-                product_name=item_data['product_name'],
-                quantity=item_data['quantity'],
-                price=item_data['price']
-            )
+        return self.create_sale(customer_name, sale_items_data, validated_data)
+    
+    def create_sale(self, customer_name, sale_items_data, validated_data):
+        # Taken before the transaction so a block reservation is not held open by it
+        invoice_number = next_invoice_number()
+        using = shard_for_issuer(validated_data['issuer_name'])
+        with sales_atomic(using):
+            customer = resolve_customer(customer_name)
+            sale = Sale(invoice_number=invoice_number, customer=customer, customer_name=customer.name,
+                        **validated_data)
+            
+            # Build items and total in a single pass
+            sale_items, sale.total = build_sale_items(sale, sale_items_data)
+            sale.item_count = len(sale_items)
+            
+            sale.save(force_insert=True, using=using)
+            SaleItem.objects.using(using).bulk_create(sale_items)
+            record_items(sale_items, using)
+            changes.record(SaleItem, [item.pk for item in sale_items], Change.CREATED)
         
         return sale
 
-class SaleDetailSerializer(serializers.ModelSerializer):
+class SaleImportSerializer(SaleCreateSerializer):
+    """Validates one record of a bulk sales import"""
+    # Declared explicitly so validation does not run a uniqueness query per record
+    idempotency_key = serializers.CharField(max_length=255, required=False, allow_blank=False)
+    
+    class Meta(SaleCreateSerializer.Meta):
+        fields = SaleCreateSerializer.Meta.fields + ['idempotency_key']
+
+class SaleDetailSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
+    invoice_id = serializers.ReadOnlyField()
     sale_items = SaleItemSerializer(many=True, read_only=True)
     customers = CustomerSerializer(source='customer', read_only=True)
     
     class Meta:
         model = Sale
-        fields = ['id', 'customers', 'sale_date', 'total', 'issuer_name', 'sale_items', 'created_at']
\ No newline at end of file
+        fields = ['id', 'invoice_number', 'invoice_id', 'customers', 'sale_date', 'total', 'issuer_name', 'sale_items', 'created_at']
+
+class EmailJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EmailJob
+        fields = ['id', 'sale', 'recipient', 'status', 'attempts', 'max_attempts',
+                  'next_attempt_at', 'last_error', 'sent_at', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+class SalesReportSerializer(serializers.Serializer):
+    """One grouped row of a sales report; grouping fields are omitted when not grouped on"""
+    day = serializers.DateField(required=False)
+    issuer_name = serializers.CharField(required=False)
+    product_name = serializers.CharField(required=False)
+    quantity = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    line_count = serializers.IntegerField()
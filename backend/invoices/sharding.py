@@ -0,0 +1,198 @@
+"""
+Per-branch sales databases
+Sales can be spread over one database per branch, picked by the sale's issuer:
+SALES_SHARDS maps issuer names to database aliases, and every other issuer goes to
+SALES_DEFAULT_SHARD. Sales, their items, archives, rollups and email jobs live in the
+branch database; customers, products, invoice numbers and the change feed stay in the
+default database, the shared catalog. With no SALES_SHARDS everything is in default.
+
+SalesShardRouter sends a query on a branch model to the database of the row it is about
+(a sale, or the sale an item or email job belongs to). Queries with nothing to go by use
+the current shard, set with using_shard() and SALES_DEFAULT_SHARD otherwise. fan_out()
+runs a function against every shard in parallel, for lists and reports across branches;
+fetch_all(), in_bulk() and locate() build on it.
+
+Every shard gets the whole invoices schema (python manage.py migrate --database=<alias>).
+Sale and item references to customers and products carry no database constraint, and
+invoices.signals clears them in every shard when the customer or product is deleted.
+"""
+
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+SHARDED_MODELS = frozenset({'sale', 'saleitem', 'archivedsale', 'archivedsaleitem', 'salesrollup', 'emailjob',
+                            'archivedemailjob'})
+
+_current = contextvars.ContextVar('sales_shard', default=None)
+_executor = None
+_executor_lock = threading.Lock()
+
+def sale_databases():
+    """Aliases of the databases holding sales, the default shard first"""
+    databases = [settings.SALES_DEFAULT_SHARD]
+    for alias in settings.SALES_SHARDS.values():
+        if alias not in databases:
+            databases.append(alias)
+    return databases
+
+def is_sharded():
+    return sale_databases() != [DEFAULT_DB_ALIAS]
+
+def shard_for_issuer(issuer_name):
+    return settings.SALES_SHARDS.get(issuer_name, settings.SALES_DEFAULT_SHARD)
+
+def is_sharded_model(model):
+    return model._meta.app_label == 'invoices' and model._meta.model_name in SHARDED_MODELS
+
+def current_shard():
+    return _current.get() or settings.SALES_DEFAULT_SHARD
+
+@contextmanager
+def using_shard(alias):
+    """Send branch queries that are not tied to a row to the given database"""
+    token = _current.set(alias)
+    try:
+        yield alias
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def sales_atomic(using):
+    """
+    transaction.atomic() on the catalog and on the shard `using`, for writes that touch both
+    (new customers, change feed rows). They are one transaction when the shard is the default
+    database; otherwise the shard commits first and there is no two-phase commit.
+    """
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        if using == DEFAULT_DB_ALIAS:
+            yield
+        else:
+            with transaction.atomic(using=using):
+                yield
+
+def database_of(instance):
+    """Database a branch row is stored in, or belongs in when it is not saved yet"""
+    if instance._state.db:
+        return instance._state.db
+    issuer_name = getattr(instance, 'issuer_name', None)
+    if issuer_name is not None:
+        return shard_for_issuer(issuer_name)
+    field = next((f for f in instance._meta.concrete_fields if f.name == 'sale'), None)
+    if field is not None and field.is_cached(instance) and field.get_cached_value(instance) is not None:
+        return database_of(field.get_cached_value(instance))
+    return current_shard()
+
+def fan_out(function, databases=None):
+    """
+    [function(alias) for alias in databases], every shard by default
+    Calls run in parallel on a thread pool, each with its database as the current shard,
+    and only inline when there is a single database. They use their own connections, so
+    they do not see the caller's uncommitted writes; do not fan out from inside a fan out.
+    """
+    databases = list(databases or sale_databases())
+    if len(databases) == 1:
+        # Inline on the caller's connection, which may be inside a transaction
+        with using_shard(databases[0]):
+            return [function(databases[0])]
+    executor = _get_executor()
+    futures = [executor.submit(contextvars.copy_context().run, _run, function, alias) for alias in databases]
+    return [future.result() for future in futures]
+
+def fetch_all(queryset, key=None, reverse=False, limit=None):
+    """
+    list(queryset[:limit]), read from every shard for a branch model
+    Each shard returns its rows in the queryset's order, which key(row) and reverse describe,
+    and they are merged in that order; without a key they are concatenated. A queryset with
+    an explicit using() reads only its own database.
+    """
+    if queryset._db is not None or not is_sharded_model(queryset.model) or not is_sharded():
+        return list(queryset if limit is None else queryset[:limit])
+    pages = fan_out(lambda using: list(queryset.using(using) if limit is None else queryset.using(using)[:limit]))
+    rows = itertools.chain.from_iterable(pages) if key is None else heapq.merge(*pages, key=key, reverse=reverse)
+    return list(itertools.islice(rows, limit))
+
+def in_bulk(queryset, ids):
+    """queryset.in_bulk(ids), gathered from every shard for a branch model"""
+    if queryset._db is not None or not is_sharded_model(queryset.model) or not is_sharded():
+        return queryset.in_bulk(ids)
+    found = {}
+    for objects in fan_out(lambda using: queryset.using(using).in_bulk(ids)):
+        found.update(objects)
+    return found
+
+def locate(queryset, **lookup):
+    """Alias of the first shard with a row of queryset matching lookup, or None"""
+    def exists(using):
+        try:
+            return queryset.using(using).filter(**lookup).exists()
+        except (TypeError, ValueError, ValidationError):
+            # A malformed key matches nothing; the caller's own lookup reports it
+            return False
+    databases = sale_databases()
+    return next((using for using, found in zip(databases, fan_out(exists, databases)) if found), None)
+
+def with_customer(queryset):
+    """Sales with their customer loaded: joined, or prefetched from the catalog when sharded"""
+    if is_sharded():
+        # A shard's customer table is empty, so a join would find no customers
+        return queryset.prefetch_related('customer')
+    return queryset.select_related('customer')
+
+def _run(function, alias):
+    # Pool threads keep their connections between calls; drop broken or expired ones
+    connections[alias].close_if_unusable_or_obsolete()
+    with using_shard(alias):
+        return function(alias)
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.SALES_SHARD_WORKERS, thread_name_prefix='sales-shard')
+        return _executor
+
+def _reset_after_fork():
+    # The pool's threads do not survive a fork
+    global _executor
+    _executor = None
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+class SalesShardRouter:
+    """Route branch models to their shard and the rest of the invoices app to the catalog"""
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints.get('instance'))
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints.get('instance'))
+
+    def _route(self, model, instance):
+        if model._meta.app_label != 'invoices':
+            return None
+        if not is_sharded_model(model):
+            # Explicit, or Django would follow a related sale's database
+            return DEFAULT_DB_ALIAS
+        if instance is not None and is_sharded_model(type(instance)):
+            return database_of(instance)
+        return current_shard()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if obj1._meta.app_label == 'invoices' and obj2._meta.app_label == 'invoices':
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Branch-only databases get the invoices schema and nothing else
+        if db != DEFAULT_DB_ALIAS and db in sale_databases():
+            return app_label == 'invoices'
+        return None
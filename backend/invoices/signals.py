@@ -0,0 +1,175 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Change, Customer, Product, Sale, SaleItem
+from .customer_cache import get_customer_cache
+from .metrics import route_queries
+from .pdf_cache import get_pdf_cache
+from . import catalog_cache, changes, rollups
+from .sharding import sale_databases
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Switch SQLite to WAL so concurrent workers only serialize on writes"""
+    if connection.vendor != 'sqlite' or not settings.SQLITE_WAL:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+
+@receiver(connection_created)
+def install_query_metrics(sender, connection, **kwargs):
+    """Let MetricsMiddleware count queries on whichever connection a request uses"""
+    if route_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(route_queries)
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Customer)
+def invalidate_catalog(sender, instance, **kwargs):
+    catalog_cache.invalidate(sender._meta.model_name, instance.pk)
+
+@receiver([post_save, post_delete], sender=Customer)
+def invalidate_customer_cache(sender, instance, **kwargs):
+    get_customer_cache().invalidate(instance.pk)
+
+# Denormalized sale summary fields
+
+def update_rows(model, rows, **values):
+    """rows.update(**values), bumping updated_at and recording the change, which update() skips"""
+    ids = list(rows.values_list('pk', flat=True))
+    if ids:
+        model.objects.using(rows.db).filter(pk__in=ids).update(updated_at=timezone.now(), **values)
+        changes.record(model, ids, Change.UPDATED)
+
+def update_sale(using, sale_id, **values):
+    Sale.objects.using(using).filter(pk=sale_id).update(updated_at=timezone.now(), **values)
+    changes.record(Sale, [sale_id], Change.UPDATED)
+
+# Customers and products are in the catalog database; their sales may be in any shard
+
+@receiver(post_save, sender=Customer)
+def rename_customer_sales(sender, instance, created, **kwargs):
+    if not created:
+        for using in sale_databases():
+            sales = Sale.objects.using(using).filter(customer_id=instance.pk).exclude(customer_name=instance.name)
+            update_rows(Sale, sales, customer_name=instance.name)
+
+@receiver(pre_delete, sender=Customer)
+def clear_customer_sales(sender, instance, using, **kwargs):
+    # Wait for sales being created for this customer (resolve_customer locks it) so they
+    # are cleared too. The delete that follows sets the customer to NULL, but only in its
+    # own database.
+    Customer.objects.using(using).select_for_update().filter(pk=instance.pk).exists()
+    for database in sale_databases():
+        sales = Sale.objects.using(database).filter(customer_id=instance.pk)
+        if database == using:
+            update_rows(Sale, sales, customer_name='')
+        else:
+            update_rows(Sale, sales, customer_name='', customer=None)
+
+@receiver(pre_delete, sender=Product)
+def touch_product_sale_items(sender, instance, using, **kwargs):
+    # The delete that follows sets their product to NULL without saving them, and only in
+    # its own database
+    for database in sale_databases():
+        items = SaleItem.objects.using(database).filter(product_id=instance.pk)
+        if database == using:
+            update_rows(SaleItem, items)
+        else:
+            update_rows(SaleItem, items, product=None)
+
+@receiver(post_save, sender=SaleItem)
+def count_saved_sale_item(sender, instance, created, using, **kwargs):
+    # bulk_create skips this; callers set item_count on the sale themselves
+    previous = getattr(instance, '_rollup_previous', None)
+    if created:
+        update_sale(using, instance.sale_id, item_count=F('item_count') + 1)
+    elif previous is not None and previous.sale_id != instance.sale_id:
+        update_sale(using, previous.sale_id, item_count=F('item_count') - 1)
+        update_sale(using, instance.sale_id, item_count=F('item_count') + 1)
+
+@receiver(post_delete, sender=SaleItem)
+def count_deleted_sale_item(sender, instance, using, **kwargs):
+    if instance.sale_id not in rollups.deleting_sales():
+        update_sale(using, instance.sale_id, item_count=F('item_count') - 1)
+
+@receiver([post_save, post_delete], sender=Sale)
+def invalidate_sale_pdf(sender, instance, **kwargs):
+    get_pdf_cache().invalidate(instance.pk)
+
+@receiver([post_save, post_delete], sender=SaleItem)
+def invalidate_sale_item_pdf(sender, instance, **kwargs):
+    get_pdf_cache().invalidate(instance.sale_id)
+
+# Change feed (bulk_create callers record their own changes)
+
+@receiver(post_save, sender=SaleItem)
+@receiver(post_save, sender=Sale)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Customer)
+def record_saved_change(sender, instance, created, **kwargs):
+    changes.record(sender, [instance.pk], Change.CREATED if created else Change.UPDATED)
+
+@receiver(post_delete, sender=SaleItem)
+@receiver(post_delete, sender=Sale)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Customer)
+def record_deleted_change(sender, instance, **kwargs):
+    changes.record(sender, [instance.pk], Change.DELETED)
+
+# Sales rollups
+
+@receiver(pre_save, sender=Sale)
+def remember_sale_rollup_key(sender, instance, using, **kwargs):
+    instance._rollup_key = None
+    if not instance._state.adding:
+        previous = Sale.objects.using(using).filter(pk=instance.pk).values('sale_date', 'issuer_name').first()
+        if previous:
+            instance._rollup_key = rollups.rollup_key(Sale(**previous))
+
+@receiver(post_save, sender=Sale)
+def move_sale_rollups(sender, instance, created, using, **kwargs):
+    previous_key = getattr(instance, '_rollup_key', None)
+    current_key = rollups.rollup_key(instance)
+    if created or previous_key is None or previous_key == current_key:
+        return
+    deltas = rollups.sale_deltas(instance.pk, previous_key, sign=-1, using=using)
+    deltas.update(rollups.sale_deltas(instance.pk, current_key, using=using))
+    rollups.apply_deltas(deltas, using)
+
+@receiver(pre_delete, sender=Sale)
+def remove_sale_rollups(sender, instance, using, **kwargs):
+    # Items are deleted by the cascade; skip them in remove_sale_item_rollups
+    rollups.deleting_sales().add(instance.pk)
+    rollups.apply_deltas(rollups.sale_deltas(instance.pk, rollups.rollup_key(instance), sign=-1, using=using), using)
+
+@receiver(post_delete, sender=Sale)
+def forget_deleted_sale(sender, instance, **kwargs):
+    rollups.deleting_sales().discard(instance.pk)
+
+@receiver(pre_save, sender=SaleItem)
+def remember_sale_item_rollup(sender, instance, using, **kwargs):
+    instance._rollup_previous = None
+    if not instance._state.adding:
+        instance._rollup_previous = SaleItem.objects.using(using).select_related('sale').filter(pk=instance.pk).first()
+
+@receiver(post_save, sender=SaleItem)
+def update_sale_item_rollups(sender, instance, using, **kwargs):
+    deltas = rollups.item_deltas([instance])
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None:
+        for key, (quantity, revenue, lines) in rollups.item_deltas([previous], sign=-1).items():
+            delta = deltas[key]
+            delta[0] += quantity
+            delta[1] += revenue
+            delta[2] += lines
+    rollups.apply_deltas(deltas, using)
+
+@receiver(post_delete, sender=SaleItem)
+def remove_sale_item_rollups(sender, instance, using, **kwargs):
+    if instance.sale_id in rollups.deleting_sales():
+        return
+    rollups.apply_deltas(rollups.item_deltas([instance], sign=-1), using)
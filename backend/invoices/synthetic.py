@@ -0,0 +1,205 @@
+"""
+Synthetic data at production scale
+Customers, products and sales are written with bulk_create in batches, so millions of
+rows can be generated without holding them in memory. Popularity is skewed the way real
+tills are: a few products and regular customers account for most sales, most sales have
+one to three lines, and sale dates are spread over a configurable number of days.
+Used by the generate_data management command.
+"""
+
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from django.utils import timezone
+from . import changes, rollups
+from .catalog_cache import invalidate
+from .invoice_numbers import allocate_invoice_numbers
+from .models import Change, Customer, Product, Sale, SaleItem, normalize_customer_name
+from .sharding import sales_atomic, shard_for_issuer
+
+FIRST_NAMES = ['Aisha', 'Chinedu', 'Fatima', 'Emeka', 'Ngozi', 'Musa', 'Tunde', 'Zainab', 'Ibrahim',
+               'Funmi', 'Yusuf', 'Amaka', 'Sani', 'Kemi', 'Bola', 'Hauwa', 'Obinna', 'Halima']
+LAST_NAMES = ['Bello', 'Okafor', 'Adeyemi', 'Abubakar', 'Eze', 'Lawal', 'Okonkwo', 'Danjuma',
+              'Balogun', 'Nwosu', 'Garba', 'Ogunleye', 'Usman', 'Chukwu', 'Aliyu', 'Ibekwe']
+CITIES = ['Lagos', 'Abuja', 'Kano', 'Ibadan', 'Port Harcourt', 'Kaduna', 'Enugu', 'Jos']
+PRODUCT_KINDS = ['Laptop', 'Mouse', 'Keyboard', 'Monitor', 'Headphones', 'Webcam', 'Speaker', 'Router',
+                 'Printer', 'Tablet', 'Phone', 'Charger', 'Cable', 'Flash Drive', 'Hard Drive', 'UPS']
+PRODUCT_BRANDS = ['Yaro', 'Sahel', 'Niger', 'Zuma', 'Delta', 'Kainji', 'Obudu', 'Jos']
+
+# Weights for the number of lines on a sale (1, 2, 3, ...)
+ITEM_COUNT_WEIGHTS = [40, 25, 15, 8, 5, 3, 2, 1, 0.5, 0.5]
+QUANTITY_WEIGHTS = [70, 18, 7, 3, 2]
+
+def generate(customers=0, products=0, sales=0, days=365, issuers=5, walk_in_rate=0.05,
+             batch_size=2000, seed=None, rebuild_rollups=True, progress=None):
+    """
+    Add the given number of customers, products and sales and return the counts written
+    Sales draw on every customer and product in the database, including existing ones.
+    progress, if given, is called as progress(kind, done, total, elapsed).
+    """
+    rng = random.Random(seed)
+    written = {
+        'customers': _generate_customers(rng, customers, batch_size, progress),
+        'products': _generate_products(rng, products, batch_size, progress),
+    }
+    written['sales'], written['sale_items'] = _generate_sales(
+        rng, sales, days, issuers, walk_in_rate, batch_size, progress
+    )
+    if written['sales'] and rebuild_rollups:
+        rollups.rebuild()
+    return written
+
+def _uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+def _batches(total, batch_size):
+    for start in range(0, total, batch_size):
+        yield start, min(batch_size, total - start)
+
+def _zipf_weights(count, exponent=1.1):
+    """Cumulative weights putting most of the mass on the first few entries"""
+    weights, total = [], 0.0
+    for rank in range(1, count + 1):
+        total += 1 / rank ** exponent
+        weights.append(total)
+    return weights
+
+def _report(progress, kind, done, total, started):
+    if progress is not None:
+        progress(kind, done, total, time.perf_counter() - started)
+
+def _generate_customers(rng, total, batch_size, progress):
+    started = time.perf_counter()
+    offset = Customer.objects.count()
+    for start, size in _batches(total, batch_size):
+        batch = []
+        for number in range(offset + start, offset + start + size):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            name = f'{first} {last} {number}'
+            batch.append(Customer(
+                id=_uuid(rng),
+                name=name,
+                name_key=normalize_customer_name(name),
+                email=f'{first}.{last}.{number}@example.com'.lower(),
+                phone=f'+234-80{rng.randrange(10)}-{rng.randrange(10000):04d}',
+                address=f'{rng.randrange(1, 200)} {rng.choice(LAST_NAMES)} Street, {rng.choice(CITIES)}',
+            ))
+        Customer.objects.bulk_create(batch)
+        changes.record(Customer, [customer.pk for customer in batch], Change.CREATED)
+        _report(progress, 'customers', start + size, total, started)
+    if total:
+        # bulk_create skips post_save, so drop cached customer lists here
+        invalidate(Customer._meta.model_name)
+    return total
+
+def _generate_products(rng, total, batch_size, progress):
+    started = time.perf_counter()
+    offset = Product.objects.count()
+    for start, size in _batches(total, batch_size):
+        batch = []
+        for number in range(offset + start, offset + start + size):
+            kind = rng.choice(PRODUCT_KINDS)
+            batch.append(Product(
+                id=_uuid(rng),
+                name=f'{rng.choice(PRODUCT_BRANDS)} {kind} {number}',
+                price=Decimal(rng.randrange(500, 50000) * 10).quantize(Decimal('0.01')),
+                description=f'Synthetic {kind.lower()}',
+            ))
+        Product.objects.bulk_create(batch)
+        changes.record(Product, [product.pk for product in batch], Change.CREATED)
+        _report(progress, 'products', start + size, total, started)
+    if total:
+        invalidate(Product._meta.model_name)
+    return total
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create store the sale_date/created_at/updated_at set on the instances instead of now()"""
+    flags = [(field, flag) for model in models for field in model._meta.concrete_fields
+             for flag in ('auto_now', 'auto_now_add') if getattr(field, flag, False)]
+    for field, flag in flags:
+        setattr(field, flag, False)
+    try:
+        yield
+    finally:
+        for field, flag in flags:
+            setattr(field, flag, True)
+
+def _generate_sales(rng, total, days, issuers, walk_in_rate, batch_size, progress):
+    if not total:
+        return 0, 0
+    customers = list(Customer.objects.order_by('id').values_list('id', 'name'))
+    products = list(Product.objects.order_by('id').values_list('id', 'name', 'price'))
+    if not products:
+        raise ValueError('Sales need at least one product; generate some first')
+
+    # Shuffle so the popular entries are not just the alphabetically first ones
+    rng.shuffle(customers)
+    rng.shuffle(products)
+    customer_weights = _zipf_weights(len(customers), exponent=0.8)
+    product_weights = _zipf_weights(len(products))
+    item_counts = range(1, len(ITEM_COUNT_WEIGHTS) + 1)
+    quantities = range(1, len(QUANTITY_WEIGHTS) + 1)
+    issuer_names = [f'Issuer {number + 1}' for number in range(issuers)]
+
+    now = timezone.now()
+    span_seconds = max(days, 1) * 86400
+    started = time.perf_counter()
+    item_total = 0
+
+    with explicit_timestamps(Sale, SaleItem):
+        for start, size in _batches(total, batch_size):
+            # Sales and items per database, as issuers may map to different shards
+            shards = {}
+            for invoice_number in allocate_invoice_numbers(size):
+                if customers and rng.random() >= walk_in_rate:
+                    customer_id, customer_name = rng.choices(customers, cum_weights=customer_weights)[0]
+                else:
+                    customer_id, customer_name = None, ''
+                sale_date = now - timedelta(seconds=rng.randrange(span_seconds))
+                sale_id = _uuid(rng)
+                issuer_name = rng.choice(issuer_names)
+                sales, items = shards.setdefault(shard_for_issuer(issuer_name), ([], []))
+                sale = Sale(
+                    id=sale_id,
+                    invoice_number=invoice_number,
+                    customer_id=customer_id,
+                    customer_name=customer_name,
+                    issuer_name=issuer_name,
+                    sale_date=sale_date,
+                    created_at=sale_date,
+                    updated_at=sale_date,
+                )
+                lines = rng.choices(item_counts, weights=ITEM_COUNT_WEIGHTS)[0]
+                sale_total = Decimal('0')
+                chosen = rng.choices(products, cum_weights=product_weights, k=lines)
+                for position, (product_id, product_name, price) in enumerate(chosen):
+                    quantity = rng.choices(quantities, weights=QUANTITY_WEIGHTS)[0]
+                    items.append(SaleItem(
+                        id=_uuid(rng),
+                        sale=sale,
+                        product_id=product_id,
+                        product_name=product_name,
+                        quantity=quantity,
+                        price=price,
+                        position=position,
+                        created_at=sale_date,
+                        updated_at=sale_date,
+                    ))
+                    sale_total += quantity * price
+                sale.total = sale_total
+                sale.item_count = lines
+                sales.append(sale)
+
+            for using, (sales, items) in shards.items():
+                with sales_atomic(using):
+                    Sale.objects.using(using).bulk_create(sales)
+                    SaleItem.objects.using(using).bulk_create(items)
+                    changes.record(Sale, [sale.pk for sale in sales], Change.CREATED)
+                    changes.record(SaleItem, [item.pk for item in items], Change.CREATED)
+                item_total += len(items)
+            _report(progress, 'sales', start + size, total, started)
+    return total, item_total
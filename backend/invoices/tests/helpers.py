@@ -0,0 +1,14 @@
+"""Payloads and settings shared by the invoices tests"""
+
+from invoices.tests.query_budget import CACHE_OVERRIDE
+
+# Local caches and every sale in the test database
+TEST_SETTINGS = {'CACHES': CACHE_OVERRIDE, 'SALES_SHARDS': {}, 'SALES_DEFAULT_SHARD': 'default'}
+
+
+def sale_payload(customer_name='Ada Obi', **fields):
+    return dict({
+        'customer_name': customer_name,
+        'issuer_name': 'Main',
+        'sale_items': [{'product_name': 'Item', 'quantity': 2, 'price': '150.00'}],
+    }, **fields)
@@ -0,0 +1,171 @@
+"""
+SQL query budgets for the API actions
+Each scenario runs one request against a small fixture and counts the SQL statements
+it issues, streamed bodies included. check_query_budgets compares the counts with
+invoices/query_budgets.json, and test_query_budgets asserts them exactly.
+"""
+
+import json
+from asgiref.sync import async_to_sync
+from pathlib import Path
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+from invoices.catalog_cache import get_cache as get_catalog_cache
+from invoices.customer_cache import get_customer_cache
+from invoices.pdf_cache import get_pdf_cache
+from invoices.serializers import SaleCreateSerializer
+
+BUDGETS_FILE = Path(__file__).resolve().parent.parent / 'query_budgets.json'
+CACHE_OVERRIDE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'catalog': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'query-budget'},
+}
+# The uncached path, without touching a shared file-based cache, with every sale in the
+# default database: the counts are taken on its connection and fan out threads would not
+# see the rolled back fixture. Invoices render in-process and the sale stream ends at once.
+SETTINGS_OVERRIDE = {
+    'CACHES': CACHE_OVERRIDE,
+    'SALES_SHARDS': {},
+    'SALES_DEFAULT_SHARD': 'default',
+    'INVOICE_RENDER_WORKERS': 1,
+    'SALE_STREAM_LIFETIME': 0,
+}
+
+def seed():
+    """Create the fixture every scenario runs against"""
+    from django.contrib.auth.models import User
+    from invoices.changes import encode_cursor, head_id
+    from invoices.models import Customer, EmailJob, Product
+    changes_cursor = encode_cursor(head_id())
+    customers = [Customer.objects.create(name=f'Budget Customer {i}', email=f'c{i}@example.com') for i in range(3)]
+    products = [Product.objects.create(name=f'Budget Product {i}', price=1000 * (i + 1)) for i in range(3)]
+    sales = []
+    for i in range(4):
+        serializer = SaleCreateSerializer(data={
+            'customer_name': customers[i % len(customers)].name,
+            'issuer_name': 'Budget',
+            'sale_items': [
+                {'product_id': str(product.id), 'product_name': product.name, 'quantity': i + 1, 'price': str(product.price)}
+                for product in products
+            ],
+        })
+        serializer.is_valid(raise_exception=True)
+        sales.append(serializer.save())
+    job = EmailJob.objects.create(sale=sales[0], recipient='info@example.com')
+    admin = User.objects.create_superuser('budget-admin', 'admin@example.com', 'budget-password')
+    return {'customer': customers[0], 'product': products[0], 'sale': sales[0], 'email_job': job, 'admin_user': admin,
+            'changes_cursor': changes_cursor}
+
+def _sale_payload(name='Budget Customer 0'):
+    return {
+        'customer_name': name,
+        'issuer_name': 'Budget',
+        'sale_items': [{'product_name': 'Item', 'quantity': 2, 'price': '150.00'} for _ in range(5)],
+    }
+
+def _read(response):
+    """Consume a streamed body inside the measurement, where its queries run"""
+    if response.streaming:
+        if response.is_async:
+            async_to_sync(_drain)(response.streaming_content)
+        else:
+            b''.join(response.streaming_content)
+    return response
+
+async def _drain(chunks):
+    async for _ in chunks:
+        pass
+
+def scenarios(fixture):
+    """Map scenario name to a callable issuing one request"""
+    customer = f"/api/customers/{fixture['customer'].id}/"
+    product = f"/api/products/{fixture['product'].id}/"
+    sale = f"/api/sales/{fixture['sale'].id}/"
+    # Admin pages go through a separately logged in client, so the API scenarios stay anonymous
+    admin = fixture['admin_client']
+    return {
+        'customers.list': lambda c: c.get('/api/customers/'),
+        'customers.list.paginated': lambda c: c.get('/api/customers/?page_size=2'),
+        'customers.retrieve': lambda c: c.get(customer),
+        'customers.create': lambda c: c.post('/api/customers/', {'name': 'New Customer'}, format='json'),
+        'customers.update': lambda c: c.put(customer, {'name': 'Renamed Customer'}, format='json'),
+        'customers.partial_update': lambda c: c.patch(customer, {'phone': '+234-800-0000'}, format='json'),
+        'customers.destroy': lambda c: c.delete(customer),
+        'products.list': lambda c: c.get('/api/products/'),
+        'products.list.paginated': lambda c: c.get('/api/products/?page_size=2'),
+        'products.retrieve': lambda c: c.get(product),
+        'products.create': lambda c: c.post('/api/products/', {'name': 'New Product', 'price': '10.00'}, format='json'),
+        'products.update': lambda c: c.put(product, {'name': 'Renamed Product', 'price': '12.00'}, format='json'),
+        'products.partial_update': lambda c: c.patch(product, {'price': '11.00'}, format='json'),
+        'products.destroy': lambda c: c.delete(product),
+        'products.search': lambda c: c.get('/api/products/?q=Budget'),
+        'customers.search': lambda c: c.get('/api/customers/?q=Budget'),
+        'sales.list': lambda c: c.get('/api/sales/'),
+        'sales.list.paginated': lambda c: c.get('/api/sales/?page_size=2'),
+        'sales.list.sparse': lambda c: c.get('/api/sales/?fields=id,total,sale_date'),
+        'sales.summary': lambda c: c.get('/api/sales/summary/'),
+        'sales.summary.paginated': lambda c: c.get('/api/sales/summary/?page_size=2'),
+        'sales.retrieve': lambda c: c.get(sale),
+        'sales.by_number': lambda c: c.get(f"/api/sales/by-number/{fixture['sale'].invoice_id}/"),
+        'sales.create': lambda c: c.post('/api/sales/', _sale_payload(), format='json'),
+        'sales.create.new_customer': lambda c: c.post('/api/sales/', _sale_payload('Walk-in'), format='json'),
+        'sales.update': lambda c: c.put(sale, {'customer': str(fixture['customer'].id), 'issuer_name': 'Other'}, format='json'),
+        'sales.partial_update': lambda c: c.patch(sale, {'issuer_name': 'Other'}, format='json'),
+        'sales.destroy': lambda c: c.delete(sale),
+        'sales.bulk': lambda c: c.post('/api/sales/bulk/', [_sale_payload(f'Bulk {i}') for i in range(10)], format='json'),
+        'sales.invoice_data': lambda c: c.get(f'{sale}invoice_data/'),
+        'sales.invoice_pdf': lambda c: c.get(f'{sale}invoice.pdf/'),
+        'sales.send_email': lambda c: c.post(f'{sale}send_email/'),
+        'sales.export.csv': lambda c: _read(c.get('/api/sales/export/?format=csv')),
+        'sales.export.ndjson': lambda c: _read(c.get('/api/sales/export/?format=ndjson')),
+        'sales.invoices.zip': lambda c: _read(c.get(f"/api/sales/invoices/?ids={fixture['sale'].id}")),
+        'sales.invoices.pdf': lambda c: _read(c.get(f"/api/sales/invoices/?ids={fixture['sale'].id}&output=pdf")),
+        'sales.stream': lambda c: _read(c.get('/api/sales/stream/')),
+        'email_jobs.list': lambda c: c.get('/api/email-jobs/'),
+        'email_jobs.retrieve': lambda c: c.get(f"/api/email-jobs/{fixture['email_job'].id}/"),
+        'reports.list': lambda c: c.get('/api/reports/'),
+        'reports.daily': lambda c: c.get('/api/reports/daily/'),
+        'reports.issuers': lambda c: c.get('/api/reports/issuers/'),
+        'reports.products': lambda c: c.get('/api/reports/products/?issuer=Budget'),
+        'changes.head': lambda c: c.get('/api/changes/'),
+        'changes.list': lambda c: c.get(f"/api/changes/?since={fixture['changes_cursor']}"),
+        'changes.list.models': lambda c: c.get(f"/api/changes/?since={fixture['changes_cursor']}&models=sale"),
+        'admin.sale.changelist': lambda c: admin.get('/admin/invoices/sale/'),
+        'admin.sale.changelist.filtered': lambda c: admin.get('/admin/invoices/sale/?issuer_name=Budget'),
+        'admin.sale.changelist.search': lambda c: admin.get('/admin/invoices/sale/?q=Budget'),
+        'admin.sale.change': lambda c: admin.get(f"/admin/invoices/sale/{fixture['sale'].id}/change/"),
+        'admin.saleitem.changelist': lambda c: admin.get('/admin/invoices/saleitem/'),
+        'admin.emailjob.changelist': lambda c: admin.get('/admin/invoices/emailjob/'),
+    }
+
+def measure():
+    """Run every scenario in a rolled back transaction and return {name: (queries, status code)}"""
+    results = {}
+    client = APIClient(SERVER_NAME='localhost')
+    
+    with override_settings(**SETTINGS_OVERRIDE), transaction.atomic():
+        fixture = seed()
+        fixture['admin_client'] = APIClient(SERVER_NAME='localhost')
+        fixture['admin_client'].force_login(fixture['admin_user'])
+        for name, request in scenarios(fixture).items():
+            get_pdf_cache().clear()
+            get_catalog_cache().clear()
+            get_customer_cache().clear()
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as queries:
+                    response = request(client)
+                transaction.set_rollback(True)
+            results[name] = (len(queries.captured_queries), response.status_code)
+        transaction.set_rollback(True)
+    
+    return results
+
+def load_budgets():
+    if not BUDGETS_FILE.exists():
+        return {}
+    return json.loads(BUDGETS_FILE.read_text())
+
+def save_budgets(results):
+    budgets = {name: count for name, (count, _) in sorted(results.items())}
+    BUDGETS_FILE.write_text(json.dumps(budgets, indent=2) + '\n')
@@ -0,0 +1,72 @@
+"""Bulk sales import: POST /api/sales/bulk/ and its per-record results"""
+
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from invoices.archive import archive_sales
+from invoices.bulk import CREATED, DUPLICATE, ERROR, _insert_one
+from invoices.models import ArchivedSale, Customer, Sale
+from invoices.tests.helpers import TEST_SETTINGS, sale_payload
+
+
+@override_settings(**TEST_SETTINGS)
+class SaleBulkImportTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient(SERVER_NAME='localhost')
+
+    def bulk(self, records):
+        response = self.client.post('/api/sales/bulk/', records, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_reports_each_record(self):
+        data = self.bulk([
+            sale_payload(idempotency_key='till-1'),
+            sale_payload(sale_items=[{'product_name': 'Item', 'quantity': -1, 'price': '10.00'}]),
+            'not a sale',
+            sale_payload(idempotency_key='till-1'),
+            sale_payload('Bola Ade', idempotency_key='till-2'),
+        ])
+        self.assertEqual(data['summary'], {CREATED: 2, DUPLICATE: 1, ERROR: 2})
+        results = data['results']
+        self.assertEqual([result['index'] for result in results], [0, 1, 2, 3, 4])
+        self.assertEqual([result['status'] for result in results], [CREATED, ERROR, ERROR, DUPLICATE, CREATED])
+        self.assertEqual(set(results[1]['errors']['sale_items'][0]), {'quantity'})
+        self.assertEqual(results[2]['errors'], {'non_field_errors': ['Expected an object']})
+        self.assertEqual(results[3]['duplicate_of'], 0)
+        self.assertEqual(Sale.objects.count(), 2)
+
+    def test_rejects_a_body_that_is_not_a_list(self):
+        response = self.client.post('/api/sales/bulk/', sale_payload(), format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_replayed_records_are_duplicates_of_the_first_import(self):
+        first = self.bulk([sale_payload(idempotency_key='till-1'), sale_payload(idempotency_key='till-2')])
+        again = self.bulk([sale_payload(idempotency_key='till-2'), sale_payload(idempotency_key='till-1')])
+        self.assertEqual(again['summary'], {CREATED: 0, DUPLICATE: 2, ERROR: 0})
+        self.assertEqual([result['id'] for result in again['results']],
+                         [first['results'][1]['id'], first['results'][0]['id']])
+        self.assertEqual(Sale.objects.count(), 2)
+
+    def test_archived_sales_keep_their_idempotency_keys(self):
+        sale_id = self.bulk([sale_payload(idempotency_key='till-1')])['results'][0]['id']
+        Sale.objects.filter(pk=sale_id).update(sale_date=timezone.now() - timedelta(days=400))
+        archive_sales(timezone.localdate() - timedelta(days=30))
+        self.assertTrue(ArchivedSale.objects.filter(pk=sale_id).exists())
+
+        data = self.bulk([sale_payload(idempotency_key='till-1')])
+        self.assertEqual(data['results'][0], {'index': 0, 'status': DUPLICATE, 'id': sale_id})
+        self.assertFalse(Sale.objects.exists())
+
+    def test_racing_insert_reports_the_existing_sale(self):
+        sale_id = self.bulk([sale_payload(idempotency_key='till-1')])['results'][0]['id']
+        customer = Customer.objects.get()
+        record = sale_payload(idempotency_key='till-1', sale_items=[
+            {'product_name': 'Item', 'quantity': 2, 'price': 150}
+        ])
+        results = [None]
+        _insert_one((0, record), {record['customer_name']: customer}, results, 'default')
+        self.assertEqual(results[0], {'index': 0, 'status': DUPLICATE, 'id': sale_id})
+        self.assertEqual(Sale.objects.count(), 1)
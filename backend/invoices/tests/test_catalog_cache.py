@@ -0,0 +1,107 @@
+"""Cached product and customer responses: invalidation on writes and conditional GETs"""
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from invoices.catalog_cache import get_cache
+from invoices.models import Customer, Product
+from invoices.tests.helpers import TEST_SETTINGS
+
+
+@override_settings(**TEST_SETTINGS)
+class CatalogCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Cement', price='5000.00')
+
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.detail = f'/api/products/{self.product.id}/'
+
+    def prices(self):
+        return {row['name']: row['price'] for row in self.client.get('/api/products/').data}
+
+    def test_repeated_reads_come_from_the_cache(self):
+        for path in ('/api/products/', self.detail):
+            with self.subTest(path):
+                first = self.client.get(path)
+                with self.assertNumQueries(0):
+                    second = self.client.get(path)
+                self.assertEqual(second.status_code, 200)
+                self.assertEqual(second.data, first.data)
+                self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_writes_invalidate_lists_and_details(self):
+        self.assertEqual(self.prices(), {'Cement': '5000.00'})
+        self.client.get(self.detail)
+
+        self.client.patch(self.detail, {'price': '5200.00'}, format='json')
+        self.assertEqual(self.prices(), {'Cement': '5200.00'})
+        self.assertEqual(self.client.get(self.detail).data['price'], '5200.00')
+
+        self.client.post('/api/products/', {'name': 'Sand', 'price': '800.00'}, format='json')
+        self.assertEqual(self.prices(), {'Cement': '5200.00', 'Sand': '800.00'})
+
+        self.client.delete(self.detail)
+        self.assertEqual(self.prices(), {'Sand': '800.00'})
+        self.assertEqual(self.client.get(self.detail).status_code, 404)
+
+    def test_any_spelling_of_the_id_is_invalidated(self):
+        spellings = [str(self.product.id).upper(), self.product.id.hex, self.product.id.hex.upper()]
+        for spelling in spellings:
+            self.assertEqual(self.client.get(f'/api/products/{spelling}/').data['price'], '5000.00')
+        self.client.patch(self.detail, {'price': '5200.00'}, format='json')
+        for spelling in spellings:
+            with self.subTest(spelling):
+                self.assertEqual(self.client.get(f'/api/products/{spelling}/').data['price'], '5200.00')
+
+    def test_malformed_id_is_not_found(self):
+        response = self.client.get('/api/products/not-a-uuid/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_orm_writes_invalidate_through_signals(self):
+        self.prices()
+        self.product.price = '4800.00'
+        self.product.save()
+        self.assertEqual(self.prices(), {'Cement': '4800.00'})
+
+    def test_bulk_import_invalidates_customer_lists(self):
+        self.assertEqual(self.client.get('/api/customers/').data, [])
+        response = self.client.post('/api/sales/bulk/', [{
+            'customer_name': 'Walk-in',
+            'issuer_name': 'Main',
+            'sale_items': [{'product_name': 'Cement', 'quantity': 1, 'price': '5000.00'}],
+        }], format='json')
+        self.assertEqual(response.data['summary']['created'], 1)
+        self.assertEqual([row['name'] for row in self.client.get('/api/customers/').data], ['Walk-in'])
+
+    def test_matching_etag_is_not_modified(self):
+        etag = self.client.get(self.detail)['ETag']
+        response = self.client.get(self.detail, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(self.detail, HTTP_IF_NONE_MATCH=f'W/{etag}').status_code, 304)
+
+    def test_etag_follows_the_body(self):
+        etag = self.client.get(self.detail)['ETag']
+
+        # The body is unchanged, so a client's ETag still matches once the cache is rebuilt
+        get_cache().clear()
+        self.assertEqual(self.client.get(self.detail, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.patch(self.detail, {'name': 'Cement 50kg'}, format='json')
+        response = self.client.get(self.detail, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['name'], 'Cement 50kg')
+
+    def test_customer_details_are_cached_per_object(self):
+        customers = [Customer.objects.create(name=name) for name in ('Ada', 'Bola')]
+        paths = [f'/api/customers/{customer.id}/' for customer in customers]
+        for path in paths:
+            self.client.get(path)
+        self.client.patch(paths[0], {'phone': '+234-800-0000'}, format='json')
+        with self.assertNumQueries(0):
+            self.client.get(paths[1])
+        self.assertEqual(self.client.get(paths[0]).data['phone'], '+234-800-0000')
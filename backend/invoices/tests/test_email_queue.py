@@ -0,0 +1,102 @@
+"""The invoice email queue: claims, retries with backoff and reclaiming stuck jobs"""
+
+from datetime import timedelta
+from unittest import mock
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from invoices.mail import claim_jobs, enqueue_invoice_email, retry_delay, send_batch
+from invoices.models import EmailJob, Sale
+from invoices.tests.helpers import TEST_SETTINGS, sale_payload
+
+
+@override_settings(**TEST_SETTINGS, EMAIL_QUEUE_MAX_ATTEMPTS=3, EMAIL_QUEUE_RETRY_BACKOFF=30,
+                   EMAIL_QUEUE_CLAIM_TIMEOUT=600)
+class EmailQueueTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        response = APIClient(SERVER_NAME='localhost').post('/api/sales/', sale_payload(), format='json')
+        cls.sale = Sale.objects.get(invoice_number=response.data['invoice_number'])
+
+    def setUp(self):
+        self.job = enqueue_invoice_email(self.sale, 'ada@example.com')
+
+    def refresh(self):
+        self.job.refresh_from_db()
+        return self.job
+
+    def test_claimed_job_is_sent_with_the_invoice_attached(self):
+        jobs = claim_jobs(10)
+        self.assertEqual([job.pk for job in jobs], [self.job.pk])
+        self.assertEqual(self.refresh().status, EmailJob.SENDING)
+
+        send_batch(jobs)
+
+        job = self.refresh()
+        self.assertEqual((job.status, job.attempts, job.last_error), (EmailJob.SENT, 1, None))
+        self.assertIsNotNone(job.sent_at)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['ada@example.com'])
+        filename, content, mimetype = mail.outbox[0].attachments[0]
+        self.assertEqual((filename, mimetype), (f'{self.sale.invoice_id}.pdf', 'application/pdf'))
+        self.assertTrue(content.startswith(b'%PDF'))
+
+    def test_jobs_not_yet_due_or_already_claimed_are_skipped(self):
+        later = enqueue_invoice_email(self.sale)
+        EmailJob.objects.filter(pk=later.pk).update(next_attempt_at=timezone.now() + timedelta(minutes=5))
+
+        self.assertEqual([job.pk for job in claim_jobs(10)], [self.job.pk])
+        # A fresh claim belongs to its worker until the claim timeout
+        self.assertEqual(claim_jobs(10), [])
+
+    def test_failed_sends_back_off_then_fail(self):
+        with mock.patch.object(EmailMessage, 'send', side_effect=ConnectionError('reset by peer')), \
+                self.assertLogs('invoices.mail', 'WARNING') as logs:
+            for attempt, delay in ((1, 30), (2, 60)):
+                before = timezone.now()
+                send_batch(claim_jobs(10))
+                job = self.refresh()
+                self.assertEqual((job.status, job.attempts), (EmailJob.PENDING, attempt))
+                self.assertEqual(job.last_error, 'ConnectionError: reset by peer')
+                self.assertGreaterEqual(job.next_attempt_at, before + timedelta(seconds=delay))
+                self.assertLessEqual(job.next_attempt_at, timezone.now() + timedelta(seconds=delay))
+                # Not due again until the backoff has passed
+                self.assertEqual(claim_jobs(10), [])
+                EmailJob.objects.filter(pk=job.pk).update(next_attempt_at=timezone.now())
+
+            send_batch(claim_jobs(10))
+
+        job = self.refresh()
+        self.assertEqual((job.status, job.attempts), (EmailJob.FAILED, 3))
+        self.assertEqual(len(logs.records), 3)
+        self.assertEqual(claim_jobs(10), [])
+        self.assertEqual(mail.outbox, [])
+
+    def test_smtp_connection_failure_counts_as_an_attempt(self):
+        connection = mock.Mock(**{'open.side_effect': OSError('connection refused')})
+        with mock.patch('invoices.mail.get_connection', return_value=connection), \
+                self.assertLogs('invoices.mail', 'WARNING'):
+            send_batch(claim_jobs(10))
+
+        job = self.refresh()
+        self.assertEqual((job.status, job.attempts), (EmailJob.PENDING, 1))
+        self.assertEqual(job.last_error, 'OSError: connection refused')
+
+    def test_job_stuck_in_sending_is_reclaimed_after_the_timeout(self):
+        first = claim_jobs(10)[0]
+        # The worker that claimed it died before marking it sent or failed
+        EmailJob.objects.filter(pk=first.pk).update(claimed_at=timezone.now() - timedelta(seconds=601))
+
+        reclaimed = claim_jobs(10)
+
+        self.assertEqual([job.pk for job in reclaimed], [first.pk])
+        self.assertNotEqual(reclaimed[0].claimed_by, first.claimed_by)
+        send_batch(reclaimed)
+        self.assertEqual(self.refresh().status, EmailJob.SENT)
+
+    def test_retry_delay_doubles_up_to_an_hour(self):
+        self.assertEqual([retry_delay(n).total_seconds() for n in (1, 2, 3)], [30, 60, 120])
+        self.assertEqual(retry_delay(20), timedelta(hours=1))
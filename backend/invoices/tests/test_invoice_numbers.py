@@ -0,0 +1,71 @@
+"""Block allocation of invoice numbers"""
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle
+from unittest import mock
+from django.db import connections, transaction
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from invoices.invoice_numbers import SEQUENCE_NAME, BlockAllocator
+from invoices.models import InvoiceSequence, Sale
+from invoices.tests.helpers import TEST_SETTINGS, sale_payload
+
+
+@override_settings(**TEST_SETTINGS)
+class BlockAllocatorTests(TransactionTestCase):
+
+    def allocate_in_thread(self, allocator, count):
+        try:
+            return [allocator.allocate(1)[0] for _ in range(count)]
+        finally:
+            connections.close_all()
+
+    def test_concurrent_allocations_are_unique(self):
+        allocator = BlockAllocator('test', block_size=7)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: self.allocate_in_thread(allocator, 25), range(8)))
+        numbers = [number for result in results for number in result]
+
+        self.assertEqual(len(numbers), 200)
+        self.assertEqual(len(set(numbers)), 200)
+        # Whole blocks were reserved, each in its own committed transaction
+        self.assertEqual(InvoiceSequence.objects.get(name='test').next_value, 1 + 7 * 29)
+
+    def test_allocators_take_separate_blocks(self):
+        first = BlockAllocator('test', block_size=10)
+        second = BlockAllocator('test', block_size=10)
+
+        numbers = first.allocate(3) + second.allocate(3) + first.allocate(8) + second.allocate(2)
+
+        self.assertEqual(len(set(numbers)), len(numbers))
+        self.assertEqual(numbers[:3], [1, 2, 3])
+        self.assertEqual(numbers[3:6], [11, 12, 13])
+        # The rest of the first block, then a new one after the second allocator's
+        self.assertEqual(numbers[6:14], [4, 5, 6, 7, 8, 9, 10, 21])
+
+    def test_allocation_inside_a_transaction_reserves_exactly(self):
+        allocator = BlockAllocator('test', block_size=10)
+        with transaction.atomic():
+            self.assertEqual(allocator.allocate(2), [1, 2])
+        # No block is kept from inside a transaction that might roll back
+        self.assertEqual(allocator.allocate(1), [3])
+        self.assertEqual(InvoiceSequence.objects.get(name='test').next_value, 13)
+
+
+@override_settings(**TEST_SETTINGS)
+class InterleavedSaleCreateTests(TransactionTestCase):
+    """Sales created by several processes, each numbering from its own block"""
+
+    def test_interleaved_creates_get_unique_numbers(self):
+        processes = [BlockAllocator(SEQUENCE_NAME, block_size=4) for _ in range(3)]
+        client = APIClient(SERVER_NAME='localhost')
+        with mock.patch('invoices.invoice_numbers.get_allocator', side_effect=cycle(processes)):
+            for i in range(20):
+                response = client.post('/api/sales/', sale_payload(f'Customer {i}'), format='json')
+                self.assertEqual(response.status_code, 201)
+
+        numbers = list(Sale.objects.values_list('invoice_number', flat=True))
+        self.assertEqual(len(numbers), 20)
+        self.assertEqual(len(set(numbers)), 20)
+        # Only the unfinished tails of the last blocks are left unused
+        self.assertLessEqual(max(numbers) - len(numbers), 3 * 3)
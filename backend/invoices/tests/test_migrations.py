@@ -0,0 +1,71 @@
+"""Data migrations, run against a database migrated to just before them"""
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+
+class MigrationTestCase(TransactionTestCase):
+    migrate_from = None
+    migrate_to = None
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate([('invoices', self.migrate_from)])
+        self.old_apps = self.executor.loader.project_state([('invoices', self.migrate_from)]).apps
+
+    def tearDown(self):
+        # Leave the schema as the other tests expect it
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrate(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([('invoices', self.migrate_to)])
+        return executor.loader.project_state([('invoices', self.migrate_to)]).apps
+
+
+class CustomerNameKeyMigrationTests(MigrationTestCase):
+    migrate_from = '0009_sale_archive'
+    migrate_to = '0010_customer_name_key'
+
+    def test_duplicate_customers_are_merged_into_the_oldest(self):
+        Customer = self.old_apps.get_model('invoices', 'Customer')
+        Sale = self.old_apps.get_model('invoices', 'Sale')
+        ArchivedSale = self.old_apps.get_model('invoices', 'ArchivedSale')
+        now = timezone.now()
+        upper = Customer.objects.create(name='ADA OBI', email='ada@example.com', phone='0701')
+        oldest = Customer.objects.create(name='Ada Obi')
+        spaced = Customer.objects.create(name='  ada   OBI ', phone='0803')
+        other = Customer.objects.create(name='Bola Ade')
+        # created_at is auto_now_add; backdate so the oldest is not the first inserted
+        for days, customer in ((3, oldest), (2, spaced), (1, upper)):
+            Customer.objects.filter(pk=customer.pk).update(created_at=now - timezone.timedelta(days=days))
+        sales = [
+            Sale.objects.create(customer=customer, customer_name=customer.name, issuer_name='Main', total=1)
+            for customer in (oldest, spaced, upper, other)
+        ]
+        archived = ArchivedSale.objects.create(id=sales[0].id, customer=upper, customer_name=upper.name,
+                                               sale_date=now, total=1, issuer_name='Main', created_at=now)
+        sales[0].delete()
+
+        apps = self.migrate()
+
+        Customer = apps.get_model('invoices', 'Customer')
+        Sale = apps.get_model('invoices', 'Sale')
+        ArchivedSale = apps.get_model('invoices', 'ArchivedSale')
+        self.assertEqual(
+            set(Customer.objects.values_list('id', 'name_key')),
+            {(oldest.id, 'ada obi'), (other.id, 'bola ade')},
+        )
+        survivor = Customer.objects.get(id=oldest.id)
+        # Missing contact details come from the first duplicate that has them
+        self.assertEqual((survivor.email, survivor.phone), ('ada@example.com', '0803'))
+        self.assertEqual(
+            set(Sale.objects.values_list('customer_id', 'customer_name')),
+            {(oldest.id, 'Ada Obi'), (other.id, 'Bola Ade')},
+        )
+        self.assertEqual(Sale.objects.filter(customer_id=oldest.id).count(), 2)
+        self.assertEqual(ArchivedSale.objects.get(id=archived.id).customer_id, oldest.id)
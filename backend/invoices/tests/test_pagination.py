@@ -0,0 +1,55 @@
+"""Keyset pagination of the sales lists"""
+
+import base64
+import json
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from invoices.models import Sale
+from invoices.tests.helpers import TEST_SETTINGS, sale_payload
+
+
+def encode_cursor(value, last_id):
+    return base64.urlsafe_b64encode(json.dumps([value, last_id]).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+@override_settings(**TEST_SETTINGS)
+class SalePaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        client = APIClient(SERVER_NAME='localhost')
+        for i in range(5):
+            client.post('/api/sales/', sale_payload(f'Customer {i}'), format='json')
+
+    def setUp(self):
+        self.client = APIClient(SERVER_NAME='localhost')
+
+    def test_cursor_walks_every_sale_once(self):
+        for path in ('/api/sales/', '/api/sales/summary/'):
+            with self.subTest(path):
+                seen = []
+                url = f'{path}?page_size=2'
+                while url:
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    seen.extend(str(sale['id']) for sale in response.data['results'])
+                    url = response.data['next']
+                expected = Sale.objects.order_by('-sale_date', '-id').values_list('id', flat=True)
+                self.assertEqual(seen, [str(pk) for pk in expected])
+
+    def test_bad_cursors_are_not_found(self):
+        cursors = [
+            'not-a-cursor',
+            base64.urlsafe_b64encode(b'{"a": 1}').decode('ascii'),
+            encode_cursor('yesterday', 'not-a-uuid'),
+            encode_cursor(timezone.now().isoformat(), 'not-a-uuid'),
+            encode_cursor(None, None),
+            encode_cursor([1], {'id': 1}),
+        ]
+        for path in ('/api/sales/', '/api/sales/summary/'):
+            for cursor in cursors:
+                with self.subTest(path=path, cursor=cursor):
+                    response = self.client.get(path, {'cursor': cursor})
+                    self.assertEqual(response.status_code, 404)
+                    self.assertEqual(response.data, {'detail': 'Invalid cursor'})
@@ -0,0 +1,44 @@
+"""
+The API actions issue exactly the queries budgeted in query_budgets.json
+Runs the check_query_budgets scenarios under the test runner; after an intended change,
+re-measure with python manage.py check_query_budgets --update.
+"""
+
+from django.db import transaction
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from invoices.catalog_cache import get_cache as get_catalog_cache
+from invoices.customer_cache import get_customer_cache
+from invoices.pdf_cache import get_pdf_cache
+from invoices.tests.query_budget import SETTINGS_OVERRIDE, load_budgets, scenarios, seed
+
+
+@override_settings(**SETTINGS_OVERRIDE)
+class QueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = seed()
+
+    def setUp(self):
+        self.client = APIClient(SERVER_NAME='localhost')
+        admin_client = APIClient(SERVER_NAME='localhost')
+        admin_client.force_login(self.fixture['admin_user'])
+        self.scenarios = scenarios(dict(self.fixture, admin_client=admin_client))
+        self.budgets = load_budgets()
+
+    def test_every_action_has_a_budget(self):
+        self.assertEqual(sorted(self.scenarios), sorted(self.budgets))
+
+    def test_actions_issue_their_budgeted_queries(self):
+        for name, request in self.scenarios.items():
+            with self.subTest(name):
+                get_pdf_cache().clear()
+                get_catalog_cache().clear()
+                get_customer_cache().clear()
+                # Each action sees the untouched fixture
+                with transaction.atomic():
+                    with self.assertNumQueries(self.budgets[name]):
+                        response = request(self.client)
+                    transaction.set_rollback(True)
+                self.assertLess(response.status_code, 400)
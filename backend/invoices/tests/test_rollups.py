@@ -0,0 +1,76 @@
+"""Sales rollups kept up to date as sales change"""
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from invoices import rollups
+from invoices.models import Sale, SaleItem, SalesRollup
+from invoices.tests.helpers import TEST_SETTINGS, sale_payload
+
+
+def rollup_rows():
+    return set(SalesRollup.objects.values_list('day', 'issuer_name', 'product_name', 'quantity', 'revenue', 'line_count'))
+
+
+@override_settings(**TEST_SETTINGS)
+class SalesRollupTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient(SERVER_NAME='localhost')
+
+    def create_sale(self, issuer_name, *items):
+        sale_items = [{'product_name': name, 'quantity': quantity, 'price': price} for name, quantity, price in items]
+        response = self.client.post('/api/sales/', sale_payload(issuer_name=issuer_name, sale_items=sale_items), format='json')
+        self.assertEqual(response.status_code, 201)
+        return Sale.objects.get(invoice_number=response.data['invoice_number'])
+
+    def report(self, path='/api/reports/', **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def assert_matches_rebuild(self):
+        kept = rollup_rows()
+        rollups.rebuild_shard('default')
+        self.assertEqual(kept, rollup_rows())
+
+    def test_create_edit_and_delete_keep_report_totals(self):
+        first = self.create_sale('Main', ('Pen', 2, '1.50'), ('Ink', 1, '4.00'))
+        second = self.create_sale('Main', ('Pen', 4, '1.50'))
+        self.assertEqual(self.report(), {'quantity': 7, 'revenue': '13.00', 'line_count': 3})
+
+        # Edit an item, move a sale to another issuer, then delete an item and a sale
+        item = first.sale_items.get(product_name='Pen')
+        item.quantity = 5
+        item.save()
+        self.assertEqual(self.report(), {'quantity': 10, 'revenue': '17.50', 'line_count': 3})
+
+        response = self.client.patch(f'/api/sales/{second.pk}/', {'issuer_name': 'Branch'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.report(issuer='Main'), {'quantity': 6, 'revenue': '11.50', 'line_count': 2})
+        self.assertEqual(self.report(issuer='Branch'), {'quantity': 4, 'revenue': '6.00', 'line_count': 1})
+        self.assert_matches_rebuild()
+
+        first.sale_items.get(product_name='Ink').delete()
+        self.assertEqual(self.report(), {'quantity': 9, 'revenue': '13.50', 'line_count': 2})
+        self.assertFalse(SalesRollup.objects.filter(product_name='Ink').exists())
+
+        response = self.client.delete(f'/api/sales/{second.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.report(), {'quantity': 5, 'revenue': '7.50', 'line_count': 1})
+        self.assertEqual(
+            [(row['issuer_name'], row['line_count']) for row in self.report('/api/reports/issuers/')],
+            [('Main', 1)],
+        )
+        self.assert_matches_rebuild()
+
+    def test_only_emptied_keys_are_deleted(self):
+        sale = self.create_sale('Main', ('Pen', 1, '1.50'))
+        # A row no change touches is left alone, even when it counts no lines
+        untouched = SalesRollup.objects.create(day=timezone.localdate(), issuer_name='Other', product_name='Pen',
+                                               quantity=0, revenue=0, line_count=0)
+
+        SaleItem.objects.get(sale=sale).delete()
+
+        self.assertFalse(SalesRollup.objects.filter(issuer_name='Main').exists())
+        self.assertTrue(SalesRollup.objects.filter(pk=untouched.pk).exists())
@@ -0,0 +1,60 @@
+"""Creating a sale with its line items through POST /api/sales/"""
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from invoices.models import Customer, Sale, SaleItem
+from invoices.tests.helpers import TEST_SETTINGS, sale_payload
+
+
+@override_settings(**TEST_SETTINGS)
+class SaleCreateTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient(SERVER_NAME='localhost')
+
+    def test_creates_sale_with_items_and_total(self):
+        response = self.client.post('/api/sales/', sale_payload(sale_items=[
+            {'product_name': 'Item', 'quantity': 2, 'price': '150.00'},
+            {'product_name': 'Other', 'quantity': 1, 'price': '20.50'},
+        ]), format='json')
+        self.assertEqual(response.status_code, 201)
+        sale = Sale.objects.get(pk=response.data['id'])
+        self.assertEqual(str(sale.total), '320.50')
+        self.assertEqual(sale.item_count, 2)
+        self.assertEqual(SaleItem.objects.filter(sale=sale).count(), 2)
+
+    def test_items_keep_the_order_they_were_sent_in(self):
+        names = ['Zinc sheet', 'Cement', 'Nails', 'Binding wire', 'Marine board', 'Paint', 'Gravel', 'Sand']
+        response = self.client.post('/api/sales/', sale_payload(sale_items=[
+            {'product_name': name, 'quantity': 1, 'price': '10.00'} for name in names
+        ]), format='json')
+        self.assertEqual([item['product_name'] for item in response.data['sale_items']], names)
+
+        sale_id = response.data['id']
+        for path in (f'/api/sales/{sale_id}/', f'/api/sales/{sale_id}/invoice_data/'):
+            with self.subTest(path):
+                self.assertEqual([item['product_name'] for item in self.client.get(path).json()['sale_items']], names)
+        self.assertEqual(list(SaleItem.objects.filter(sale_id=sale_id).values_list('position', flat=True)),
+                         list(range(len(names))))
+
+    def test_rejects_invalid_items_per_item(self):
+        response = self.client.post('/api/sales/', sale_payload(sale_items=[
+            {'product_name': 'Item', 'quantity': 1, 'price': '10.00'},
+            {'product_name': 'Item', 'quantity': 0, 'price': 'free'},
+            {'quantity': 1, 'price': '10.00'},
+        ]), format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.data['sale_items']
+        self.assertEqual(errors[0], {})
+        self.assertEqual(set(errors[1]), {'quantity', 'price'})
+        self.assertEqual(set(errors[2]), {'product_name'})
+        self.assertFalse(Sale.objects.exists())
+        self.assertFalse(Customer.objects.exists())
+
+    def test_rejects_missing_or_empty_items(self):
+        for items in ([], None, 'Item', [['Item', 1, '10.00']]):
+            with self.subTest(items=items):
+                response = self.client.post('/api/sales/', sale_payload(sale_items=items), format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('sale_items', response.data)
+        self.assertFalse(Sale.objects.exists())
@@ -0,0 +1,47 @@
+"""GET /api/sales/stream/ sends each event as it happens, under WSGI and ASGI"""
+
+from time import monotonic
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, TestCase, override_settings
+from rest_framework.test import APIClient
+from invoices.tests.helpers import TEST_SETTINGS, sale_payload
+
+LIFETIME = 3
+
+
+@override_settings(**TEST_SETTINGS, SALE_STREAM_LIFETIME=LIFETIME, SALE_STREAM_POLL_INTERVAL=0.01)
+class SaleStreamTests(TestCase):
+
+    def create_sale(self):
+        response = APIClient(SERVER_NAME='localhost').post('/api/sales/', sale_payload(), format='json')
+        return str(response.data['id'])
+
+    def test_wsgi_stream_sends_events_before_it_ends(self):
+        started = monotonic()
+        response = APIClient(SERVER_NAME='localhost').get('/api/sales/stream/')
+        self.assertFalse(response.is_async)
+        chunks = iter(response.streaming_content)
+        self.assertEqual(next(chunks), b'retry: 10\n\n')
+        self.assertLess(monotonic() - started, 1)
+
+        sale_id = self.create_sale()
+        event = next(chunks).decode('utf-8')
+        self.assertIn('event: sale', event)
+        self.assertIn(sale_id, event)
+        self.assertLess(monotonic() - started, LIFETIME)
+        response.close()
+
+    async def test_asgi_stream_sends_events_before_it_ends(self):
+        started = monotonic()
+        response = await AsyncClient().get('/api/sales/stream/')
+        self.assertTrue(response.is_async)
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b'retry: 10\n\n')
+        self.assertLess(monotonic() - started, 1)
+
+        sale_id = await sync_to_async(self.create_sale)()
+        event = (await anext(chunks)).decode('utf-8')
+        self.assertIn('event: sale', event)
+        self.assertIn(sale_id, event)
+        self.assertLess(monotonic() - started, LIFETIME)
+        await chunks.aclose()
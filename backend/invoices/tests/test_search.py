@@ -0,0 +1,74 @@
+"""Type-ahead search and the SQLite index behind it"""
+
+from io import StringIO
+from unittest import mock, skipUnless
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from invoices import search
+from invoices.models import Product
+from invoices.tests.helpers import TEST_SETTINGS
+
+
+def search_triggers():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name, tbl_name FROM sqlite_master WHERE type = 'trigger'")
+        return set(cursor.fetchall())
+
+
+def expected_triggers(table):
+    fts, docs = search.fts_table(table), search.docs_table(table)
+    return {(f'{fts}_{suffix}', table) for suffix in ('ai', 'ad', 'au')} | \
+        {(f'{docs}_{suffix}', docs) for suffix in ('ai', 'ad', 'au')}
+
+
+def names(queryset, term):
+    return [obj.name for obj in search.search(queryset, term)]
+
+
+@skipUnless(search.uses_fts(connection), 'SQLite with the trigram tokenizer')
+class SearchIndexTests(TestCase):
+
+    def test_triggers_exist_after_migrate(self):
+        triggers = search_triggers()
+        for table in search.SEARCHABLE_TABLES:
+            with self.subTest(table):
+                self.assertLessEqual(expected_triggers(table), triggers)
+
+    def test_index_follows_inserts_renames_and_deletes(self):
+        product = Product.objects.create(name='Blue Widget', price=1)
+        self.assertEqual(names(Product.objects.all(), 'idge'), ['Blue Widget'])
+
+        product.name = 'Red Gadget'
+        product.save()
+        self.assertEqual(names(Product.objects.all(), 'idge'), [])
+        self.assertEqual(names(Product.objects.all(), 'adge'), ['Red Gadget'])
+
+        product.delete()
+        self.assertEqual(names(Product.objects.all(), 'adge'), [])
+
+
+@override_settings(**TEST_SETTINGS)
+class SearchFallbackTests(TestCase):
+
+    def test_old_sqlite_matches_substrings_with_like(self):
+        Product.objects.create(name='Blue Widget', price=1)
+        with mock.patch('invoices.search.SQLITE_TRIGRAM', False):
+            self.assertEqual(names(Product.objects.all(), 'idge'), ['Blue Widget'])
+            response = self.client.get('/api/products/', {'q': 'idge'}, SERVER_NAME='localhost')
+        self.assertEqual([row['name'] for row in response.json()], ['Blue Widget'])
+
+
+@skipUnless(search.uses_fts(connection), 'SQLite with the trigram tokenizer')
+class RebuildSearchIndexTests(TransactionTestCase):
+
+    def test_creates_a_missing_index(self):
+        Product.objects.create(name='Blue Widget', price=1)
+        with connection.schema_editor() as schema_editor:
+            search.drop_search_index(schema_editor, ['invoices_product'])
+        self.assertFalse(expected_triggers('invoices_product') & search_triggers())
+
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        self.assertLessEqual(expected_triggers('invoices_product'), search_triggers())
+        self.assertEqual(names(Product.objects.all(), 'idge'), ['Blue Widget'])
@@ -0,0 +1,71 @@
+"""Streamed exports and batch invoices reach the client chunk by chunk under WSGI and ASGI"""
+
+import io
+import json
+import zipfile
+from unittest import mock
+from django.test import AsyncClient, TestCase, override_settings
+from rest_framework.test import APIClient
+from invoices.export import EXPORT_COLUMNS
+from invoices.tests.helpers import TEST_SETTINGS, sale_payload
+
+ROWS = 1200
+
+
+@override_settings(**TEST_SETTINGS, INVOICE_RENDER_WORKERS=1)
+class StreamingResponseTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        client = APIClient(SERVER_NAME='localhost')
+        cls.sale_ids = [client.post('/api/sales/', sale_payload(f'Customer {i}'), format='json').data['id']
+                        for i in range(3)]
+
+    def setUp(self):
+        self.produced = 0
+
+    def export_rows(self, start=None, end=None):
+        for index in range(ROWS):
+            self.produced += 1
+            yield [f'{index}'] * len(EXPORT_COLUMNS)
+
+    def test_wsgi_export_is_a_sync_stream(self):
+        with mock.patch('invoices.views.export_rows', self.export_rows):
+            response = APIClient(SERVER_NAME='localhost').get('/api/sales/export/?format=ndjson')
+            self.assertFalse(response.is_async)
+            chunks = iter(response.streaming_content)
+            first = next(chunks)
+            self.assertLess(self.produced, ROWS)
+            lines = b''.join([first, *chunks]).splitlines()
+        self.assertEqual(len(lines), ROWS)
+
+    async def test_asgi_export_is_an_async_stream(self):
+        with mock.patch('invoices.views.export_rows', self.export_rows):
+            response = await AsyncClient().get('/api/sales/export/?format=ndjson')
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in self.first_chunk_then_rest(response)]
+        lines = b''.join(chunks).splitlines()
+        self.assertEqual(len(lines), ROWS)
+        self.assertEqual(json.loads(lines[-1])[EXPORT_COLUMNS[0][0]], str(ROWS - 1))
+
+    async def first_chunk_then_rest(self, response):
+        chunks = aiter(response.streaming_content)
+        yield await anext(chunks)
+        # The first chunk was sent before the export had produced every row
+        self.assertLess(self.produced, ROWS)
+        async for chunk in chunks:
+            yield chunk
+
+    async def test_asgi_export_reads_the_database(self):
+        response = await AsyncClient().get('/api/sales/export/?format=csv')
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode('utf-8')
+        self.assertEqual(len(body.splitlines()), 1 + len(self.sale_ids))
+
+    async def test_asgi_invoice_zip_is_an_async_stream(self):
+        response = await AsyncClient().get(f"/api/sales/invoices/?ids={','.join(self.sale_ids)}")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            self.assertEqual(len(archive.namelist()), len(self.sale_ids))
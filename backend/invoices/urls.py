@@ -6,11 +6,20 @@ router = DefaultRouter()
 router.register(r'customers', views.CustomerViewSet)
 router.register(r'products', views.ProductViewSet)
 router.register(r'sales', views.SaleViewSet)
+router.register(r'email-jobs', views.EmailJobViewSet)
+router.register(r'reports', views.ReportViewSet, basename='reports')
+router.register(r'changes', views.ChangeViewSet, basename='changes')
 
 urlpatterns = [
+    # Async sale actions, matched before the router's SaleViewSet routes
+    path('sales/<uuid:pk>/invoice_data/', views.sale_invoice_data, name='sale-invoice-data'),
+    path('sales/<uuid:pk>/send_email/', views.sale_send_email, name='sale-send-email'),
+    path('sales/<uuid:pk>/invoice.pdf/', views.sale_invoice_pdf, name='sale-invoice-pdf'),
+    path('sales/stream/', views.sale_stream, name='sale-stream'),
     path('', include(router.urls)),
     path('auth/status/', views.auth_status, name='auth_status'),
     path('auth/signin/', views.auth_signin, name='auth_signin'),
     path('auth/signup/', views.auth_signup, name='auth_signup'),
     path('auth/signout/', views.auth_signout, name='auth_signout'),
+    path('metrics/', views.metrics, name='metrics'),
 ]
\ No newline at end of file
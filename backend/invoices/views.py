@@ -1,31 +1,145 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, ValidationError
 from rest_framework.response import Response
-from django.http import JsonResponse
-from django.core.mail import EmailMessage
+import asyncio
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db.models import Sum
 from django.conf import settings
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-import io
-from .models import Customer, Product, Sale, SaleItem
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views.decorators.csrf import csrf_exempt
+from datetime import datetime, time, timedelta
+from functools import wraps
+from itertools import chain
+from time import monotonic, sleep
+from operator import attrgetter
+from . import changes
+from .batch_pdf import merged_pdf, render_invoices, select_sale_ids, stream_zip
+from .bulk import import_sales, summarize
+from .catalog_cache import CachedCatalogMixin, etag_matches
+from .export import export_rows, stream_csv, stream_ndjson
+from .fastjson import dumps
+from .invoice_numbers import parse_invoice_number
+from .mail import aenqueue_invoice_email
+from .metrics import registry
+from .models import ArchivedSale, Change, Customer, EmailJob, Product, Sale, SaleItem, SalesRollup
+from .pagination import CatalogPagination, SalePagination
+from .parsers import FastJSONParser, NDJSONParser
+from .pdf_cache import invoice_content_hash
+from .renderers import CSVRenderer, NDJSONRenderer
+from .search import DEFAULT_LIMIT, search
+from .sharding import fan_out, fetch_all, in_bulk, is_sharded, locate, sale_databases, shard_for_issuer, with_customer
 from .serializers import (
     CustomerSerializer, ProductSerializer, SaleSerializer, 
-    SaleCreateSerializer, SaleDetailSerializer
+    SaleCreateSerializer, SaleDetailSerializer, SaleSummarySerializer,
+    EmailJobSerializer, SalesReportSerializer, SaleChangeSerializer, SaleItemChangeSerializer,
+    query_list
 )
 
-class CustomerViewSet(viewsets.ModelViewSet):
+def date_param(request, param):
+    """Parse an optional YYYY-MM-DD query parameter"""
+    value = request.query_params.get(param)
+    if not value:
+        return None
+    day = parse_date(value)
+    if day is None:
+        raise ValidationError({param: ['Expected a date in YYYY-MM-DD format']})
+    return day
+
+def streaming_body(request, chunks):
+    """
+    A sync iterator of chunks as a StreamingHttpResponse body that streams on this server
+    Django 4.2 reads a whole sync body into a list before sending it under ASGI, and a whole
+    async body under WSGI, so ASGI requests get the chunks through an async iterator.
+    """
+    if is_asgi(request):
+        return iterate_async(chunks)
+    return chunks
+
+def is_asgi(request):
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+_DONE = object()
+
+async def iterate_async(chunks):
+    """Take each chunk of a sync iterator on the request's sync thread, where its queries run"""
+    chunks = iter(chunks)
+    take = sync_to_async(next)
+    try:
+        while (chunk := await take(chunks, _DONE)) is not _DONE:
+            yield chunk
+    finally:
+        # Generators clean up (cursors, queued renders) on the thread they ran on
+        if hasattr(chunks, 'close'):
+            await sync_to_async(chunks.close)()
+
+class CatalogSearchMixin:
+    """Type-ahead search on list: ?q=term returns up to ?limit= (default 20) ranked matches"""
+    
+    def list(self, request, *args, **kwargs):
+        term = request.query_params.get('q')
+        if term is None:
+            return super().list(request, *args, **kwargs)
+        
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            raise ValidationError({'limit': ['Expected an integer']})
+        results = search(self.get_queryset(), term, limit)
+        return Response(self.get_serializer(results, many=True).data)
+
+class CustomerViewSet(CachedCatalogMixin, CatalogSearchMixin, viewsets.ModelViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
+    pagination_class = CatalogPagination
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(CachedCatalogMixin, CatalogSearchMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    pagination_class = CatalogPagination
 
 class SaleViewSet(viewsets.ModelViewSet):
-    queryset = Sale.objects.all().select_related('customer').prefetch_related('sale_items')
+    """Sales; ?issuer= limits lists to one branch and reads only its database"""
+    queryset = Sale.objects.all().prefetch_related('sale_items')
+    pagination_class = SalePagination
+    
+    def get_queryset(self):
+        queryset = self.route(super().get_queryset())
+        if self.action != 'list':
+            # customer_name is stored on the sale, so lists never need the customer
+            queryset = with_customer(queryset)
+        elif not SaleSerializer.wants_field(self.request, 'sale_items'):
+            queryset = queryset.prefetch_related(None)
+        return queryset
+    
+    def route(self, queryset):
+        """Send the queryset to the issuer's shard, or to the shard holding the requested sale"""
+        issuer = self.request.query_params.get('issuer')
+        if issuer:
+            return queryset.using(shard_for_issuer(issuer)).filter(issuer_name=issuer)
+        if self.detail and is_sharded():
+            using = locate(queryset, pk=self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+            if using is not None:
+                return queryset.using(using)
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(self.paginator.fetch(queryset), many=True).data)
+    
+    def perform_update(self, serializer):
+        issuer = serializer.validated_data.get('issuer_name')
+        if issuer is not None and shard_for_issuer(issuer) != serializer.instance._state.db:
+            # Sales stay in the database they were created in
+            raise ValidationError({'issuer_name': ["Cannot move a sale to another branch's database"]})
+        serializer.save()
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -43,215 +157,461 @@ class SaleViewSet(viewsets.ModelViewSet):
         response_serializer = SaleDetailSerializer(sale)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
     
-    @action(detail=True, methods=['get'])
-    def invoice_data(self, request, pk=None):
-        """Get sale data formatted for invoice generation"""
-        try:
-            sale = self.get_object()
-            serializer = SaleDetailSerializer(sale)
-            return Response(serializer.data)
-        except Sale.DoesNotExist:
+    @action(detail=False, methods=['post'], parser_classes=[FastJSONParser, NDJSONParser])
+    def bulk(self, request):
+        """Import a JSON array or NDJSON stream of sales"""
+        records = request.data
+        if not isinstance(records, list):
             return Response(
-                {'error': 'Sale not found'}, 
-                status=status.HTTP_404_NOT_FOUND
+                {'error': 'Expected a list of sales'},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        
+        results = import_sales(records)
+        return Response({
+            'summary': summarize(results),
+            'results': results
+        })
     
-    @action(detail=True, methods=['post'])
-    def send_email(self, request, pk=None):
-        """Send invoice email to info@yarotech.com.ng"""
-        try:
-            sale = self.get_object()
-            
-            # Generate PDF
-            pdf_buffer = self.generate_invoice_pdf(sale)
-            
-            # Create email
-            subject = f'New Invoice Generated - INV-{str(sale.id)[:8].upper()}'
-            
-            # Email content
-            email_content = f"""
-            Dear Admin,
-            
-            A new invoice has been generated. Please find the details below:
-            
-            Invoice ID: INV-{str(sale.id)[:8].upper()}
-            Customer: {sale.customer.name if sale.customer else 'N/A'}
-            Date: {sale.sale_date.strftime('%B %d, %Y at %I:%M %p')}
-            Total Amount: ₦{sale.total:,.2f}
-            Issued By: {sale.issuer_name}
-            
-            The invoice PDF is attached to this email.
-            
-            Best regards,
-            YAROTECH Invoice System
-            """
-            
-            # Create email message
-            email = EmailMessage(
-                subject=subject,
-                body=email_content,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=['info@yarotech.com.ng'],
-            )
-            
-            # Attach PDF
-            email.attach(
-                f'INV-{str(sale.id)[:8].upper()}.pdf',
-                pdf_buffer.getvalue(),
-                'application/pdf'
-            )
-            
-            # Send email
-            email.send()
-            
-            return Response({
-                'success': True,
-                'message': 'Invoice email sent successfully'
-            })
-            
-        except Exception as e:
-            return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+    @action(detail=False, methods=['get'], url_path=r'by-number/(?P<number>[^/]+)')
+    def by_number(self, request, number):
+        """Look up a sale, live or archived, by invoice number (INV-000042 or 42)"""
+        invoice_number = parse_invoice_number(number)
+        if invoice_number is not None:
+            for model in (Sale, ArchivedSale):
+                sales = fetch_all(with_customer(model.objects.prefetch_related('sale_items')).filter(
+                    invoice_number=invoice_number
+                ))
+                if sales:
+                    return Response(SaleDetailSerializer(sales[0]).data)
+        return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+    
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """Sales history rows (no line items) read with values(), for list views"""
+        queryset = self.route(Sale.objects.all()).values(*SaleSummarySerializer.SUMMARY_FIELDS)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(SaleSummarySerializer(page, many=True).data)
+        return Response(SaleSummarySerializer(self.paginator.fetch(queryset), many=True).data)
     
-    def generate_invoice_pdf(self, sale):
-        """Generate PDF invoice"""
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        styles = getSampleStyleSheet()
-        story = []
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        """Stream every sale line item as CSV or NDJSON, optionally limited to ?from=&to= dates"""
+        start, end = date_param(request, 'from'), date_param(request, 'to')
+        if start is not None:
+            start = timezone.make_aware(datetime.combine(start, time.min))
+        if end is not None:
+            end = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
         
-        # Company header
-        company_style = ParagraphStyle(
-            'CompanyHeader',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#2196F3'),
-            alignment=1,  # Center
-            spaceAfter=12
-        )
+        rows = export_rows(start, end)
+        if request.accepted_renderer.format == 'ndjson':
+            response = StreamingHttpResponse(streaming_body(request, stream_ndjson(rows)), content_type='application/x-ndjson')
+            extension = 'ndjson'
+        else:
+            response = StreamingHttpResponse(streaming_body(request, stream_csv(rows)), content_type='text/csv; charset=utf-8')
+            extension = 'csv'
+        response['Content-Disposition'] = f'attachment; filename="sales-export.{extension}"'
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def invoices(self, request):
+        """
+        Render invoices for ?from=&to= dates and/or ?ids=a,b as a ZIP (default) or, with
+        ?output=pdf, one merged PDF
+        """
+        start, end = date_param(request, 'from'), date_param(request, 'to')
+        if start is not None:
+            start = timezone.make_aware(datetime.combine(start, time.min))
+        if end is not None:
+            end = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+        ids = [value for value in request.query_params.get('ids', '').split(',') if value]
+        if not (start or end or ids):
+            raise ValidationError({'non_field_errors': ['Pass a from/to date range or ids']})
         
-        story.append(Paragraph("YAROTECH NETWORK LIMITED", company_style))
+        sale_ids = select_sale_ids(start, end, ids)
+        if request.query_params.get('output') == 'pdf':
+            response = HttpResponse(merged_pdf(sale_ids, settings.INVOICE_RENDER_WORKERS), content_type='application/pdf')
+            response['Content-Disposition'] = 'attachment; filename="invoices.pdf"'
+        else:
+            rendered = render_invoices(sale_ids, settings.INVOICE_RENDER_WORKERS)
+            response = StreamingHttpResponse(streaming_body(request, stream_zip(rendered)), content_type='application/zip')
+            response['Content-Disposition'] = 'attachment; filename="invoices.zip"'
+        response['X-Invoice-Count'] = str(len(sale_ids))
+        return response
+
+class EmailJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status of queued invoice emails"""
+    queryset = EmailJob.objects.all()
+    serializer_class = EmailJobSerializer
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.detail and is_sharded():
+            # Jobs are kept with their sales
+            using = locate(queryset, pk=self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+            if using is not None:
+                return queryset.using(using)
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        jobs = fetch_all(self.get_queryset(), key=attrgetter('created_at'), reverse=True)
+        return Response(self.get_serializer(jobs, many=True).data)
+
+class ReportViewSet(viewsets.ViewSet):
+    """
+    Sales reports answered from the SalesRollup table
+    Filters: ?from=YYYY-MM-DD&to=YYYY-MM-DD&issuer=...&product=...
+    With sales in several databases, each is queried in parallel and the sums are merged.
+    """
+    sums = ('quantity', 'revenue', 'line_count')
+    
+    def get_rollups(self, request):
+        rollups = SalesRollup.objects.all()
+        for param, lookup in (('from', 'day__gte'), ('to', 'day__lte')):
+            day = date_param(request, param)
+            if day is not None:
+                rollups = rollups.filter(**{lookup: day})
         
-        # Company details
-        company_details = ParagraphStyle(
-            'CompanyDetails',
-            parent=styles['Normal'],
-            fontSize=10,
-            alignment=1,  # Center
-            spaceAfter=20
+        if request.query_params.get('issuer'):
+            rollups = rollups.filter(issuer_name=request.query_params['issuer'])
+        if request.query_params.get('product'):
+            rollups = rollups.filter(product_name=request.query_params['product'])
+        return rollups
+    
+    def report_databases(self, request):
+        issuer = request.query_params.get('issuer')
+        return [shard_for_issuer(issuer)] if issuer else None
+    
+    def grouped_report(self, request, *group_by):
+        rollups = self.get_rollups(request).order_by(*group_by).values(*group_by)
+        reports = fan_out(
+            lambda using: list(rollups.using(using).annotate(**{name: Sum(name) for name in self.sums})),
+            self.report_databases(request),
         )
-        
-        story.append(Paragraph(
-            "No. 122 Lukoro Plaza A, Farm Center, Kano State<br/>"
-            "Email: info@yarotech.com.ng",
-            company_details
-        ))
-        
-        # Invoice title
-        invoice_style = ParagraphStyle(
-            'InvoiceTitle',
-            parent=styles['Heading1'],
-            fontSize=36,
-            textColor=colors.HexColor('#2196F3'),
-            alignment=2,  # Right
-            spaceAfter=20
+        if len(reports) == 1:
+            rows = reports[0]
+        else:
+            merged = {}
+            for row in chain.from_iterable(reports):
+                key = tuple(row[name] for name in group_by)
+                if key in merged:
+                    for name in self.sums:
+                        merged[key][name] += row[name]
+                else:
+                    merged[key] = row
+            rows = [merged[key] for key in sorted(merged)]
+        return Response(SalesReportSerializer(rows, many=True).data)
+    
+    def list(self, request):
+        """Totals for the whole range"""
+        rollups = self.get_rollups(request)
+        reports = fan_out(
+            lambda using: rollups.using(using).aggregate(**{name: Sum(name) for name in self.sums}),
+            self.report_databases(request),
         )
+        totals = {name: sum(report[name] or 0 for report in reports) for name in self.sums}
+        return Response(SalesReportSerializer(totals).data)
+    
+    @action(detail=False)
+    def daily(self, request):
+        """Revenue per day"""
+        return self.grouped_report(request, 'day')
+    
+    @action(detail=False)
+    def issuers(self, request):
+        """Revenue per issuer"""
+        return self.grouped_report(request, 'issuer_name')
+    
+    @action(detail=False)
+    def products(self, request):
+        """Revenue per product"""
+        return self.grouped_report(request, 'product_name')
+
+class ChangeViewSet(viewsets.ViewSet):
+    """
+    Incremental sync: what changed after ?since=<cursor>, one entry per object
+    Without since, returns just a cursor for the present, to keep after loading the full
+    lists. Entries are {model, id, action, data}; deleted objects have no data. Follow
+    `cursor` for the next request, straight away while has_more is true.
+    Filters: ?models=customer,product,sale,saleitem&limit=N
+    """
+    serializer_classes = {
+        'customer': CustomerSerializer,
+        'product': ProductSerializer,
+        'sale': SaleChangeSerializer,
+        'saleitem': SaleItemChangeSerializer,
+    }
+    
+    def list(self, request):
+        since = request.query_params.get('since')
+        if not since:
+            return api_response({'cursor': changes.encode_cursor(changes.head_id()), 'has_more': False, 'changes': []})
+        try:
+            after, issued_at = changes.decode_cursor(since)
+        except ValueError:
+            raise ValidationError({'since': ['Invalid cursor']})
+        if changes.expired(issued_at):
+            return api_response({'detail': 'Cursor expired; reload the full lists and start from a new cursor.'},
+                                status=status.HTTP_410_GONE)
+        models = query_list(request, 'models')
+        unknown = models - set(self.serializer_classes)
+        if unknown:
+            raise ValidationError({'models': [f"Unknown models: {', '.join(sorted(unknown))}"]})
+        try:
+            limit = int(request.query_params.get('limit', settings.CHANGES_PAGE_SIZE))
+        except ValueError:
+            raise ValidationError({'limit': ['Expected an integer']})
+        limit = max(1, min(limit, settings.CHANGES_PAGE_SIZE))
         
-        story.append(Paragraph("INVOICE", invoice_style))
-        
-        # Invoice details
-        invoice_id = f"INV-{str(sale.id)[:8].upper()}"
-        invoice_date = sale.sale_date.strftime("%b %d, %Y %H:%M")
-        customer_name = sale.customer.name if sale.customer else 'N/A'
-        
-        details_data = [
-            ['Invoice ID:', invoice_id, 'Date:', invoice_date],
-            ['Bill To:', customer_name, 'Issued By:', sale.issuer_name]
-        ]
-        
-        details_table = Table(details_data, colWidths=[1*inch, 2*inch, 1*inch, 2*inch])
-        details_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 0),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-        ]))
-        
-        story.append(details_table)
-        story.append(Spacer(1, 20))
-        
-        # Items table
-        items_data = [['PRODUCT', 'QUANTITY', 'PRICE (₦)', 'TOTAL (₦)']]
-        
-        for item in sale.sale_items.all():
-            items_data.append([
-                item.product_name,
-                str(item.quantity),
-                f"{item.price:,.2f}",
-                f"{item.total:,.2f}"
-            ])
-        
-        # Add grand total row
-        items_data.append(['', '', 'GRAND TOTAL', f"₦ {sale.total:,.2f}"])
-        
-        items_table = Table(items_data, colWidths=[3*inch, 1*inch, 1.5*inch, 1.5*inch])
-        items_table.setStyle(TableStyle([
-            # Header row
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2196F3')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            
-            # Data rows
-            ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -2), 10),
-            ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
-            ('ALIGN', (0, 1), (0, -1), 'LEFT'),
-            
-            # Grand total row
-            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#2196F3')),
-            ('TEXTCOLOR', (0, -1), (-1, -1), colors.whitesmoke),
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, -1), (-1, -1), 12),
-            ('ALIGN', (0, -1), (-1, -1), 'RIGHT'),
-            
-            # Grid
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
-        
-        story.append(items_table)
-        story.append(Spacer(1, 30))
-        
-        # Footer
-        footer_style = ParagraphStyle(
-            'Footer',
-            parent=styles['Normal'],
-            fontSize=11,
-            textColor=colors.HexColor('#2196F3'),
-            alignment=1,  # Center
-            backColor=colors.HexColor('#2196F3'),
-            textColor=colors.whitesmoke,
-            borderPadding=10
-        )
+        page, has_more = changes.read_changes(after, limit)
+        if has_more:
+            # Unread changes may be older than now; date the cursor so pruning them expires it
+            cursor = changes.encode_cursor(page[-1].id, page[-1].changed_at)
+        else:
+            cursor = changes.encode_cursor(page[-1].id if page else after)
+        entries = [entry for entry in changes.collapse(page) if not models or entry[0] in models]
+        return api_response({'cursor': cursor, 'has_more': has_more, 'changes': self.describe(entries)})
+    
+    def describe(self, entries):
+        """Entries with the current data of every object not deleted, one query per model"""
+        wanted = {}
+        for model, object_id, action in entries:
+            if action != Change.DELETED:
+                wanted.setdefault(model, []).append(object_id)
+        objects = {model: in_bulk(changes.SYNCED_MODELS[model].objects.all(), ids) for model, ids in wanted.items()}
         
-        story.append(Paragraph(
-            "Thank you for your business with YAROTECH Network Limited!",
-            footer_style
+        described = []
+        for model, object_id, action in entries:
+            entry = {'model': model, 'id': str(object_id), 'action': action}
+            if action != Change.DELETED:
+                instance = objects[model].get(object_id)
+                if instance is None:
+                    # Deleted since (a later change says so) or archived (left to the client)
+                    continue
+                entry['data'] = self.serializer_classes[model](instance).data
+            described.append(entry)
+        return described
+
+# Sale actions served as async views (routed ahead of SaleViewSet in invoices.urls)
+# Under ASGI they wait on the database and on rendering without holding a worker thread.
+
+def api_response(data, status=status.HTTP_200_OK):
+    """JSON response encoded the same way as the API's FastJSONRenderer"""
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+def method_not_allowed(request):
+    return api_response({'detail': f'Method "{request.method}" not allowed.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+def check_sale_access(request, action, args, kwargs):
+    """
+    Run SaleViewSet's authentication, permission and throttle checks for an action
+    Returns DRF's error response, rendered, or None when the request may go ahead.
+    """
+    viewset = SaleViewSet(action_map={request.method.lower(): action}, args=args, kwargs=kwargs, format_kwarg=None)
+    viewset.request = drf_request = viewset.initialize_request(request, *args, **kwargs)
+    viewset.headers = viewset.default_response_headers
+    try:
+        viewset.perform_authentication(drf_request)
+        viewset.check_permissions(drf_request)
+        viewset.check_throttles(drf_request)
+    except APIException as exc:
+        return viewset.finalize_response(drf_request, viewset.handle_exception(exc)).render()
+    return None
+
+def sale_action(action):
+    """
+    Serve an async view as a SaleViewSet action: CSRF exempt at the middleware like every DRF
+    view (SessionAuthentication enforces CSRF for logged-in users), and behind the viewset's
+    authentication and permission checks.
+    """
+    def decorate(view):
+        @wraps(view)
+        async def checked_view(request, *args, **kwargs):
+            denied = await sync_to_async(check_sale_access)(request, action, args, kwargs)
+            if denied is not None:
+                return denied
+            return await view(request, *args, **kwargs)
+        # csrf_exempt() returns a sync wrapper in Django 4.2; marked, Django still awaits the view
+        return markcoroutinefunction(csrf_exempt(checked_view))
+    return decorate
+
+async def get_invoice_sale(pk):
+    """The sale, live or archived, with its customer and items loaded, or None"""
+    for model in (Sale, ArchivedSale):
+        queryset = with_customer(model.objects.prefetch_related('sale_items'))
+        for using in sale_databases():
+            try:
+                return await queryset.using(using).aget(pk=pk)
+            except model.DoesNotExist:
+                pass
+    return None
+
+@sale_action('invoice_data')
+async def sale_invoice_data(request, pk):
+    """Get sale data formatted for invoice generation"""
+    if request.method != 'GET':
+        return method_not_allowed(request)
+    sale = await get_invoice_sale(pk)
+    if sale is None:
+        return api_response({'error': 'Sale not found'}, status=status.HTTP_404_NOT_FOUND)
+    return api_response(SaleDetailSerializer(sale).data)
+
+@sale_action('send_email')
+async def sale_send_email(request, pk):
+    """Queue the invoice email to info@yarotech.com.ng"""
+    if request.method != 'POST':
+        return method_not_allowed(request)
+    for using in sale_databases():
+        try:
+            sale = await Sale.objects.using(using).aget(pk=pk)
+            break
+        except Sale.DoesNotExist:
+            pass
+    else:
+        return api_response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+    job = await aenqueue_invoice_email(sale)
+    
+    return api_response({
+        'success': True,
+        'message': 'Invoice email queued',
+        'job_id': str(job.id),
+        'status': job.status,
+        'status_url': request.build_absolute_uri(reverse('emailjob-detail', args=[job.id]))
+    }, status=status.HTTP_202_ACCEPTED)
+
+def render_invoice_pdf(sale, content_hash):
+    # Imported on the first render, on the executor thread, so the API loads without ReportLab
+    from .invoice_pdf import get_invoice_pdf
+    return get_invoice_pdf(sale, content_hash)
+
+@sale_action('invoice_pdf')
+async def sale_invoice_pdf(request, pk):
+    """Serve the invoice PDF, answering conditional requests with 304"""
+    if request.method != 'GET':
+        return method_not_allowed(request)
+    sale = await get_invoice_sale(pk)
+    if sale is None:
+        return api_response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+    content_hash = invoice_content_hash(sale)
+    etag = f'"{content_hash}"'
+    
+    if etag_matches(request.headers.get('If-None-Match', ''), etag):
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        # ReportLab is CPU bound and sync; render on the default executor so renders overlap.
+        # The sale is fully loaded, so the render makes no database queries.
+        pdf, content_hash = await sync_to_async(render_invoice_pdf, thread_sensitive=False)(sale, content_hash)
+        response = HttpResponse(pdf, content_type='application/pdf')
+        response['Content-Disposition'] = f'inline; filename="{sale.invoice_id}.pdf"'
+    
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+def new_sale_messages(after):
+    """
+    Server-sent event messages for sales created after change id `after`, the change id
+    they take the client to and whether more changes are waiting
+    """
+    page, more = changes.read_changes(after, settings.CHANGES_PAGE_SIZE)
+    if not page:
+        return '', after, more
+    created = [change for change in page if change.model == 'sale' and change.action == Change.CREATED]
+    sales = {}
+    if created:
+        rows = fetch_all(Sale.objects.filter(pk__in=[change.object_id for change in created]).values(
+            *SaleSummarySerializer.SUMMARY_FIELDS
         ))
-        
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
+        sales = {row['id']: row for row in rows}
+    
+    messages = []
+    last_id = after
+    for change in created:
+        sale = sales.get(change.object_id)
+        if sale is not None:
+            data = dumps(SaleSummarySerializer(sale).data).decode('utf-8')
+            messages.append(f'id: {change.id}\nevent: sale\ndata: {data}\n\n')
+            last_id = change.id
+    position = page[-1].id
+    if last_id != position:
+        # An id without data moves the client's Last-Event-ID past changes that were not sales
+        messages.append(f'id: {position}\n\n')
+    return ''.join(messages), position, more
+
+def sale_events(after):
+    """
+    Poll the change feed for new sales until SALE_STREAM_LIFETIME is up
+    Yields the stream's text, and None where it waits SALE_STREAM_POLL_INTERVAL before the
+    next poll; sync_sale_events() and async_sale_events() do the waiting.
+    """
+    deadline = monotonic() + settings.SALE_STREAM_LIFETIME
+    last_sent = monotonic()
+    yield f'retry: {int(settings.SALE_STREAM_POLL_INTERVAL * 1000)}\n\n'
+    while monotonic() < deadline:
+        messages, after, more = new_sale_messages(after)
+        if not messages and monotonic() - last_sent >= settings.SALE_STREAM_KEEPALIVE:
+            # Keeps proxies from closing an idle connection
+            messages = ': keep-alive\n\n'
+        if messages:
+            last_sent = monotonic()
+            yield messages
+        if not more:
+            yield None
+
+def sync_sale_events(events):
+    """The stream for a WSGI server, sleeping on the worker thread between polls"""
+    for chunk in events:
+        if chunk is None:
+            sleep(settings.SALE_STREAM_POLL_INTERVAL)
+        else:
+            yield chunk
+
+async def async_sale_events(events):
+    """The stream for an ASGI server: polls run on the request's sync thread, waits on the event loop"""
+    async for chunk in iterate_async(events):
+        if chunk is None:
+            await asyncio.sleep(settings.SALE_STREAM_POLL_INTERVAL)
+        else:
+            yield chunk
+
+@sale_action('stream')
+async def sale_stream(request):
+    """
+    New sales as server-sent events: one `sale` event per sale, with the sales history row
+    Starts after ?since=<change feed cursor>, or now; EventSource resumes with Last-Event-ID.
+    The response ends after SALE_STREAM_LIFETIME and the browser reconnects.
+    """
+    if request.method != 'GET':
+        return method_not_allowed(request)
+    last_event_id = request.headers.get('Last-Event-ID')
+    since = request.GET.get('since')
+    if last_event_id:
+        try:
+            after = int(last_event_id)
+        except ValueError:
+            return api_response({'detail': 'Invalid Last-Event-ID'}, status=status.HTTP_400_BAD_REQUEST)
+    elif since:
+        try:
+            after, issued_at = changes.decode_cursor(since)
+        except ValueError:
+            return api_response({'since': ['Invalid cursor']}, status=status.HTTP_400_BAD_REQUEST)
+        if changes.expired(issued_at):
+            return api_response({'detail': 'Cursor expired; reload the sales and start from a new cursor.'},
+                                status=status.HTTP_410_GONE)
+    else:
+        after = await sync_to_async(changes.head_id)()
+    
+    # Each server gets an iterator it sends as it goes; Django 4.2 would collect the other kind
+    events = async_sale_events(sale_events(after)) if is_asgi(request) else sync_sale_events(sale_events(after))
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stops nginx from buffering the events
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 # Simple auth endpoints for local development
-def auth_status(request):
+async def auth_status(request):
     """Simple auth status endpoint"""
     return JsonResponse({
         'authenticated': True,
@@ -261,7 +621,7 @@ def auth_status(request):
         }
     })
 
-def auth_signin(request):
+async def auth_signin(request):
     """Simple signin endpoint"""
     if request.method == 'POST':
         return JsonResponse({
@@ -271,9 +631,9 @@ def auth_signin(request):
                 'email': 'demo@yarotech.com.ng'
             }
         })
-    return JsonResponse({'error': 'Method not allowed'}, status=405)
+    return JsonResponse({'error': 'Method not allowed'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
-def auth_signup(request):
+async def auth_signup(request):
     """Simple signup endpoint"""
     if request.method == 'POST':
         return JsonResponse({
@@ -283,8 +643,12 @@ def auth_signup(request):
                 'email': 'demo@yarotech.com.ng'
             }
         })
-    return JsonResponse({'error': 'Method not allowed'}, status=405)
+    return JsonResponse({'error': 'Method not allowed'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
-def auth_signout(request):
+async def auth_signout(request):
     """Simple signout endpoint"""
-    return JsonResponse({'success': True})
\ No newline at end of file
+    return JsonResponse({'success': True})
+
+def metrics(request):
+    """Prometheus metrics for this process"""
+    return HttpResponse(registry.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
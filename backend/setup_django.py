@@ -16,7 +16,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yarotech_backend.settings')
 django.setup()
 
-from invoices.models import Customer, Product, Sale, SaleItem
+from invoices.models import Customer, Product, Sale, SaleItem, normalize_customer_name
 
 def setup_database():
     """Create sample data for testing"""
@@ -31,7 +31,7 @@ def setup_database():
     
     for customer_data in customers_data:
         customer, created = Customer.objects.get_or_create(
-            name=customer_data['name'],
+            name_key=normalize_customer_name(customer_data['name']),
             defaults=customer_data
         )
         if created:
@@ -0,0 +1,16 @@
+"""
+ASGI config for yarotech_backend project.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yarotech_backend.settings')
+
+application = get_asgi_application()
+
+if settings.INVOICE_PDF_PRELOAD:
+    from invoices.invoice_pdf import warm_up
+    warm_up()
@@ -0,0 +1,12 @@
+"""
+SQLite backend that starts transactions with BEGIN IMMEDIATE
+A deferred transaction that reads before it writes cannot upgrade its lock while
+another connection is writing, and SQLite fails it with "database is locked" without
+waiting for the busy timeout. Taking the write lock up front makes writers queue instead.
+"""
+
+from django.db.backends.sqlite3 import base
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
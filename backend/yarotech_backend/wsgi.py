@@ -4,8 +4,13 @@ WSGI config for yarotech_backend project.
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yarotech_backend.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+if settings.INVOICE_PDF_PRELOAD:
+    from invoices.invoice_pdf import warm_up
+    warm_up()
\ No newline at end of file
@@ -11,6 +11,31 @@ interface AuthStatusResponse {
   user?: any;
 }
 
+export type SyncedModel = 'customer' | 'product' | 'sale' | 'saleitem';
+
+export interface ChangeEntry {
+  model: SyncedModel;
+  id: string;
+  action: 'created' | 'updated' | 'deleted';
+  data?: Record<string, any>;
+}
+
+export interface ChangesResponse {
+  cursor: string;
+  has_more: boolean;
+  changes: ChangeEntry[];
+}
+
+export interface SaleSummary {
+  id: string;
+  invoice_number: number;
+  customer_name: string;
+  total: string;
+  sale_date: string;
+  issuer_name: string;
+  item_count: number;
+}
+
 class ApiClient {
   private baseUrl: string;
 
@@ -156,6 +181,26 @@ class ApiClient {
       method: 'POST',
     });
   }
+
+  // Change feed: call without a cursor after a full load, then with the returned cursor.
+  // A 410 error means the cursor expired and the lists must be reloaded.
+  async getChanges(since?: string, models?: SyncedModel[]) {
+    const params = new URLSearchParams();
+    if (since) params.set('since', since);
+    if (models?.length) params.set('models', models.join(','));
+    const query = params.toString();
+    return this.request<ChangesResponse>(`/changes/${query ? `?${query}` : ''}`);
+  }
+
+  // New sales as they are created; returns a function that closes the stream
+  subscribeToSales(onSale: (sale: SaleSummary) => void, since?: string) {
+    const query = since ? `?since=${encodeURIComponent(since)}` : '';
+    const source = new EventSource(`${this.baseUrl}/sales/stream/${query}`);
+    source.addEventListener('sale', (event) => {
+      onSale(JSON.parse((event as MessageEvent).data));
+    });
+    return () => source.close();
+  }
 }
 
 export const apiClient = new ApiClient();
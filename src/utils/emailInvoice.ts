@@ -5,6 +5,7 @@ import { supabase } from "@/integrations/supabase/client";
 
 interface SaleData {
   id: string;
+  invoice_id?: string;
   sale_date: string;
   total: number;
   issuer_name: string;
@@ -79,7 +80,7 @@ export const generateInvoicePDFBase64 = async (sale: SaleData): Promise<string>
   doc.setFont("helvetica", "bold");
   doc.text("Invoice ID:", 25, 120);
   doc.setFont("helvetica", "normal");
-  const invoiceId = `INV-${sale.id.substring(0, 8).toUpperCase()}`;
+  const invoiceId = sale.invoice_id ?? `INV-${sale.id.substring(0, 8).toUpperCase()}`;
   doc.text(invoiceId, 25, 127);
 
   const tableData = sale.sale_items.map(item => [
@@ -161,7 +162,7 @@ export const generateInvoicePDFBase64 = async (sale: SaleData): Promise<string>
 
 export const sendInvoiceEmail = async (sale: SaleData): Promise<void> => {
   const pdfBase64 = await generateInvoicePDFBase64(sale);
-  const invoiceId = `INV-${sale.id.substring(0, 8).toUpperCase()}`;
+  const invoiceId = sale.invoice_id ?? `INV-${sale.id.substring(0, 8).toUpperCase()}`;
 
   const apiUrl = `${import.meta.env.VITE_SUPABASE_URL}/functions/v1/send-invoice-email`;
 
@@ -4,6 +4,7 @@ import { format } from "date-fns";
 
 interface SaleData {
   id: string;
+  invoice_id?: string;
   sale_date: string;
   total: number;
   issuer_name: string;
@@ -73,7 +74,7 @@ export const generateInvoicePDF = async (sale: SaleData) => {
   doc.setLineWidth(0.7);
   doc.roundedRect(marginX, sectionTop, 515, 65, 5, 5);
 
-  const invoiceId = `INV-${sale.id.substring(0, 8).toUpperCase()}`;
+  const invoiceId = sale.invoice_id ?? `INV-${sale.id.substring(0, 8).toUpperCase()}`;
   const invoiceDate = format(new Date(sale.sale_date), "MMM dd, yyyy HH:mm");
 
   doc.setFontSize(10);